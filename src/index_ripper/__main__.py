@@ -16,6 +16,25 @@ def _main() -> None:
         )
         raise SystemExit(0)
 
+    if "--bench-parse" in sys.argv:
+        from index_ripper.benchmark import LISTING_FLAVORS, format_results, run_parse_benchmark
+
+        print(format_results(run_parse_benchmark(flavors=LISTING_FLAVORS, repeat=1, include_extractors=True)))
+        raise SystemExit(0)
+
+    bench_crawl = [arg for arg in sys.argv if arg.split("=", 1)[0] == "--bench-crawl"]
+    if bench_crawl:
+        from index_ripper.benchmark import run_crawl_benchmark
+
+        _flag, _sep, entries = bench_crawl[0].partition("=")
+        print(run_crawl_benchmark(int(entries or 1_000_000)).format())
+        raise SystemExit(0)
+
+    if "--scan-roots" in sys.argv:
+        from index_ripper.jobs import scan_roots_cli
+
+        raise SystemExit(scan_roots_cli(sys.argv[sys.argv.index("--scan-roots") + 1:]))
+
     from index_ripper.utils import configure_tk_libraries
     configure_tk_libraries()
 
@@ -0,0 +1,163 @@
+"""Alias and loop detection for listing trees (symlinks, mirrored paths, redirects).
+
+Crawling dedupes by URL, so ``/pub/current/`` and ``/pub/2026.10/`` (the same
+directory under two names) would be crawled twice. A symlink loop
+(``/a/loop/`` -> ``/a/``) would be crawled until the URLs get too long. Two
+checks catch these:
+
+* Redirects: a listing that redirects to a URL already listed in this scan
+  (or one that was reached through a redirect before) is not read again.
+* Loops: each listing is hashed over its entries (name, directory flag,
+  size, date; parent links are ignored). Subdirectories are held back until
+  the listing is complete. If the hash matches the listing of one of the
+  URL's own ancestors, the directory shows itself again below itself. Its
+  held subdirectories are dropped, and it is linked to the ancestor.
+
+Two sibling directories can list the same names with the same dates (for
+example ``dists/main/`` and ``dists/contrib/``). So a hash that matches
+an unrelated listing is only treated as an alias with
+``match_fingerprints``, which is off by default. Even then, the listing must
+have at least ``FINGERPRINT_MIN_ENTRIES`` entries, ``FINGERPRINT_MIN_SIZED``
+of them files with a size. The loop check needs less evidence. Listings
+without size or date columns only count for it once they have
+``NAMES_ONLY_MIN_ENTRIES`` entries.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from urllib.parse import unquote, urlparse
+
+MIN_ENTRIES = 2
+NAMES_ONLY_MIN_ENTRIES = 8
+FINGERPRINT_MIN_ENTRIES = 32
+FINGERPRINT_MIN_SIZED = 16
+
+
+def _ancestors(url: str) -> list[str]:
+    """Directory URLs above url, nearest first."""
+    parsed = urlparse(url)
+    root = f"{parsed.scheme}://{parsed.netloc}"
+    parts = [part for part in parsed.path.split("/") if part]
+    return [
+        root + "/" + "".join(f"{part}/" for part in parts[:i])
+        for i in range(len(parts) - 1, -1, -1)
+    ]
+
+
+class ListingFingerprint:
+    """Running hash of one listing's entries, with its subdirectories held back."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.held: list[dict] = []
+        self.entries = 0
+        self.sized = 0  # files with a size
+        self._has_metadata = False
+        self._hash = hashlib.sha1()
+
+    def add(self, url_info: dict) -> bool:
+        """Hash url_info. Return True to pass it on now, False if it is held back."""
+        if url_info["is_directory"] and self.url.startswith(url_info["url"]):
+            return True  # parent link: differs between aliases, never followed anyway
+        name = unquote(os.path.basename(urlparse(url_info["url"]).path.rstrip("/")))
+        size, modified = url_info.get("size"), url_info.get("modified")
+        self._has_metadata = self._has_metadata or bool(size is not None or modified)
+        self._hash.update(
+            f"{name}\0{int(url_info['is_directory'])}\0{size}\0{modified}\n".encode(
+                "utf-8", "surrogatepass"
+            )
+        )
+        self.entries += 1
+        if size is not None and not url_info["is_directory"]:
+            self.sized += 1
+        if url_info["is_directory"]:
+            self.held.append(url_info)
+            return False
+        return True
+
+    @property
+    def comparable(self) -> bool:
+        """Whether the listing says enough about itself to be matched against an ancestor."""
+        if not self.held:
+            return False  # nothing below it to skip
+        needed = MIN_ENTRIES if self._has_metadata else NAMES_ONLY_MIN_ENTRIES
+        return self.entries >= needed
+
+    @property
+    def distinctive(self) -> bool:
+        """Whether the listing is unlikely to match an unrelated directory by chance."""
+        return self.entries >= FINGERPRINT_MIN_ENTRIES and self.sized >= FINGERPRINT_MIN_SIZED
+
+    def digest(self) -> str:
+        return self._hash.hexdigest()
+
+
+class AliasDetector:
+    """Per-scan registry of listing fingerprints and redirect targets.
+
+    With ``match_fingerprints``, any two distinctive listings with the same
+    entries are aliases, not only a listing and its ancestor.
+    """
+
+    def __init__(self, match_fingerprints: bool = False):
+        self.match_fingerprints = match_fingerprints
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._digests: dict[str, str] = {}  # digest -> first URL listed with it
+            self._url_digests: dict[str, str] = {}
+            self._listed: dict[str, str] = {}  # URL actually listed -> URL it was listed as
+            self.aliases: dict[str, str] = {}  # alias URL -> canonical URL
+            self.requests_avoided = 0
+
+    def claim(self, url: str) -> str | None:
+        """Call before fetching url. Return the URL it was already listed as, if any."""
+        with self._lock:
+            canonical = self._listed.get(url)
+            if canonical is not None and canonical != url:
+                self.aliases[url] = canonical
+                self.requests_avoided += 1
+                return canonical
+            self._listed[url] = url
+            return None
+
+    def redirected(self, url: str, final_url: str) -> str | None:
+        """Record that url's listing came from final_url; return the earlier lister
+        of final_url if it was already listed in this scan."""
+        if final_url == url:
+            return None
+        with self._lock:
+            canonical = self._listed.get(final_url)
+            if canonical is not None and canonical != url:
+                self.aliases[url] = canonical
+                return canonical
+            self._listed[final_url] = url
+            return None
+
+    def fingerprint(self, url: str) -> ListingFingerprint:
+        return ListingFingerprint(url)
+
+    def finish(self, fingerprint: ListingFingerprint) -> tuple[list[dict], str | None]:
+        """Complete a listing: return (subdirectories to follow, canonical URL if it is an alias)."""
+        if not fingerprint.comparable:
+            return fingerprint.held, None
+        url, digest = fingerprint.url, fingerprint.digest()
+        with self._lock:
+            self._url_digests[url] = digest
+            canonical = next(
+                (parent for parent in _ancestors(url) if self._url_digests.get(parent) == digest),
+                None,
+            )
+            if canonical is None:
+                first = self._digests.setdefault(digest, url)
+                if first != url and self.match_fingerprints and fingerprint.distinctive:
+                    canonical = first
+            if canonical is None:
+                return fingerprint.held, None
+            self.aliases[url] = canonical
+            self.requests_avoided += len(fingerprint.held)
+        return [], canonical
@@ -11,10 +11,6 @@ from queue import Empty, Queue
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-
 import customtkinter as ctk
 
 from index_ripper.utils import (
@@ -26,7 +22,9 @@ from index_ripper.utils import (
     sanitize_filename,
 )
 from index_ripper.backend import Backend
-from index_ripper.settings import load_settings, save_settings
+from index_ripper.connections import DnsCache, make_session
+from index_ripper.listing import parse_size
+from index_ripper.settings import apply_env_settings, load_settings, save_settings
 from index_ripper.ui.downloads import DownloadsPanel
 from index_ripper.ui.theme import (
     apply_app_theme,
@@ -42,8 +40,6 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
 
     def __init__(self, ui_smoke: bool = False):
         self._ui_smoke = bool(ui_smoke)
-        self.debug_enabled = os.environ.get("INDEX_RIPPER_DEBUG", "0") != "0"
-        self.use_modal_dialogs = os.environ.get("INDEX_RIPPER_MODAL_DIALOGS", "0") == "1"
 
         apply_app_theme(ctk)
 
@@ -57,6 +53,13 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
         self.ui_tokens = ui_tokens()
 
         self.backend = Backend(self)
+        env_settings = apply_env_settings(self.backend)
+        self.debug_enabled = env_settings.debug
+        self.use_modal_dialogs = env_settings.modal_dialogs
+        # Download progress is drained from the board by _drain_download_progress
+        self.backend.push_progress = False
+        # Shared by the scan and download sessions only
+        self.dns_cache = DnsCache(env_settings.dns_ttl) if env_settings.dns_ttl > 0 else None
 
         self.pause_event = threading.Event()
         self.pause_event.set()
@@ -99,19 +102,18 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
         self.max_workers = 5
         self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
         self.active_downloads = []
+        self._download_monitor = None
+        self._download_progress_job = None
 
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=0.1,
-            status_forcelist=[500, 502, 503, 504],
-        )
-        self.session = requests.Session()
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
+        # Separate pools for scan and download traffic, each sized to its workers
+        pool_sizes = self.backend.connection_pool_sizes()
+        self.session = make_session(pool_sizes["scan"], dns_cache=self.dns_cache)
+        self.download_session = make_session(pool_sizes["download"], dns_cache=self.dns_cache)
         self.timeout = (10, 20)
 
         self._build_ui()
+        for message in env_settings.messages:
+            self.log_message(message)
 
         if not self._ui_smoke:
             self.window.after(100, self._poll_scan_queue)
@@ -201,7 +203,7 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
         toolbar = ctk.CTkFrame(self.window, fg_color="transparent")
         toolbar.grid(row=0, column=0, sticky="ew", padx=10, pady=(10, 0))
         toolbar.grid_columnconfigure(0, weight=1)  # URL entry expands
-        toolbar.grid_columnconfigure(2, minsize=96)  # reserve space for pause btn
+        toolbar.grid_columnconfigure(3, minsize=96)  # reserve space for pause btn
 
         self.url_var = tk.StringVar()
         self.url_entry = ctk.CTkEntry(
@@ -216,6 +218,16 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
         self.scan_btn = ctk.CTkButton(toolbar, text="Scan", command=self.start_scan, width=90)
         self.scan_btn.grid(row=0, column=1, padx=(0, 4))
 
+        # Load Saved: rebuild the tree from the local scan index, no network
+        self.load_saved_btn = ctk.CTkButton(
+            toolbar, text="Load Saved",
+            fg_color=("gray70", "gray30"),
+            hover_color=("gray60", "gray40"),
+            command=self.load_saved_scan,
+            width=96,
+        )
+        self.load_saved_btn.grid(row=0, column=2, padx=(0, 4))
+
         # Pause Scan button — hidden by default, shown only while scanning
         self.scan_pause_btn = ctk.CTkButton(
             toolbar, text="Pause",
@@ -225,12 +237,12 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
             width=80,
             state="disabled",
         )
-        self.scan_pause_btn.grid(row=0, column=2, padx=(0, 8))
+        self.scan_pause_btn.grid(row=0, column=3, padx=(0, 8))
         self.scan_pause_btn.grid_remove()  # hidden until scan starts
 
         # Status: dot + text
         status_frame = ctk.CTkFrame(toolbar, fg_color="transparent")
-        status_frame.grid(row=0, column=3, sticky="e")
+        status_frame.grid(row=0, column=4, sticky="e")
 
         self._status_dot = ctk.CTkFrame(
             status_frame, width=8, height=8, corner_radius=4,
@@ -256,6 +268,8 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
 
     def on_closing(self) -> None:
         self.executor.shutdown(wait=False)
+        if self.backend.scan_index is not None:
+            self.backend.scan_index.flush()  # keep the checkpoint of a running scan
         self.window.destroy()
 
     def log_message(self, message: str) -> None:
@@ -306,12 +320,13 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
         size: str = "",
         file_type: str = "",
         full_path: str = "",
+        modified: str = "",
     ) -> None:
         """Backend hook — called from background thread when an item is found."""
-        if not self.is_scanning:
+        if not self.is_scanning and self.backend.lazy_scanner is None:
             return
         self.scan_item_buffer.put(
-            (is_directory, path, url, file_name, size, file_type, full_path)
+            (is_directory, path, url, file_name, size, file_type, full_path, modified)
         )
         self.window.after(0, self._schedule_flush)
 
@@ -345,6 +360,7 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
                     size,
                     file_type,
                     full_path,
+                    modified,
                 ) = self.scan_item_buffer.get_nowait()
             except Empty:
                 break
@@ -353,7 +369,9 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
                 self.dir_queue.put((path, url))
                 added_dir = True
             else:
-                self.file_queue.put((path, url, file_name, size, file_type, full_path))
+                self.file_queue.put(
+                    (path, url, file_name, size, file_type, full_path, modified)
+                )
                 added_file = True
             processed += 1
 
@@ -371,7 +389,9 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
             self.is_processing_dirs = True
             if not self.dir_queue.empty():
                 dir_path, url = self.dir_queue.get()
-                self.add_folder(dir_path, url)
+                node_id = self.add_folder(dir_path, url, lazy=self.backend.lazy_scanner is not None)
+                if node_id and not self.tree_nodes[node_id].url:
+                    self.tree_nodes[node_id].url = url
                 self.window.after(10, self._poll_scan_queue)
             else:
                 self.is_processing_dirs = False
@@ -394,8 +414,9 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
                     size,
                     file_type,
                     full_path,
+                    modified,
                 ) = self.file_queue.get()
-                self.add_file(dir_path, url, file_name, size, file_type, full_path)
+                self.add_file(dir_path, url, file_name, size, file_type, full_path, modified)
                 self.window.after(5, self._poll_file_queue)
             else:
                 self.is_processing_files = False
@@ -571,12 +592,30 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
         if node is None or node.kind != "folder":
             return
         node.expanded = not node.expanded
+        if node.expanded and node.unlisted:
+            self._list_lazy_folder(node)
+        elif node.expanded and self.is_scanning and node.url:
+            self.backend.focus_scan(url=node.url)
         row = self._row_widgets.get(node_id)
         if row:
             row.set_chevron(node.expanded)
         self._rebuild_visible()
         self._sync_rows()
 
+    def _list_lazy_folder(self, node: TreeNode) -> None:
+        """Lazy scan: fetch a folder's listing the first time it is expanded."""
+        if self.backend.expand_directory(node.url) is None:
+            return
+        node.unlisted = False
+        self._set_status(f"Listing {node.name}\u2026", "#0284C7")
+
+    def on_directory_listed(self, *, url: str = "", count: int = 0) -> None:
+        """Backend hook — a lazily scanned folder finished listing."""
+        def _listed():
+            if not self.is_scanning:
+                self._set_status("Ready", "#059669")
+        self.window.after(0, _listed)
+
     def _build_progress_section(self) -> None:
         progress_frame = ctk.CTkFrame(self.window, fg_color="transparent")
         progress_frame.grid(row=4, column=0, sticky="ew", padx=10, pady=(6, 2))
@@ -593,6 +632,16 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
         )
         self.progress_label.grid(row=1, column=0, sticky="ew")
 
+        # Per-host concurrency limits chosen by the backend's adaptive controller
+        self.limits_label = ctk.CTkLabel(
+            progress_frame, text="",
+            font=ctk.CTkFont(size=12),
+            text_color=("gray40", "gray60"),
+            anchor="e",
+        )
+        self.limits_label.grid(row=1, column=1, sticky="e")
+        self._concurrency_limits: dict[str, dict[str, int]] = {}
+
     def _build_panels(self) -> None:
         self.panels_notebook = ctk.CTkTabview(self.window, height=180)
         self.panels_notebook.grid(row=5, column=0, sticky="ew", padx=10, pady=(4, 10))
@@ -883,6 +932,35 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
             self.notify_error("Error", "Please enter a URL")
             return
 
+        resume = False
+        if self.backend.saved_scan_status(url) == "interrupted":
+            resume = self._ask_yes_no(
+                "Resume Scan",
+                "An earlier scan of this URL did not finish. Resume it?",
+                default=True,
+            )
+        retry_failed = False
+        failed = self.backend.failed_listings(url)
+        if failed and not resume:
+            retry_failed = self._ask_yes_no(
+                "Retry Failed Folders",
+                f"{len(failed)} folders could not be listed in the last scan. "
+                "Scan only those again?",
+                default=True,
+            )
+        self._launch_scan(url, resume, retry_failed)
+
+    def load_saved_scan(self) -> None:
+        """Rebuild the tree from the scan index (finishing the scan if it was interrupted)."""
+        url = self.url_var.get().strip()
+        if self.is_scanning or not url:
+            return
+        if self.backend.saved_scan_status(url) is None:
+            self.notify_info("Info", "No saved scan for this URL.")
+            return
+        self._launch_scan(url, resume=True)
+
+    def _launch_scan(self, url: str, resume: bool, retry_failed: bool = False) -> None:
         self.backend.should_stop = False
         self.search_var.set("")
         self.full_tree_backup.clear()
@@ -891,9 +969,20 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
         except Exception:
             self.download_path = os.path.join(os.getcwd(), "downloads")
 
-        t = threading.Thread(target=self.backend.scan_website, args=(url,), daemon=True)
+        t = threading.Thread(
+            target=self.backend.scan_website,
+            args=(url,),
+            kwargs={"resume": resume, "retry_failed": retry_failed},
+            daemon=True,
+        )
         t.start()
 
+    def _ask_yes_no(self, title: str, message: str, default: bool) -> bool:
+        if self.use_modal_dialogs:
+            return bool(messagebox.askyesno(title, message))
+        self.log_message(f"[INFO] {title}: {message} -> {'yes' if default else 'no'}")
+        return default
+
     def toggle_scan_pause(self) -> None:
         if self.scan_pause_event.is_set():
             self.scan_pause_event.clear()
@@ -922,6 +1011,8 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
     def clear_scan_results(self) -> None:
         if self.is_scanning:
             return
+        self.backend.close_lazy_scan()
+        self.backend.listing_retries.reset()
         self._drain_queues()
         self._tree_update_pending = False
         self._last_visible = []
@@ -966,8 +1057,26 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
             self._set_status("Scanning", "#B45309")
         self.window.after(0, _start)
 
-    def on_scan_progress(self, *, scanned_urls: int = 0, total_urls: int = 0) -> None:
-        self.window.after(0, lambda: self._update_scan_progress(scanned_urls, total_urls))
+    def on_scan_alias(
+        self, *, url: str, canonical: str, path: str = "", canonical_path: str = ""
+    ) -> None:
+        """Backend hook — a listing duplicates canonical and was not crawled again."""
+        self.window.after(0, lambda: self._add_alias_folder(path, url, canonical_path or canonical))
+
+    def _add_alias_folder(self, path: str, url: str, target: str) -> None:
+        node_id = self.add_folder(path, url)
+        node = self.tree_nodes.get(node_id)
+        if node is not None:
+            node.link = target or "/"
+            node.icon_group = "link"
+            self._schedule_tree_update()
+
+    def on_scan_progress(
+        self, *, scanned_urls: int = 0, total_urls: int = 0, estimated: bool = False
+    ) -> None:
+        self.window.after(
+            0, lambda: self._update_scan_progress(scanned_urls, total_urls, estimated)
+        )
 
     def on_scan_finished(self, *, stopped: bool = False) -> None:
         def _finish():
@@ -985,6 +1094,23 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
                 self._set_status("Ready", "#059669")
         self.window.after(0, _finish)
 
+    def on_concurrency_changed(self, *, kind: str = "scan", limits=None) -> None:
+        """Backend hook — a host's adaptive scan/download limit moved."""
+        snapshot = dict(limits or {})
+        self.window.after(0, lambda: self._update_limits_label(kind, snapshot))
+
+    def _update_limits_label(self, kind: str, limits: dict[str, int]) -> None:
+        self._concurrency_limits[kind] = limits
+        parts = []
+        for name, label in (("scan", "Scan"), ("download", "Download")):
+            hosts = self._concurrency_limits.get(name)
+            if hosts:
+                parts.append(f"{label}: " + ", ".join(f"{h} \u00d7{n}" for h, n in hosts.items()))
+        try:
+            self.limits_label.configure(text="  \u00b7  ".join(parts))
+        except AttributeError:
+            pass
+
     def update_progress(self, file_path: str, file_name: str, progress: float) -> None:
         """Backend hook — called from download thread with per-file progress (0-100)."""
         self.window.after(0, lambda: self._update_download_progress(file_path, progress))
@@ -993,17 +1119,22 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
         """Backend hook — called from download thread with file status."""
         self.window.after(0, lambda: self._set_download_status(file_path, status))
 
-    def _update_scan_progress(self, scanned: int, total: int) -> None:
-        """Update the scan progress bar (0-100%)."""
+    def _update_scan_progress(self, scanned: int, total: int, estimated: bool = False) -> None:
+        """Update the scan progress bar (0-100%). An estimated total is shown with "~"."""
         if total <= 0:
             self.progress_bar.set(0)
             return
         pct = scanned / total
         self.progress_bar.set(pct)
-        self.progress_label.configure(text=f"Scanning\u2026 {scanned}/{total}  ({pct:.0%})")
+        total_text = f"~{total}" if estimated else str(total)
+        self.progress_label.configure(text=f"Scanning\u2026 {scanned}/{total_text}  ({pct:.0%})")
+
+    def add_folder(self, dir_path: str, url: str, lazy: bool = False) -> str:
+        """Ensure all path segments exist as folder nodes; return leaf node_id.
 
-    def add_folder(self, dir_path: str, url: str) -> str:
-        """Ensure all path segments exist as folder nodes; return leaf node_id."""
+        With ``lazy``, a newly created leaf is a collapsed, not yet listed
+        folder that is listed from ``url`` when first expanded.
+        """
         if not dir_path:
             dir_path = "/"
         parts = [p for p in dir_path.split("/") if p]
@@ -1016,6 +1147,7 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
                 existing_id = self.folders.get(current_path)
                 if not existing_id:
                     node_id = self._next_node_id()
+                    pending = lazy and current_path == "/" + "/".join(parts)
                     node = TreeNode(
                         node_id=node_id,
                         parent_id=parent_id,
@@ -1025,7 +1157,9 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
                         size="",
                         file_type="",
                         icon_group="folder",
-                        expanded=True,
+                        expanded=not pending,
+                        url=url if pending else "",
+                        unlisted=pending,
                     )
                     self.tree_nodes[node_id] = node
                     if parent_id:
@@ -1039,7 +1173,16 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
         self._schedule_tree_update()
         return parent_id
 
-    def add_file(self, dir_path: str, url: str, file_name: str, size, file_type: str, full_path: str) -> None:
+    def add_file(
+        self,
+        dir_path: str,
+        url: str,
+        file_name: str,
+        size,
+        file_type: str,
+        full_path: str,
+        modified: str = "",
+    ) -> None:
         """Add a file node to the tree."""
         if not file_name:
             return
@@ -1062,6 +1205,7 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
                     "file_name": file_name,
                     "size": size,
                     "file_type": file_type,
+                    "modified": modified,
                     "path": dir_path,
                 }
 
@@ -1142,7 +1286,7 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
             self.notify_info("Info", "No files selected for download.")
             return
 
-        futures = []
+        downloads = []
         for full_path in selected_paths:
             info = self.files_dict.get(full_path)
             if not info:
@@ -1160,18 +1304,28 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
                 self.log_message(f"[Download] Skipped unsafe path: {full_path}")
                 continue
             os.makedirs(target_dir, exist_ok=True)
+            downloads.append((url, file_path, file_name, parse_size(str(info.get("size") or ""))))
 
-            cancel_event = self.downloads_panel.ensure(file_path, safe_name)
-            futures.append(self.executor.submit(self.backend.download_file, url, file_path, safe_name, cancel_event))
-
-        if not futures:
+        if not downloads:
             return
+        # The batch totals and ETA cover the whole selection, queued files included
+        self.backend.download_progress.start_batch(
+            (file_path, file_name, size) for _url, file_path, file_name, size in downloads
+        )
+        futures = []
+        for url, file_path, file_name, _size in downloads:
+            cancel_event = self.downloads_panel.ensure(file_path, file_name)
+            futures.append(
+                self.executor.submit(self.backend.download_file, url, file_path, file_name, cancel_event)
+            )
         try:
             self.pause_btn.configure(state="normal")
         except Exception:
             pass
         monitor = threading.Thread(target=self.backend.monitor_downloads, args=(futures,), daemon=True)
         monitor.start()
+        self._download_monitor = monitor
+        self._schedule_download_progress()
 
     def toggle_pause(self) -> None:
         if self.pause_event.is_set():
@@ -1186,6 +1340,32 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
     def _update_download_progress(self, file_path: str, progress: float) -> None:
         self.downloads_panel.set_progress(file_path, progress)
 
+    def _schedule_download_progress(self) -> None:
+        if self._download_progress_job is None:
+            interval_ms = max(16, int(self.backend.download_progress.interval * 1000))
+            self._download_progress_job = self.window.after(
+                interval_ms, self._drain_download_progress
+            )
+
+    def _drain_download_progress(self) -> None:
+        """Apply one progress snapshot per tick while downloads are running."""
+        self._download_progress_job = None
+        snapshot = self.backend.download_progress.snapshot()
+        for file_path, (_file_name, percent) in snapshot.files.items():
+            if percent is not None:
+                self._update_download_progress(file_path, percent)
+        totals = snapshot.totals
+        if totals.files and not self.is_scanning and self.pause_event.is_set():
+            try:
+                self.progress_bar.set(totals.done / totals.total if totals.total else 0)
+                verb = "Downloading" if totals.active else "Downloaded"
+                self.progress_label.configure(text=f"{verb} \u2014 {totals.format()}")
+            except tk.TclError:
+                pass
+        monitor = self._download_monitor
+        if totals.active or (monitor is not None and monitor.is_alive()):
+            self._schedule_download_progress()
+
     def _set_download_status(self, file_path: str, text: str) -> None:
         self.downloads_panel.set_status(file_path, text)
 
@@ -1197,6 +1377,8 @@ class WebsiteCopierCtk(FileTypeFilterMixin):
 
     def _apply_search_filter(self, query: str) -> None:
         term = (query or "").strip().lower()
+        if self.is_scanning:
+            self.backend.focus_scan(term=term)
         if not term:
             if self.full_tree_backup:
                 self._restore_full_tree()
@@ -0,0 +1,357 @@
+"""Asyncio scan engine: hundreds of in-flight listing and HEAD requests on one thread.
+
+Selected with ``Backend.scan_engine = "asyncio"`` (or ``INDEX_RIPPER_SCAN_ENGINE``).
+It drives the same Backend helpers and UI hooks as the threaded engine, but
+fetches through one aiohttp connection pool instead of a thread per request.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+
+try:
+    import aiohttp
+except ImportError:  # optional, installed with the "async" extra
+    aiohttp = None
+
+from index_ripper.concurrency import Slot
+from index_ripper.connections import session_dns_cache
+from index_ripper.crawler import CrawlFrontier
+from index_ripper.listing import StructuredListingError, incremental_decoder
+
+DEFAULT_ASYNC_CONCURRENCY = 256
+
+
+def async_engine_available() -> bool:
+    return aiohttp is not None
+
+
+def _client_timeout(timeout):
+    """Map a requests-style timeout (seconds or (connect, read)) onto aiohttp."""
+    if isinstance(timeout, (tuple, list)):
+        connect, read = timeout
+        return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+    return aiohttp.ClientTimeout(total=timeout)
+
+
+class AsyncScanEngine:
+    """Run one scan on an asyncio event loop.
+
+    ``concurrency`` listing workers share a CrawlFrontier; files whose listing
+    shows no size get a HEAD request as a separate task. Listing and HEAD
+    requests share one connection pool capped at ``concurrency`` connections,
+    and each request holds a slot of the backend's per-host ``scan_limits``.
+    Pause and stop are polled cooperatively, and stop cancels in-flight requests.
+    """
+
+    def __init__(self, backend, concurrency: int = DEFAULT_ASYNC_CONCURRENCY):
+        if aiohttp is None:
+            raise RuntimeError("The asyncio scan engine requires aiohttp")
+        self.backend = backend
+        self.ui_manager = backend.ui_manager
+        self.concurrency = max(1, int(concurrency))
+        self.frontier = CrawlFrontier(backend.crawl_priority)
+        self.listings_fetched = 0
+        self.entries_found = 0
+        self._files_listed: dict[str, int] = {}  # listing URL -> files of its current attempt
+        self._session = None
+        self._wake = None
+        self._slot_freed = None
+        self._head_tasks: set[asyncio.Task] = set()
+
+    def scan(self, base_url: str, root_url: str, resume=None) -> None:
+        """Crawl from root_url, keeping links in base_url's scope; blocks until done.
+
+        ``resume`` is a scan_index.ResumeState to continue from instead of root_url.
+        """
+        asyncio.run(self._scan(base_url, root_url, resume))
+
+    def _stopped(self) -> bool:
+        return self.backend.should_stop
+
+    async def _wait_if_paused(self) -> bool:
+        """Sleep while paused. Return False if a stop was requested meanwhile."""
+        while not self.ui_manager.scan_pause_event.is_set():
+            if self._stopped():
+                return False
+            await asyncio.sleep(0.2)
+        return not self._stopped()
+
+    def estimated_remaining(self) -> int:
+        if not self.listings_fetched:
+            return 0
+        return round(self.entries_found / self.listings_fetched * self.frontier.pending)
+
+    async def _scan(self, base_url: str, root_url: str, resume=None) -> None:
+        self._wake = asyncio.Event()
+        self._slot_freed = asyncio.Event()
+        # Same DNS caching as the requests session: none, or for its TTL
+        dns_cache = session_dns_cache(self.ui_manager.session)
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.concurrency,
+            use_dns_cache=dns_cache is not None,
+            ttl_dns_cache=dns_cache.ttl if dns_cache is not None else None,
+        )
+        async with aiohttp.ClientSession(
+            connector=connector,
+            timeout=_client_timeout(self.ui_manager.timeout),
+            headers={"User-Agent": self.ui_manager.USER_AGENT},
+        ) as session:
+            self._session = session
+            resumed = await self._seed(root_url, resume)
+            workers = [
+                asyncio.create_task(self._listing_worker(base_url))
+                for _ in range(self.concurrency)
+            ]
+            watcher = asyncio.create_task(self._watch_stop(workers))
+            await asyncio.gather(*workers, return_exceptions=True)
+            while self._head_tasks and not self._stopped():
+                await asyncio.wait(self._head_tasks, timeout=0.2)
+            watcher.cancel()
+            for task in self._head_tasks:
+                task.cancel()
+            await asyncio.gather(watcher, *self._head_tasks, return_exceptions=True)
+        if not self._stopped():
+            self.backend._set_total_urls(resumed + self.entries_found)
+
+    async def _seed(self, root_url, resume) -> int:
+        """Queue the first listings; for a resume also redo unprocessed items."""
+        if resume is None:
+            self._queue(root_url, 0)
+            return 0
+        self.frontier.mark_seen(resume.done_listings)
+        for url, depth in resume.pending_listings:
+            self._queue(url, depth)
+        for url_info in resume.unprocessed:
+            await self._process_entry(url_info)
+        return len(resume.results) + len(resume.unprocessed)
+
+    def _queue(self, url, depth) -> bool:
+        if not self.frontier.add(url, depth):
+            return False
+        self.backend._index_listing_queued(url, depth)
+        self._wake.set()
+        return True
+
+    async def _watch_stop(self, workers) -> None:
+        while not self._stopped():
+            await asyncio.sleep(0.2)
+        self.frontier.close()
+        for task in (*workers, *self._head_tasks):
+            task.cancel()
+
+    @contextlib.asynccontextmanager
+    async def _slot(self, url):
+        """Async counterpart of AdaptiveConcurrency.slot on the backend's scan limits."""
+        limits = self.backend.scan_limits
+        limiter = limits.limiter(url)
+        while not limits.try_acquire(limiter):
+            self._slot_freed.clear()
+            # A shared worker budget is also freed by other scans' threads
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._slot_freed.wait(), 0.2)
+        slot = Slot()
+        try:
+            yield slot
+        except BaseException as ex:
+            if isinstance(ex, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)):
+                slot.mark_overloaded()
+            limits.finish(limiter, slot, ex)
+            raise
+        else:
+            limits.finish(limiter, slot, None)
+        finally:
+            self._slot_freed.set()
+
+    async def _throttle(self, url, nbytes=None):
+        """Wait for the backend's per-host rate limits: one request, or nbytes of body."""
+        requests_bucket, bytes_bucket = self.backend.rate_limits.buckets(url)
+        bucket, amount = (requests_bucket, 1) if nbytes is None else (bytes_bucket, nbytes)
+        while True:
+            wait = bucket.try_take(amount)
+            if not wait:
+                return
+            await asyncio.sleep(min(wait, 0.2))
+
+    async def _next_listing(self):
+        while True:
+            item = self.frontier.try_get()
+            if item is not None or self.frontier.finished:
+                return item
+            self._wake.clear()
+            # Deferred retries become due without anyone setting _wake
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), self.frontier.next_due())
+
+    async def _listing_worker(self, base_url: str) -> None:
+        while True:
+            item = await self._next_listing()
+            if item is None:
+                self._wake.set()
+                return
+            url, depth = item
+            try:
+                if not await self._wait_if_paused() or not await self._wait_for_backlog():
+                    self.frontier.close()
+                    return
+                await self._crawl_listing(url, depth, base_url)
+                files = self._files_listed.pop(url, 0)
+                delay = self.backend.listing_retries.take_retry(url)
+                if delay is not None:
+                    self.entries_found -= files  # the retry lists them again
+                    self.frontier.defer(url, depth, delay)
+                    continue
+                if self.backend.listing_retries.gave_up(url):
+                    if not self._stopped():
+                        self.backend._index_listing_failed(url)
+                    continue
+                self.listings_fetched += 1
+                if not self._stopped():
+                    self.backend._index_listing_done(url)
+            finally:
+                self.frontier.task_done()
+                self._wake.set()
+
+    async def _wait_for_backlog(self) -> bool:
+        """Hold the crawl back while too many HEAD tasks are waiting (bounded memory)."""
+        while len(self._head_tasks) >= self.backend.scan_backlog:
+            if self._stopped():
+                return False
+            await asyncio.sleep(0.05)
+        return not self._stopped()
+
+    async def _crawl_listing(self, url: str, depth: int, base_url: str) -> None:
+        """Stream one listing page through the parser, handling entries as they appear."""
+        backend = self.backend
+        fingerprint = None
+        if backend.alias_detector is not None:
+            canonical = backend.alias_detector.claim(url)
+            if canonical is not None:
+                backend._log_alias(url, canonical)
+                return
+            fingerprint = backend.alias_detector.fingerprint(url)
+        completed = await self._read_listing(url, depth, base_url, fingerprint)
+        if not self._stopped():
+            await self._handle_url_infos(
+                url, depth, backend._alias_release(fingerprint, completed)
+            )
+
+    async def _read_listing(self, url: str, depth: int, base_url: str, fingerprint) -> bool:
+        """Handle url's entries; return True if the whole listing was read."""
+        backend = self.backend
+        try:
+            cached = backend._cached_subtree_entries(url)
+            if cached is not None:
+                await self._handle_entries(url, depth, base_url, cached, fingerprint)
+                return True
+            await self._throttle(url)
+            async with self._slot(url) as slot, self._session.get(
+                url, headers=backend._listing_request_headers(url)
+            ) as response:
+                slot.record_status(response.status)
+                if backend._redirected_alias(url, str(response.url)):
+                    return False
+                if response.status == 304:
+                    cached = backend._not_modified_entries(url)
+                    await self._handle_entries(url, depth, base_url, cached, fingerprint)
+                    return True
+                response.raise_for_status()
+                decoder = incremental_decoder(response.charset)
+                parser = backend._listing_parser_for(url, response.headers)
+                parsed = backend._listing_collector(response.headers)
+                async for chunk in response.content.iter_chunked(backend.listing_chunk_size):
+                    await self._throttle(url, len(chunk))
+                    parser.feed(decoder.decode(chunk))
+                    entries = parser.pop_entries()
+                    if parsed is not None:
+                        parsed.extend(entries)
+                    await self._handle_entries(url, depth, base_url, entries, fingerprint)
+                    if self._stopped():
+                        return False
+                parser.feed(decoder.decode(b"", final=True))
+                parser.close()
+                entries = parser.pop_entries()
+                if parsed is not None:
+                    parsed.extend(entries)
+                await self._handle_entries(url, depth, base_url, entries, fingerprint)
+                backend._remember_listing(url, response.headers, parsed)
+                return True
+        except StructuredListingError as ex:
+            if backend._structured_listing_failed(url, ex):
+                return await self._read_listing(url, depth, base_url, fingerprint)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as ex:
+            backend._listing_failed(url, ex)
+        return False
+
+    async def _handle_entries(self, page_url, depth, base_url, entries, fingerprint=None) -> None:
+        url_infos = self.backend._alias_hold(
+            fingerprint, self.backend._listing_url_infos(page_url, base_url, entries)
+        )
+        await self._handle_url_infos(page_url, depth, url_infos)
+
+    async def _handle_url_infos(self, page_url, depth, url_infos) -> None:
+        found = files = 0
+        for url_info in url_infos:
+            if url_info["is_directory"] and not self._queue(url_info["url"], depth + 1):
+                continue
+            self.backend._index_items_found([url_info])
+            await self._process_entry(url_info)
+            found += 1
+            files += not url_info["is_directory"]
+        if files:
+            self._files_listed[page_url] = self._files_listed.get(page_url, 0) + files
+        if found:
+            self.entries_found += found
+            self.backend._set_total_urls(
+                self.entries_found + self.estimated_remaining(), estimated=True
+            )
+
+    async def _process_entry(self, url_info) -> None:
+        if url_info["is_directory"]:
+            self.backend._process_directory(url_info["url"])
+            self.backend._count_scanned_item()
+        else:
+            await self._process_file(url_info)
+
+    async def _process_file(self, url_info) -> None:
+        """Emit from listing metadata right away; otherwise queue a HEAD task."""
+        url = url_info["url"]
+        try:
+            claim = self.backend._claim_file(url)
+            if claim is None:
+                self.backend._count_scanned_item()
+                return
+            if self.backend._emit_listed_file(url, claim, url_info):
+                self.backend._count_scanned_item()
+                return
+        except (OSError, ValueError) as ex:
+            self.backend._log(f"[Scan] Error processing file URL {url}: {str(ex)}")
+            self.backend._count_scanned_item()
+            return
+        task = asyncio.create_task(self._head_file(url, claim))
+        self._head_tasks.add(task)
+        task.add_done_callback(self._head_tasks.discard)
+
+    async def _head_file(self, url, claim) -> None:
+        if not await self._wait_if_paused():
+            self.backend._release_file(claim)
+            return
+        try:
+            await self._throttle(url)
+            async with self._slot(url) as slot, self._session.head(
+                url,
+                allow_redirects=True,
+                timeout=aiohttp.ClientTimeout(sock_connect=5, sock_read=10),
+            ) as response:
+                slot.record_status(response.status)
+            self.backend._emit_file_from_headers(url, claim, response.headers)
+        except asyncio.CancelledError:
+            self.backend._release_file(claim)
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError) as ex:
+            self.backend._log(f"[Scan] Could not process file {url}: {str(ex)}")
+            self.backend._release_file(claim)
+        except (OSError, ValueError) as ex:
+            self.backend._log(f"[Scan] Error processing file URL {url}: {str(ex)}")
+        self.backend._count_scanned_item()
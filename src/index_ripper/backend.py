@@ -4,16 +4,151 @@ It handles scanning websites and downloading files.
 """
 
 import concurrent.futures
+import functools
+import itertools
 import os
 import socket
-from queue import Queue
+import threading
+import time
 from urllib.parse import unquote, urljoin, urlparse
 
 import requests
-from bs4 import BeautifulSoup
 
-from index_ripper.utils import cleanup_partial_file, is_url_in_scope
+from index_ripper.aliases import AliasDetector
+from index_ripper.async_engine import (
+    DEFAULT_ASYNC_CONCURRENCY,
+    AsyncScanEngine,
+    async_engine_available,
+)
+from index_ripper.concurrency import AdaptiveConcurrency
+from index_ripper.connections import PoolStats, session_dns_cache, session_stats
+from index_ripper.crawler import CrawlPriority, DirectoryCrawler
+from index_ripper.disk_writer import (
+    DEFAULT_QUEUE_BLOCKS,
+    DEFAULT_READ_SIZE,
+    DEFAULT_WRITE_SIZE,
+    DiskWriter,
+    StageStats,
+    preallocate,
+)
+from index_ripper.lazy_scan import DEFAULT_PREFETCH, LazyScanner
+from index_ripper.listing import (
+    STRUCTURED_ACCEPT,
+    StructuredListingError,
+    guess_file_type,
+    incremental_decoder,
+    listing_format,
+    make_listing_parser,
+    parse_http_date,
+)
+from index_ripper.listing_flavors import FlavorParser, FlavorSniffer
+from index_ripper.progress import ProgressBoard
+from index_ripper.ratelimit import RateLimiter
+from index_ripper.resumable import PartialDownload, PartialMismatch
+from index_ripper.retries import ListingRetries, RetryPolicy, error_reason, is_transient
+from index_ripper.scan_index import ResumeState
+from index_ripper.scan_rules import ScanRules
+from index_ripper.segmented import (
+    DEFAULT_MAX_SEGMENTS,
+    DEFAULT_SEGMENT_THRESHOLD,
+    SegmentedDownload,
+)
+from index_ripper.utils import is_url_in_scope
 
+DEFAULT_SCAN_WORKERS = 10
+DEFAULT_SCAN_BACKLOG = 4096
+MAX_SCAN_CONCURRENCY = 64
+DEFAULT_DOWNLOAD_CONCURRENCY = 5
+MAX_DOWNLOAD_CONCURRENCY = 10
+_PART_SAVE_INTERVAL = 1.0  # seconds between sidecar saves of a preallocated download
+
+# Escaping a request slot with one of these counts as a sign of overload
+OVERLOAD_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.RetryError,
+    requests.exceptions.ChunkedEncodingError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+def _format_size(size_bytes):
+    return f"{size_bytes / 1024:.2f} KB"
+
+
+def _plural(count, one, many):
+    return f"{count} {one if count == 1 else many}"
+
+
+def _listing_root(url):
+    """Strip query and fragment so the start URL dedupes like crawled links."""
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
+
+
+_URL_INFO_FIELDS = ("url", "is_directory", "path", "size", "modified", "file_type")
+
+
+def _new_listing_stats():
+    return dict.fromkeys(("fetched", "not_modified", "reused", "pruned", "flavor_fallback"), 0)
+
+
+def _pack_url_info(url_info):
+    return tuple(url_info.get(name) for name in _URL_INFO_FIELDS)
+
+
+def _unpack_url_info(packed):
+    return dict(zip(_URL_INFO_FIELDS, packed))
+
+
+class _ScanTasks:
+    """Scan tasks on a thread pool, tracked by count rather than by keeping their futures."""
+
+    def __init__(self, executor, on_done):
+        self._executor = executor
+        self._on_done = on_done
+        self._cond = threading.Condition()
+        self._pending = 0
+        self.peak = 0
+
+    def submit(self, fn, *args):
+        with self._cond:
+            self._pending += 1
+            self.peak = max(self.peak, self._pending)
+        try:
+            future = self._executor.submit(fn, *args)
+        except RuntimeError:  # pool shut down after a stop
+            self._finished()
+            return
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        try:
+            self._on_done(future)
+        finally:
+            self._finished()
+
+    def _finished(self):
+        with self._cond:
+            self._pending -= 1
+            self._cond.notify_all()
+
+    def wait_below(self, limit, should_stop):
+        """Block until fewer than limit tasks are pending. Return False if should_stop()."""
+        with self._cond:
+            while self._pending >= limit:
+                if should_stop():
+                    return False
+                self._cond.wait(0.2)
+        return not should_stop()
+
+    def join(self, should_stop):
+        """Wait for every task. Return False if should_stop() fired first."""
+        return self.wait_below(1, should_stop)
+
+    def cancel(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
 
 
 class Backend:
@@ -28,6 +163,90 @@ class Backend:
         """
         self.ui_manager = ui_manager
         self.should_stop = False
+        self.scan_workers = DEFAULT_SCAN_WORKERS
+        # Emit items while listings are still being crawled instead of after discovery
+        self.streaming_scan = True
+        # Listing parser backend, see index_ripper.listing; None = fastest installed
+        self.listing_parser = None
+        self.listing_chunk_size = 64 * 1024
+        # Ask for JSON/XML listings; each host's answer to the first request
+        # decides whether it keeps being asked (see _listing_request_headers)
+        self.structured_listings = True
+        self._listing_formats = {}
+        self._structured_fallback = set()  # hosts whose JSON/XML could not be read
+        # Recognize nginx/Apache autoindex pages per host and use a line extractor
+        # for them instead of the generic parser (see listing_flavors)
+        self.listing_flavors = True
+        self._host_flavors = {}
+        # "threads" (worker pool + requests) or "asyncio" (aiohttp, see async_engine)
+        self.scan_engine = "threads"
+        self.async_concurrency = DEFAULT_ASYNC_CONCURRENCY
+        # Per-host AIMD limits; scan_workers is the starting point, not a cap
+        self.scan_limits = AdaptiveConcurrency(
+            DEFAULT_SCAN_WORKERS,
+            max_limit=MAX_SCAN_CONCURRENCY,
+            overload_errors=OVERLOAD_ERRORS,
+            on_change=lambda *change: self._on_limit_change("scan", *change),
+        )
+        self.download_limits = AdaptiveConcurrency(
+            DEFAULT_DOWNLOAD_CONCURRENCY,
+            max_limit=MAX_DOWNLOAD_CONCURRENCY,
+            overload_errors=OVERLOAD_ERRORS,
+            on_change=lambda *change: self._on_limit_change("download", *change),
+        )
+        # Per-host requests/s and bytes/s caps (0 = unlimited), see set_rate_limits
+        self.rate_limits = RateLimiter()
+        # ETag/Last-Modified cache for conditional re-scans; None disables it
+        self.listing_cache = None
+        # Serve every listing below a 304 directory from the cache, no request.
+        # Only safe when a change anywhere below bumps the directory's validator.
+        self.trust_unchanged_subtrees = False
+        self._unchanged_listings = set()
+        self._listing_stats = _new_listing_stats()
+        # Include/exclude/depth/extension pruning applied while crawling (see scan_rules)
+        self.scan_rules = ScanRules()
+        # Order in which queued directories are fetched (shallow-first by default)
+        self.crawl_priority = CrawlPriority()
+        self._scan_frontier = None
+        # Most scan tasks queued at once; the crawl waits for room beyond this
+        self.scan_backlog = DEFAULT_SCAN_BACKLOG
+        # Listing fingerprints and redirects that catch aliased trees and loops
+        self.alias_detector = AliasDetector()
+        # List only the start page; folders are listed on expand (see lazy_scan)
+        self.lazy_scan = False
+        self.lazy_prefetch = DEFAULT_PREFETCH
+        self.lazy_scanner = None
+        # Failed listings: deferred retries during the scan, report at the end
+        self.listing_retries = ListingRetries()
+        self._failed_scan_root = None
+        # SQLite checkpoint of scans (see scan_index); None keeps scans in memory only
+        self.scan_index = None
+        self._index_root = None
+        self._progress_lock = threading.Lock()
+        # Connection pool counters at the last report, per traffic kind
+        self._pool_marks = {}
+        # Keep interrupted downloads as .part files and continue them (see resumable)
+        self.resume_downloads = True
+        # Files of at least segment_threshold bytes (0 = never) are fetched over
+        # up to max_segments Range connections at once (see segmented)
+        self.segment_threshold = DEFAULT_SEGMENT_THRESHOLD
+        self.max_segments = DEFAULT_MAX_SEGMENTS
+        # Network reads of download_block_size bytes are written to disk on a writer
+        # thread in blocks of write_block_size, with up to write_queue_blocks of them
+        # in flight (see disk_writer)
+        self.download_block_size = DEFAULT_READ_SIZE
+        self.write_block_size = DEFAULT_WRITE_SIZE
+        self.write_queue_blocks = DEFAULT_QUEUE_BLOCKS
+        self.preallocate_downloads = True
+        self.write_stats = StageStats()
+        self._write_stats_lock = threading.Lock()
+        # Retries of a download that broke off; each continues from the last byte written
+        self.download_retries = RetryPolicy(attempts=5, base_delay=1.0, max_delay=30.0)
+        # Download progress per file and per batch (see progress). With push_progress,
+        # ui_manager.update_progress gets throttled per-file updates; the app turns
+        # it off and drains download_progress.snapshot() from its own loop instead.
+        self.download_progress = ProgressBoard()
+        self.push_progress = True
 
     def _log(self, message):
         try:
@@ -35,6 +254,28 @@ class Backend:
         except AttributeError:
             print(message)
 
+    def _on_limit_change(self, kind, host, old, new, reason):
+        self._log(f"[Concurrency] {kind} limit for {host}: {old} -> {new} ({reason})")
+        limits = self.scan_limits if kind == "scan" else self.download_limits
+        self._call_ui_hook("on_concurrency_changed", kind=kind, limits=limits.limits())
+
+    def set_rate_limits(self, requests_per_second=None, bytes_per_second=None, host=None):
+        """Change the per-host request and byte rates; applies to running work too.
+
+        None keeps the current value and 0 removes the limit. With ``host``
+        (a netloc such as "mirror.example.com") only that host is changed.
+        """
+        self.rate_limits.configure(requests_per_second, bytes_per_second, host=host)
+        rps, bps = self.rate_limits.limits(host)
+        target = host or "every host"
+        self._log(
+            f"[RateLimit] {target}: "
+            f"{rps:g} requests/s, {bps:g} bytes/s (0 = unlimited)"
+        )
+
+    def _scan_stopped(self):
+        return self.should_stop
+
     def _notify(self, kind: str, title: str, message: str) -> None:
         if kind == "info":
             handler_name = "notify_info"
@@ -63,73 +304,56 @@ class Backend:
                 return False
         return False
 
-    def scan_website(self, url):
-        """Scans the website to find all files and directories."""
+    def scan_website(self, url, resume=False, retry_failed=False):
+        """Scans the website to find all files and directories.
+
+        With ``resume`` and a scan_index, a stopped or crashed scan of the same
+        URL continues from its last checkpoint; a finished one is reloaded from
+        the index without network access. With ``retry_failed``, only the
+        directories the previous scan of url could not list are crawled again
+        (see failed_listings).
+        """
+        completed = False
         try:
             self.ui_manager.is_scanning = True
             self._call_ui_hook("on_scan_started", url=url)
+            self._unchanged_listings = set()
+            self._listing_stats = _new_listing_stats()
+            if self.alias_detector is not None:
+                self.alias_detector.reset()
+            if retry_failed:
+                resume_state = self._retry_failed_state(url)
+            else:
+                self.listing_retries.reset()
+                resume_state = self._begin_scan_index(url, resume)
+            self._failed_scan_root = _listing_root(url)
+            self._mark_connection_stats("scan")
+            self.close_lazy_scan()
 
-            all_urls = self._get_all_urls(url)
-            self.ui_manager.total_urls = len(all_urls)
-            self._call_ui_hook(
-                "on_scan_progress",
-                scanned_urls=self.ui_manager.scanned_urls,
-                total_urls=self.ui_manager.total_urls,
-            )
-
-            with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-                # Use a queue to manage tasks to allow for pausing
-                task_queue = Queue()
-                for url_info in all_urls:
-                    task_queue.put(url_info)
-
-                futures = []
-                while not task_queue.empty():
-                    if self.should_stop:
-                        break
-                    self.ui_manager.scan_pause_event.wait()  # Pause here
-
-                    url_info = task_queue.get()
-                    if url_info["is_directory"]:
-                        futures.append(
-                            executor.submit(self._process_directory, url_info["url"])
-                        )
+            if self.lazy_scan:
+                self._start_lazy_scan(url)
+            elif self._use_async_engine():
+                engine = AsyncScanEngine(self, self.async_concurrency)
+                self._scan_frontier = engine.frontier
+                engine.scan(url, _listing_root(url), resume_state)
+            else:
+                with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self._scan_pool_size()
+                ) as executor:
+                    tasks = _ScanTasks(executor, self._on_scan_task_done)
+                    if self.streaming_scan:
+                        self._stream_scan(url, tasks, resume_state)
                     else:
-                        futures.append(
-                            executor.submit(self._process_file, url_info["url"])
-                        )
+                        self._batch_scan(url, tasks, resume_state)
+                    self._drain_scan_tasks(tasks)
+            completed = not self.should_stop
 
-                for future in concurrent.futures.as_completed(futures):
-                    # Respect pause while consuming completed futures, to freeze progress bar
-                    self.ui_manager.scan_pause_event.wait()
-                    if self.should_stop:
-                        # Cancel remaining futures
-                        for future_item in futures:
-                            if not future_item.done():
-                                future_item.cancel()
-                        break
-                    try:
-                        future.result()
-                    except (
-                        requests.RequestException,
-                        socket.timeout,
-                        concurrent.futures.CancelledError,
-                    ) as ex:
-                        # Log errors to UI log panel as well
-                        try:
-                            self.ui_manager.log_message(f"[Scan] Error: {str(ex)}")
-                        except AttributeError:
-                            pass
-                    finally:
-                        if self.ui_manager.is_scanning:
-                            self.ui_manager.scanned_urls += 1
-                            self._call_ui_hook(
-                                "on_scan_progress",
-                                scanned_urls=self.ui_manager.scanned_urls,
-                                total_urls=self.ui_manager.total_urls,
-                            )
-
-            if not self.should_stop:
+            self._log_limits("scan", self.scan_limits)
+            self._log_connection_stats("scan")
+            self._log_listing_stats()
+            self._log_alias_stats()
+            self._report_failed_listings()
+            if not self.should_stop and not self.lazy_scan:
                 if not self.ui_manager.files_dict:
                     self._notify("info", "Info", "No files found")
                 else:
@@ -148,203 +372,1052 @@ class Backend:
                     "error", "Error", f"An unknown error occurred during scan: {str(ex)}"
                 )
         finally:
+            self._scan_frontier = None
+            self._end_scan_index(completed)
+            if self.listing_cache is not None:
+                self.listing_cache.save()
             self.ui_manager.is_scanning = False
             self.ui_manager.scan_pause_event.set()
             self._call_ui_hook("on_scan_finished", stopped=self.should_stop)
 
-    def _get_all_urls(self, url, scanned_urls=None, base_url=None):
-        """Get all URLs that need to be processed"""
-        if scanned_urls is None:
-            scanned_urls = set()
-            base_url = url
+    def failed_listings(self, url):
+        """Directories the last scan of url could not list, with their last error."""
+        if self._failed_scan_root != _listing_root(url):
+            return {}
+        return self.listing_retries.failures
 
-        if base_url is None:
-            base_url = url
+    def _retry_failed_state(self, url):
+        """Crawl state that starts from the previous scan's failed directories only."""
+        failed = self.failed_listings(url)
+        self.listing_retries.reset()
+        self._index_root = None  # a partial rescan must not replace the checkpoint
+        root_path = urlparse(_listing_root(url)).path
+        pending = [
+            (failed_url, urlparse(failed_url).path[len(root_path):].count("/"))
+            for failed_url in failed
+        ]
+        self._log(f"[Scan] Retrying {len(pending)} directories that could not be listed")
+        return ResumeState(pending_listings=pending)
 
-        parsed = urlparse(url)
-        url = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
-        normalized_url = url + "/" if url.endswith("/") else url
+    def focus_scan(self, url=None, term=None):
+        """Move queued directories at or below url, or whose path contains term,
+        to the front of the running scan's frontier."""
+        frontier = self._scan_frontier
+        if frontier is not None:
+            frontier.focus(url=url, term=term)
 
-        if normalized_url in scanned_urls:
-            return []
+    def _start_lazy_scan(self, url):
+        """List the start page only; the rest is listed by expand_directory."""
+        self.lazy_scanner = LazyScanner(self, url, prefetch=self.lazy_prefetch)
+        count = self.lazy_scanner.expand(_listing_root(url)).result()
+        self._set_total_urls(count)
+        self._log(f"[Scan] Listed {count} items; folders are listed when expanded")
+
+    def expand_directory(self, url):
+        """List a folder of the current lazy scan. Return a future, or None if
+        there is no lazy scan (or the folder was already listed)."""
+        scanner = self.lazy_scanner
+        if scanner is None or scanner.is_expanded(url):
+            return None
+        try:
+            return scanner.expand(url)
+        except RuntimeError:  # scanner closed
+            return None
+
+    def close_lazy_scan(self):
+        if self.lazy_scanner is not None:
+            self.lazy_scanner.close()
+            self.lazy_scanner = None
+
+    def _scan_pool_size(self):
+        """Enough threads for the per-host limit to ramp all the way up,
+        but no more than a shared worker budget lets run at once."""
+        if not self.scan_limits.enabled:
+            size = self.scan_workers
+        else:
+            size = max(self.scan_workers, self.scan_limits.max_limit)
+        budget = self.scan_limits.budget
+        return size if budget is None else min(size, budget.limit)
+
+    def connection_pool_sizes(self):
+        """Connections each session's per-host pool should keep: one per worker
+        that can have a request in flight on it."""
+        return {"scan": self._scan_pool_size(), "download": self.download_limits.max_limit}
+
+    def _download_session(self):
+        """Downloads use their own session when the UI has one, so they cannot
+        take every pooled connection away from scan requests."""
+        return getattr(self.ui_manager, "download_session", None) or self.ui_manager.session
+
+    def _session_for(self, kind):
+        return self._download_session() if kind == "download" else self.ui_manager.session
+
+    def _mark_connection_stats(self, kind):
+        stats = session_stats(self._session_for(kind))
+        if stats is not None:
+            self._pool_marks[kind] = stats
+
+    def _log_connection_stats(self, kind):
+        """Log connection reuse on kind's session since the last report."""
+        stats = session_stats(self._session_for(kind))
+        if stats is None:
+            return
+        delta = stats - self._pool_marks.get(kind, PoolStats())
+        self._pool_marks[kind] = stats
+        if not delta.requests:
+            return
+        message = f"[Connections] {kind}: {delta.format()}"
+        dns_cache = session_dns_cache(self._session_for(kind))
+        if dns_cache is not None:
+            message += f"; DNS: {dns_cache.format()}"
+        self._log(message)
+        self._call_ui_hook("on_connection_stats", kind=kind, stats=delta)
 
-        scanned_urls.add(normalized_url)
+    def _log_limits(self, kind, limits):
+        current = limits.limits()
+        if current:
+            summary = ", ".join(f"{host}={limit}" for host, limit in current.items())
+            self._log(f"[Concurrency] {kind} limits: {summary}")
+
+    def _use_async_engine(self):
+        if self.scan_engine != "asyncio":
+            return False
+        if not async_engine_available():
+            self._log("[Scan] aiohttp is not installed; using the threaded scan engine")
+            return False
+        return True
+
+    def _batch_scan(self, url, tasks, resume=None):
+        """Discover every URL first, then process them all."""
+        all_urls = self._discover_urls(url, resume)
+        unprocessed = resume.unprocessed if resume is not None else []
+        self._set_total_urls(len(unprocessed) + len(all_urls) + self._resumed_count(resume))
+
+        for url_info in itertools.chain(unprocessed, map(_unpack_url_info, all_urls)):
+            if not self._wait_scan_pause() or not self._wait_scan_backlog(tasks):
+                break
+            tasks.submit(self._run_scan_task, url_info)
+
+    def _stream_scan(self, url, tasks, resume=None):
+        """Process items as soon as their listing is parsed, while crawling continues.
+
+        The crawler is held back between listings while the task backlog is
+        full, so memory stays bounded however fast listings outrun HEADs.
+        """
+        resumed = self._resumed_count(resume)
+        if resume is not None:
+            for url_info in resume.unprocessed:
+                tasks.submit(self._run_scan_task, url_info)
+
+        def on_listing(_page_url, entries):
+            for url_info in entries:
+                tasks.submit(self._run_scan_task, url_info)
+            self._set_total_urls(
+                resumed + crawler.entries_found + crawler.estimated_remaining(),
+                estimated=True,
+            )
+
+        crawler = self._make_crawler(
+            url, on_listing, wait_for_capacity=lambda: self._wait_scan_backlog(tasks)
+        )
+        self._crawl(crawler, url, resume)
+        self._set_total_urls(resumed + crawler.entries_found)
+
+    def _wait_scan_backlog(self, tasks):
+        """Block while scan_backlog tasks are waiting. Return False on stop."""
+        return tasks.wait_below(self.scan_backlog, self._scan_stopped)
+
+    @staticmethod
+    def _resumed_count(resume):
+        """Items a resumed scan already knows about before crawling."""
+        if resume is None:
+            return 0
+        return len(resume.results) + len(resume.unprocessed)
+
+    def _crawl(self, crawler, url, resume=None):
+        if resume is None:
+            crawler.crawl(_listing_root(url))
+        else:
+            crawler.crawl(_listing_root(url), resume.pending_listings, resume.done_listings)
+
+    def _wait_scan_pause(self):
+        """Block while the scan is paused. Return False if a stop was requested."""
+        while not self.ui_manager.scan_pause_event.wait(0.2):
+            if self.should_stop:
+                return False
+        return not self.should_stop
+
+    def _run_scan_task(self, url_info):
+        if not self._wait_scan_pause():
+            return
+        if url_info["is_directory"]:
+            self._process_directory(url_info["url"])
+        else:
+            self._process_file(url_info["url"], url_info)
+
+    def _on_scan_task_done(self, future):
+        if future.cancelled():
+            return
+        ex = future.exception()
+        if ex is not None:
+            self._log(f"[Scan] Error: {str(ex)}")
+        self._count_scanned_item()
+
+    def _count_scanned_item(self):
+        with self._progress_lock:
+            if not self.ui_manager.is_scanning or self.should_stop:
+                return
+            self.ui_manager.scanned_urls += 1
+        self._report_scan_progress()
+
+    def _set_total_urls(self, total, estimated=False):
+        with self._progress_lock:
+            self.ui_manager.total_urls = total
+        self._report_scan_progress(estimated=estimated)
+
+    def _report_scan_progress(self, estimated=False):
+        with self._progress_lock:
+            scanned = self.ui_manager.scanned_urls
+            total = max(self.ui_manager.total_urls, scanned)
+        self._call_ui_hook(
+            "on_scan_progress",
+            scanned_urls=scanned,
+            total_urls=total,
+            estimated=estimated,
+        )
+
+    def _drain_scan_tasks(self, tasks):
+        """Wait for queued scan tasks, cancelling whatever is left on stop."""
+        if not tasks.join(self._scan_stopped):
+            tasks.cancel()
+        self._log_scan_backlog(tasks)
+
+    def _log_scan_backlog(self, tasks):
+        if tasks.peak >= self.scan_backlog:
+            self._log(f"[Scan] Task backlog peaked at {tasks.peak} (limit {self.scan_backlog})")
+
+    def _make_crawler(self, url, on_listing, wait_for_capacity=None):
+        def checkpointed_listing(page_url, entries):
+            self._index_items_found(entries)
+            on_listing(page_url, entries)
+
+        indexed = self._index_root is not None
+        crawler = DirectoryCrawler(
+            lambda page_url: self._list_directory(page_url, url),
+            workers=self._scan_pool_size(),
+            pause_event=self.ui_manager.scan_pause_event,
+            should_stop=lambda: self.should_stop,
+            on_listing=checkpointed_listing if indexed else on_listing,
+            on_queued=self._index_listing_queued if indexed else None,
+            on_listed=self._index_listing_done if indexed else None,
+            priority=self.crawl_priority,
+            wait_for_capacity=wait_for_capacity,
+            retry_after=self.listing_retries.take_retry,
+            gave_up=self.listing_retries.gave_up,
+            on_failed=self._index_listing_failed if indexed else None,
+        )
+        self._scan_frontier = crawler.frontier
+        return crawler
+
+    def _get_all_urls(self, url, resume=None):
+        """Get all URLs that need to be processed"""
+        return [_unpack_url_info(packed) for packed in self._discover_urls(url, resume)]
+
+    def _discover_urls(self, url, resume=None):
+        """Crawl everything and return the url_infos packed as tuples (~4x smaller than dicts)."""
         urls = []
+        urls_lock = threading.Lock()
 
-        try:
-            response = self.ui_manager.session.get(
-                url,
-                timeout=self.ui_manager.timeout,
-                headers={"User-Agent": self.ui_manager.USER_AGENT},
+        def collect(_page_url, entries):
+            packed = [_pack_url_info(url_info) for url_info in entries]
+            with urls_lock:
+                urls.extend(packed)
+
+        crawler = self._make_crawler(url, collect)
+        self._crawl(crawler, url, resume)
+        return urls
+
+    # --- scan index checkpoints (no-ops unless scan_index is set) ---
+
+    def saved_scan_status(self, url):
+        """"finished", "interrupted" or None for the scan index's record of url."""
+        if self.scan_index is None:
+            return None
+        return self.scan_index.status(_listing_root(url))
+
+    def _begin_scan_index(self, url, resume):
+        """Start checkpointing this scan. When resuming, replay what the index
+        already holds and return its ResumeState; otherwise return None."""
+        self._index_root = None
+        if self.scan_index is None or self.lazy_scan:
+            return None
+        root = _listing_root(url)
+        self._index_root = root
+        if resume and self.scan_index.status(root) is not None:
+            self.scan_index.reopen(root)
+            state = self.scan_index.resume_state(root)
+            self._log(
+                f"[Scan] Resuming {root}: {len(state.results)} items restored, "
+                f"{len(state.unprocessed)} to process, "
+                f"{len(state.pending_listings)} listings left"
+                + (f" ({len(state.failed_listings)} failed before)" if state.failed_listings else "")
             )
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
-            unique_urls = set()
-
-            for link in soup.find_all("a"):
-                href = link.get("href")
-                if not href or href in [".", "..", "/"] or href.startswith("?"):
-                    continue
-                full_url = urljoin(url, href)
-                if not full_url or not is_url_in_scope(base_url, full_url):
-                    continue
-
-                parsed_full = urlparse(full_url)
-                path = parsed_full.path
-                if not path:
-                    path = "/"
-
-                final_url = f"{parsed_full.scheme}://{parsed_full.netloc}{path}"
-
-                is_directory_hint = href.endswith("/")
-                if is_directory_hint:
-                    if not final_url.endswith("/"):
-                        final_url += "/"
-                else:
-                    if final_url.endswith("/") and "." in os.path.basename(
-                        final_url[:-1]
-                    ):
-                        final_url = final_url[:-1]
-
-                if final_url in unique_urls or final_url in scanned_urls:
-                    continue
-
-                unique_urls.add(final_url)
-                is_directory = final_url.endswith("/")
-                url_info = {
-                    "url": final_url,
-                    "is_directory": is_directory,
-                    "path": path,
-                }
-                urls.append(url_info)
-
-                if is_directory and final_url not in scanned_urls:
-                    urls.extend(self._get_all_urls(final_url, scanned_urls, base_url))
-            return urls
+            self._replay_scan_results(state.results)
+            return state
+        self.scan_index.start(root)
+        return None
+
+    def _end_scan_index(self, completed):
+        if self._index_root is None:
+            return
+        if completed:
+            self.scan_index.finish(self._index_root)
+        else:
+            self.scan_index.flush()
+        self._index_root = None
+
+    def _replay_scan_results(self, results):
+        """Feed recorded on_scan_item payloads back to the UI, no network."""
+        self._set_total_urls(len(results))
+        for payload in results:
+            if self.should_stop:
+                return
+            if not payload.get("is_directory") and self._claim_file(payload["url"]) is None:
+                continue
+            self._call_ui_hook("on_scan_item", **payload)
+            self._count_scanned_item()
+
+    def _index_listing_queued(self, url, depth):
+        if self._index_root is not None:
+            self.scan_index.listing_queued(self._index_root, url, depth)
+
+    def _index_listing_done(self, url):
+        if self._index_root is not None:
+            self.scan_index.listing_done(self._index_root, url)
+
+    def _index_listing_failed(self, url):
+        if self._index_root is not None:
+            self.scan_index.listing_failed(self._index_root, url)
+
+    def _index_items_found(self, entries):
+        if self._index_root is not None:
+            for url_info in entries:
+                self.scan_index.item_found(self._index_root, url_info)
+
+    def _index_item_done(self, payload):
+        if self._index_root is not None:
+            self.scan_index.item_done(self._index_root, payload["url"], payload)
+
+    def _list_directory(self, url, base_url):
+        """Fetch one listing page and yield its in-scope entries as url_info dicts.
+
+        The body is streamed through an incremental parser, so entries are
+        yielded as soon as they are recognized. With an alias_detector,
+        subdirectories are yielded only once the page is complete and known
+        not to duplicate a listing already seen (see aliases).
+        """
+        detector = self.alias_detector
+        if detector is None:
+            yield from self._fetch_listing(url, base_url, None)
+            return
+        canonical = detector.claim(url)
+        if canonical is not None:
+            self._log_alias(url, canonical)
+            return
+        fingerprint = detector.fingerprint(url)
+        completed = yield from self._fetch_listing(url, base_url, fingerprint)
+        if not self.should_stop:
+            yield from self._alias_release(fingerprint, completed)
+
+    def _fetch_listing(self, url, base_url, fingerprint):
+        """Yield url's url_infos; return True if the whole listing was read."""
+        try:
+            cached = self._cached_subtree_entries(url)
+            if cached is not None:
+                yield from self._alias_hold(
+                    fingerprint, self._listing_url_infos(url, base_url, cached)
+                )
+                return True
+            if not self.rate_limits.wait_request(url, self._scan_stopped):
+                return False
+            with self.scan_limits.slot(url, self._scan_stopped) as slot:
+                if slot is None:
+                    return False
+                response = self.ui_manager.session.get(
+                    url,
+                    stream=True,
+                    timeout=self.ui_manager.timeout,
+                    headers=self._listing_request_headers(url),
+                )
+                try:
+                    slot.record_status(response.status_code)
+                    if self._redirected_alias(url, response.url):
+                        return False
+                    if response.status_code == 304:
+                        cached = self._not_modified_entries(url)
+                        yield from self._alias_hold(
+                            fingerprint, self._listing_url_infos(url, base_url, cached)
+                        )
+                        return True
+                    response.raise_for_status()
+                    parsed = self._listing_collector(response.headers)
+                    for entry in self._iter_listing_entries(response, url):
+                        if parsed is not None:
+                            parsed.append(entry)
+                        url_info = self._listing_url_info(url, base_url, entry)
+                        if url_info is not None and (
+                            fingerprint is None or fingerprint.add(url_info)
+                        ):
+                            yield url_info
+                    self._remember_listing(url, response.headers, parsed)
+                    return True
+                finally:
+                    response.close()
+        except StructuredListingError as ex:
+            if self._structured_listing_failed(url, ex):
+                return (yield from self._fetch_listing(url, base_url, fingerprint))
         except (requests.RequestException, socket.timeout) as ex:
-            self._log(f"[Scan] Error getting URL list for {url}: {str(ex)}")
+            self._listing_failed(url, ex)
+        return False
+
+    # --- failed listings (see retries) ---
+
+    def _listing_failed(self, url, error):
+        """Record a failed listing; the crawler re-queues it if a retry is due.
+
+        Lazy scans have no frontier to re-queue into, so they only record.
+        """
+        retry = self._scan_frontier is not None and not self.should_stop
+        delay = self.listing_retries.failed(url, error, retry=retry)
+        if delay is None:
+            self._log(f"[Scan] Error getting URL list for {url}: {str(error)}")
+        else:
+            self._log(
+                f"[Scan] Error getting URL list for {url}: {str(error)}; "
+                f"retrying in {delay:.1f}s"
+            )
+
+    def _report_failed_listings(self):
+        retries = self.listing_retries
+        if retries.recovered:
+            self._log(f"[Scan] {retries.recovered} directories were listed after a retry")
+        failures = retries.failures
+        if not failures:
+            return
+        self._log(
+            f"[Scan] {len(failures)} directories could not be listed; their contents are "
+            "missing. Scan the same URL again to retry only these:"
+        )
+        for url, error in itertools.islice(failures.items(), 20):
+            self._log(f"[Scan]   {url}: {error}")
+        if len(failures) > 20:
+            self._log(f"[Scan]   ... and {len(failures) - 20} more")
+        self._call_ui_hook("on_scan_failures", failed=failures)
+
+    # --- alias / loop detection (no-ops unless alias_detector is set) ---
+
+    @staticmethod
+    def _alias_hold(fingerprint, url_infos):
+        """Pass url_infos on, holding back subdirectories for the alias check."""
+        for url_info in url_infos:
+            if fingerprint is None or fingerprint.add(url_info):
+                yield url_info
+
+    def _alias_release(self, fingerprint, completed=True):
+        """Subdirectories of a completed listing, or none if it duplicates another.
+
+        A listing that failed part way is not fingerprinted: its digest would
+        cover only the entries read, so its subdirectories are passed on as is.
+        """
+        if fingerprint is None:
             return []
+        if not completed:
+            return fingerprint.held
+        held, canonical = self.alias_detector.finish(fingerprint)
+        if canonical is not None:
+            self._log_alias(fingerprint.url, canonical)
+        return held
+
+    def _redirected_alias(self, url, final_url):
+        """True if url redirected to a listing this scan already read."""
+        if self.alias_detector is None or not isinstance(final_url, str):
+            return False
+        canonical = self.alias_detector.redirected(url, final_url)
+        if canonical is None:
+            return False
+        self._log_alias(url, canonical)
+        return True
+
+    def _log_alias(self, url, canonical):
+        self._log(f"[Scan] {url} duplicates {canonical}; linked instead of crawled again")
+        self._call_ui_hook(
+            "on_scan_alias",
+            url=url,
+            canonical=canonical,
+            path=urlparse(url).path.rstrip("/"),
+            canonical_path=urlparse(canonical).path.rstrip("/"),
+        )
+
+    def _log_alias_stats(self):
+        detector = self.alias_detector
+        if detector is None or not detector.aliases:
+            return
+        self._log(
+            f"[Scan] Aliases: {len(detector.aliases)} duplicate listings linked, "
+            f"at least {detector.requests_avoided} listing requests avoided"
+        )
+
+    def _listing_url_infos(self, page_url, base_url, entries):
+        for entry in entries:
+            url_info = self._listing_url_info(page_url, base_url, entry)
+            if url_info is not None:
+                yield url_info
+
+    def _listing_request_headers(self, url):
+        headers = {"User-Agent": self.ui_manager.USER_AGENT}
+        host = urlparse(url).netloc
+        if (
+            self.structured_listings
+            and self._listing_formats.get(host) != "html"
+            and host not in self._structured_fallback
+        ):
+            headers["Accept"] = STRUCTURED_ACCEPT
+        if self.listing_cache is not None:
+            headers.update(self.listing_cache.request_headers(url))
+        return headers
+
+    def _listing_parser_for(self, url, headers):
+        """Parser for a listing response; remembers which format and flavour the host serves."""
+        content_type = headers.get("content-type")
+        kind = listing_format(content_type)
+        host = urlparse(url).netloc
+        if self._listing_formats.get(host) != kind:
+            if host not in self._listing_formats and kind != "html":
+                self._log(f"[Scan] {host} serves {kind.upper()} listings; using the structured parser")
+            self._listing_formats[host] = kind
+        if kind != "html" or not self.listing_flavors:
+            return make_listing_parser(content_type, self.listing_parser)
+        flavor = self._host_flavors.get(host)
+        if flavor is not None:
+            return FlavorParser(
+                flavor, self.listing_parser, lambda: self._count_listing("flavor_fallback")
+            )
+        return FlavorSniffer(
+            headers.get("server"),
+            lambda found: self._lock_listing_flavor(host, found),
+            self.listing_parser,
+        )
+
+    def _lock_listing_flavor(self, host, flavor):
+        if self._host_flavors.setdefault(host, flavor) == flavor:
+            self._log(f"[Scan] {host} serves {flavor} listings; using its line extractor")
+
+    def _structured_listing_failed(self, url, error):
+        """Fall back to HTML listings for url's host. True if url should be fetched again."""
+        host = urlparse(url).netloc
+        retry = self.structured_listings and host not in self._structured_fallback
+        self._structured_fallback.add(host)
+        self._log(f"[Scan] Unreadable listing at {url} ({error}); asking {host} for HTML instead")
+        return retry and not self.should_stop
+
+    def _count_listing(self, kind):
+        with self._progress_lock:
+            self._listing_stats[kind] += 1
+
+    def _cached_subtree_entries(self, url):
+        """Cached entries for url when its parent answered 304 and subtrees are trusted."""
+        if self.listing_cache is None or not self.trust_unchanged_subtrees:
+            return None
+        parent = url.rstrip("/").rsplit("/", 1)[0] + "/"
+        with self._progress_lock:
+            if parent not in self._unchanged_listings:
+                return None
+        entries = self.listing_cache.entries(url)
+        if entries is not None:
+            with self._progress_lock:
+                self._unchanged_listings.add(url)
+            self._count_listing("reused")
+        return entries
+
+    def _not_modified_entries(self, url):
+        """Entries to replay for a 304 answer to a conditional listing request."""
+        entries = self.listing_cache.entries(url) if self.listing_cache is not None else None
+        if entries is None:
+            self._log(f"[Scan] {url} answered 304 but no cached listing exists")
+            return []
+        with self._progress_lock:
+            self._unchanged_listings.add(url)
+        self._count_listing("not_modified")
+        return entries
+
+    def _listing_collector(self, headers):
+        """A list to collect a page's entries in for the listing cache, or None when
+        the page is not cached: no cache, or no validators to revalidate it with.
+        Otherwise entries stream through without being kept."""
+        if self.listing_cache is None or not (headers.get("etag") or headers.get("last-modified")):
+            return None
+        return []
+
+    def _remember_listing(self, url, headers, entries):
+        """Cache a completely parsed listing together with its validators."""
+        self._count_listing("fetched")
+        if self.listing_cache is None or self.should_stop:
+            return
+        if entries is None:
+            self.listing_cache.store(url, None, None, [])  # forget an older copy
+            return
+        self.listing_cache.store(
+            url, headers.get("etag"), headers.get("last-modified"), entries
+        )
+
+    def _scan_rules_allow(self, base_url, final_url):
+        """Check final_url against scan_rules, relative to the start URL's directory."""
+        if not self.scan_rules.active:
+            return True
+        root_path = urlparse(base_url).path.rsplit("/", 1)[0] + "/"
+        path = urlparse(final_url).path
+        if not path.startswith(root_path):
+            return True
+        return self.scan_rules.allows(unquote(path[len(root_path):]), final_url.endswith("/"))
+
+    def _log_listing_stats(self):
+        stats = self._listing_stats
+        if stats["pruned"]:
+            self._log(f"[Scan] Scan rules skipped {stats['pruned']} entries")
+        if stats["flavor_fallback"]:
+            self._log(
+                f"[Scan] {stats['flavor_fallback']} listings did not match their server's "
+                "usual layout and were parsed generically"
+            )
+        if self.listing_cache is None:
+            return
+        self._log(
+            f"[Scan] Listings: {stats['fetched']} fetched, "
+            f"{stats['not_modified']} not modified (304), "
+            f"{stats['reused']} reused without a request"
+        )
+
+    def _iter_listing_entries(self, response, url):
+        decoder = incremental_decoder(response.encoding)
+        parser = self._listing_parser_for(url, response.headers)
+        for chunk in response.iter_content(self.listing_chunk_size):
+            if not self.rate_limits.wait_bytes(url, len(chunk), self._scan_stopped):
+                return
+            parser.feed(decoder.decode(chunk))
+            yield from parser.pop_entries()
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+        yield from parser.pop_entries()
+
+    def _listing_url_info(self, page_url, base_url, entry):
+        """Resolve a listing entry to a url_info dict, or None if it is skipped."""
+        href = entry.href
+        if not href or href in [".", "..", "/"] or href.startswith("?"):
+            return None
+        full_url = urljoin(page_url, href)
+        if not full_url or not is_url_in_scope(base_url, full_url):
+            return None
+
+        parsed_full = urlparse(full_url)
+        path = parsed_full.path
+        if not path:
+            path = "/"
+
+        final_url = f"{parsed_full.scheme}://{parsed_full.netloc}{path}"
+
+        is_directory_hint = href.endswith("/") or entry.directory_hint
+        if is_directory_hint:
+            if not final_url.endswith("/"):
+                final_url += "/"
+        else:
+            if final_url.endswith("/") and "." in os.path.basename(final_url[:-1]):
+                final_url = final_url[:-1]
+
+        if final_url == page_url:
+            return None
+        if not self._scan_rules_allow(base_url, final_url):
+            self._count_listing("pruned")
+            return None
+
+        return {
+            "url": final_url,
+            "is_directory": final_url.endswith("/"),
+            "path": path,
+            "size": entry.size,
+            "modified": entry.modified,
+            "file_type": entry.file_type,
+        }
 
     def _process_directory(self, url):
         """Process directory"""
         try:
             parsed_path = urlparse(url).path
             dir_path = parsed_path.rstrip("/")
-            self._call_ui_hook(
-                "on_scan_item", is_directory=True, path=dir_path, url=url
-            )
+            payload = {"is_directory": True, "path": dir_path, "url": url}
+            self._call_ui_hook("on_scan_item", **payload)
+            self._index_item_done(payload)
         except (OSError, ValueError) as ex:
             self._log(f"[Scan] Error processing directory path {url}: {str(ex)}")
 
-    def _process_file(self, url):
-        """Process file"""
+    def _process_file(self, url, url_info=None):
+        """Process file. Uses listing metadata when present, otherwise a HEAD request."""
         try:
-            parsed = urlparse(url)
-            file_name = unquote(os.path.basename(parsed.path))
-            dir_path = unquote(os.path.dirname(parsed.path))
-            if not file_name:
+            claim = self._claim_file(url)
+            if claim is None or self._emit_listed_file(url, claim, url_info):
                 return
-
-            full_path = os.path.join(dir_path, file_name).replace("\\", "/")
-            if full_path.startswith("/"):
-                full_path = full_path[1:]
-
-            with self.ui_manager.files_dict_lock:
-                if full_path in self.ui_manager.files_dict:
-                    return
-                self.ui_manager.files_dict[full_path] = None
-
             try:
-                head = self.ui_manager.session.head(
-                    url, timeout=(5, 10), allow_redirects=True
-                )
-                size_bytes = head.headers.get("content-length")
-                size = (
-                    f"{int(size_bytes) / 1024:.2f} KB"
-                    if size_bytes and size_bytes.isdigit()
-                    else "Unknown"
-                )
-                file_type = head.headers.get("content-type", "Unknown")
-
-                self._call_ui_hook(
-                    "on_scan_item",
-                    is_directory=False,
-                    path=dir_path,
-                    url=url,
-                    file_name=file_name,
-                    size=size,
-                    file_type=file_type,
-                    full_path=full_path,
-                )
+                if not self.rate_limits.wait_request(url, self._scan_stopped):
+                    self._release_file(claim)
+                    return
+                with self.scan_limits.slot(url, self._scan_stopped) as slot:
+                    if slot is None:
+                        self._release_file(claim)
+                        return
+                    head = self.ui_manager.session.head(
+                        url, timeout=(5, 10), allow_redirects=True
+                    )
+                    slot.record_status(head.status_code)
+                self._emit_file_from_headers(url, claim, head.headers)
             except (requests.RequestException, socket.timeout) as ex:
                 self._log(f"[Scan] Could not process file {url}: {ex}")
-                with self.ui_manager.files_dict_lock:
-                    if full_path in self.ui_manager.files_dict:
-                        del self.ui_manager.files_dict[full_path]
+                self._release_file(claim)
         except (OSError, ValueError) as ex:
             self._log(f"[Scan] Error processing file URL {url}: {str(ex)}")
 
-    def download_file(self, url, file_path, file_name, cancel_event=None):
-        """Downloads a single file."""
-        try:
-            response = self.ui_manager.session.get(
-                url,
-                stream=True,
-                timeout=self.ui_manager.timeout,
-                headers={"User-Agent": self.ui_manager.USER_AGENT},
-            )
-            response.raise_for_status()
+    def _claim_file(self, url):
+        """Reserve the file's files_dict slot. Return (file_name, dir_path, full_path),
+        or None when the URL has no file name or another task already claimed it."""
+        parsed = urlparse(url)
+        file_name = unquote(os.path.basename(parsed.path))
+        dir_path = unquote(os.path.dirname(parsed.path))
+        if not file_name:
+            return None
 
-            total_size = int(response.headers.get("content-length", 0))
-            block_size = 8192
-            downloaded = 0
+        full_path = os.path.join(dir_path, file_name).replace("\\", "/")
+        if full_path.startswith("/"):
+            full_path = full_path[1:]
 
-            with open(file_path, "wb") as file_handle:
-                for data in response.iter_content(block_size):
-                    self.ui_manager.pause_event.wait()
-                    if (cancel_event is not None and cancel_event.is_set()) or self.should_stop:
-                        break
-                    if not data:
-                        break
-                    downloaded += len(data)
-                    file_handle.write(data)
+        with self.ui_manager.files_dict_lock:
+            if full_path in self.ui_manager.files_dict:
+                return None
+            self.ui_manager.files_dict[full_path] = None
+        return file_name, dir_path, full_path
+
+    def _release_file(self, claim):
+        with self.ui_manager.files_dict_lock:
+            if claim[2] in self.ui_manager.files_dict:
+                del self.ui_manager.files_dict[claim[2]]
 
-                    if total_size > 0:
-                        progress = (downloaded / total_size) * 100
-                        self.ui_manager.update_progress(file_path, file_name, progress)
+    def _emit_file(self, url, claim, size, file_type, modified):
+        file_name, dir_path, full_path = claim
+        payload = {
+            "is_directory": False,
+            "path": dir_path,
+            "url": url,
+            "file_name": file_name,
+            "size": size,
+            "file_type": file_type,
+            "full_path": full_path,
+            "modified": modified,
+        }
+        self._call_ui_hook("on_scan_item", **payload)
+        self._index_item_done(payload)
+
+    def _emit_listed_file(self, url, claim, url_info):
+        """Emit the file from listing metadata. Return False if the listing had no size."""
+        listed_size = (url_info or {}).get("size")
+        if listed_size is None:
+            return False
+        self._emit_file(
+            url,
+            claim,
+            _format_size(listed_size),
+            url_info.get("file_type") or guess_file_type(claim[0]),
+            url_info.get("modified", ""),
+        )
+        return True
+
+    def _emit_file_from_headers(self, url, claim, headers):
+        size_bytes = headers.get("content-length")
+        size = (
+            _format_size(int(size_bytes))
+            if size_bytes and size_bytes.isdigit()
+            else "Unknown"
+        )
+        self._emit_file(
+            url,
+            claim,
+            size,
+            headers.get("content-type", "Unknown"),
+            parse_http_date(headers.get("last-modified")),
+        )
+
+    def download_file(self, url, file_path, file_name, cancel_event=None):
+        """Downloads a single file, continuing a partial download of it if one is on disk.
+
+        A transient error while the body streams (connection reset, timeout,
+        429/5xx) is retried with backoff from the last byte written, up to
+        ``download_retries.attempts`` times.
+        """
+        partial = PartialDownload.load(file_path, url)
+        retries = 0
+        completed = False
+        try:
+            aborted = functools.partial(self._download_aborted, cancel_event)
+            finished = False
+            while True:
+                try:
+                    finished = self._download_attempt(url, partial, file_name, aborted)
+                    break
+                except requests.exceptions.RequestException as ex:
+                    delay = self._download_retry_delay(ex, retries + 1, aborted)
+                    if delay is None:
+                        raise
+                    retries += 1
+                    reason = error_reason(ex)
+                    self._log(
+                        f"[Download] {file_name}: {reason} at {_format_size(partial.received)}; "
+                        f"retry {retries}/{self.download_retries.attempts} in {delay:.1f}s"
+                    )
+                    self._set_download_status(
+                        file_path,
+                        f"Retrying {retries}/{self.download_retries.attempts} ({reason})",
+                    )
+                    if not self._sleep_unless_aborted(delay, aborted):
+                        break
 
             # Re-check abort flags after file handle is closed
             canceled = cancel_event is not None and cancel_event.is_set()
             stopped = self.should_stop
             if canceled or stopped:
-                cleanup_partial_file(file_path)
+                self._keep_partial(partial, file_name)
                 if canceled:
                     self.ui_manager.log_message(f"[Download] Canceled: {file_name}")
-                    try:
-                        self.ui_manager.update_download_status(file_path, "Canceled")
-                    except AttributeError:
-                        pass
+                    self._set_download_status(file_path, "Canceled")
                 else:
                     self._log(f"[Download] Stopping download for {file_name}")
                 return False
+            if not finished:
+                raise IOError(f"incomplete, {partial.received} of {partial.length} bytes received")
 
-            self.ui_manager.update_progress(file_path, file_name, 100)
-            try:
-                self.ui_manager.update_download_status(file_path, "Completed")
-            except AttributeError:
-                pass
+            completed = True
+            if self.push_progress:
+                self.ui_manager.update_progress(file_path, file_name, 100)
+            self._set_download_status(
+                file_path, f"Completed after {_plural(retries, 'retry', 'retries')}" if retries else "Completed"
+            )
             return True
 
         except (requests.exceptions.RequestException, IOError) as ex:
-            label = "File error" if isinstance(ex, IOError) else "Error downloading"
+            if isinstance(ex, requests.exceptions.RequestException):
+                label = "Error downloading"
+            else:
+                label = "File error"
             self._log(f"[Download] {label} {file_name}: {ex}")
-            cleanup_partial_file(file_path)
+            self._keep_partial(partial, file_name)
+            self._set_download_status(
+                file_path,
+                f"Failed after {_plural(retries, 'retry', 'retries')} ({error_reason(ex)})"
+                if retries
+                else "Failed",
+            )
             try:
-                self.ui_manager.update_download_status(file_path, "Failed")
                 self.ui_manager.log_message(f"[Download] {label}: {file_name} - {ex}")
             except AttributeError:
                 pass
             return False
+        finally:
+            self.download_progress.finish(file_path, completed)
+
+    def _download_attempt(self, url, partial, file_name, aborted):
+        """One request (or set of segment requests) for url. Return True when complete."""
+        if not self.rate_limits.wait_request(url, aborted):
+            return False
+        with self.download_limits.slot(url, aborted) as slot:
+            if slot is None:
+                return False
+            return self._stream_download(url, partial, file_name, aborted, slot)
+
+    def _download_retry_delay(self, error, attempt, aborted):
+        """Backoff before retry number attempt of a download, or None to give up.
+        Retrying continues from the .part file, so it needs resume_downloads."""
+        if (
+            not self.resume_downloads
+            or aborted()
+            or not is_transient(error)
+            or attempt > self.download_retries.attempts
+        ):
+            return None
+        return self.download_retries.delay(attempt)
+
+    @staticmethod
+    def _sleep_unless_aborted(delay, aborted):
+        """Sleep for delay seconds. Return False as soon as aborted() turns true."""
+        deadline = time.monotonic() + delay
+        while not aborted():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            time.sleep(min(remaining, 0.2))
+        return False
+
+    def _set_download_status(self, file_path, status):
+        try:
+            self.ui_manager.update_download_status(file_path, status)
+        except AttributeError:
+            pass
+
+    def _download_aborted(self, cancel_event):
+        return (cancel_event is not None and cancel_event.is_set()) or self.should_stop
+
+    def _keep_partial(self, partial, file_name):
+        """Leave the .part file for the next attempt, or remove it if resuming is off."""
+        if not self.resume_downloads:
+            partial.discard()
+        elif partial.received:
+            self._log(
+                f"[Download] Kept {_format_size(partial.received)} of {file_name} to resume later"
+            )
+
+    def _stream_download(self, url, partial, file_name, aborted, slot, fresh=False):
+        """Stream url into partial's .part file, continuing it with a Range request
+        when possible. Return True once the file is complete under its final name."""
+        if partial.segments is not None and self.resume_downloads:
+            return self._segmented_download(url, partial, file_name, aborted, slot, fresh)
+        # Byte counts and offsets must refer to the file itself, not a compressed encoding
+        headers = {"User-Agent": self.ui_manager.USER_AGENT, "Accept-Encoding": "identity"}
+        if self.resume_downloads:
+            headers.update(partial.request_headers())
+        response = self._download_session().get(
+            url,
+            stream=True,
+            timeout=self.ui_manager.timeout,
+            headers=headers,
+        )
+        slot.record_status(response.status_code)
+        if response.status_code == 416 and "Range" in headers and not fresh:
+            # The server's copy is shorter than the .part file
+            response.close()
+            partial.discard()
+            return self._stream_download(url, partial, file_name, aborted, slot, fresh=True)
+        response.raise_for_status()
+        try:
+            offset = partial.accept(response.status_code, response.headers)
+        except PartialMismatch as ex:
+            response.close()
+            return self._restart_download(url, partial, file_name, aborted, slot, fresh, ex)
+        if not offset and self._should_segment(partial, response.headers):
+            response.close()
+            return self._segmented_download(url, partial, file_name, aborted, slot, fresh)
+
+        total_size = partial.length or 0
+        if offset:
+            self._log(f"[Download] Resuming {file_name} at {_format_size(offset)}")
+            if total_size > 0:
+                try:
+                    self.ui_manager.update_download_status(
+                        partial.file_path, f"Downloading (resumed at {offset / total_size:.0%})"
+                    )
+                except AttributeError:
+                    pass
+        block_size = self.download_block_size
+        downloaded = offset
+        received_all = True
+        self.download_progress.begin(partial.file_path, file_name, offset, total_size or None)
+
+        if not offset:
+            mode = "wb"
+        else:
+            # A preallocated .part file already has its full size; continue inside it
+            mode = "ab" if partial.written is None else "r+b"
+        with open(partial.part_path, mode) as file_handle:
+            if not offset and total_size > 0 and self.preallocate_downloads:
+                preallocate(file_handle, total_size)
+                partial.written = 0
+                partial.save()
+            file_handle.seek(offset)
+            writer = DiskWriter(file_handle, self.write_block_size, self.write_queue_blocks)
+            next_save = time.monotonic() + _PART_SAVE_INTERVAL
+            try:
+                with writer:
+                    for data in response.iter_content(block_size):
+                        self.ui_manager.pause_event.wait()
+                        if aborted():
+                            received_all = False
+                            break
+                        if not data:
+                            break
+                        if not self.rate_limits.wait_bytes(url, len(data), aborted):
+                            received_all = False
+                            break
+                        downloaded += len(data)
+                        writer.write(data)
+                        self._report_download_progress(
+                            partial.file_path, file_name, downloaded, total_size
+                        )
+                        if partial.written is not None and time.monotonic() >= next_save:
+                            self._save_written(partial, writer)
+                            next_save = time.monotonic() + _PART_SAVE_INTERVAL
+            finally:
+                self.add_write_stats(writer.stats)
+                if partial.written is not None:
+                    self._save_written(partial, writer)
+        return received_all and partial.complete()
+
+    @staticmethod
+    def _save_written(partial, writer):
+        """Record in the sidecar how far the preallocated .part file is written."""
+        partial.written = writer.written_to
+        partial.save()
+
+    def add_write_stats(self, stats):
+        """Add a finished DiskWriter's stats to the totals reported after a batch."""
+        with self._write_stats_lock:
+            self.write_stats.add(stats)
+
+    def _log_write_stats(self):
+        with self._write_stats_lock:
+            stats, self.write_stats = self.write_stats, StageStats()
+        if stats.writes:
+            self._log(f"[Disk] {stats.format()}")
+            self._call_ui_hook("on_write_stats", stats=stats)
+
+    def _report_download_progress(self, file_path, file_name, done, total):
+        """Record progress on the board; pass it on to the UI when it is due."""
+        due = self.download_progress.update(file_path, file_name, done, total or None)
+        if due and self.push_progress and total > 0:
+            self.ui_manager.update_progress(file_path, file_name, done / total * 100)
+
+    def _restart_download(self, url, partial, file_name, aborted, slot, fresh, error):
+        """Throw the partial file away and download from scratch, once."""
+        if fresh:
+            raise error
+        self._log(f"[Download] {file_name}: {error}; starting over")
+        partial.discard()
+        return self._stream_download(url, partial, file_name, aborted, slot, fresh=True)
+
+    def _should_segment(self, partial, headers):
+        return (
+            self.resume_downloads
+            and self.segment_threshold > 0
+            and self.max_segments > 1
+            and partial.length is not None
+            and partial.length >= self.segment_threshold
+            and headers.get("accept-ranges", "").lower() == "bytes"
+            and partial.validator is not None
+        )
+
+    def _segmented_download(self, url, partial, file_name, aborted, slot, fresh):
+        if partial.segments is None:
+            self._log(
+                f"[Download] {file_name}: {_format_size(partial.length)}, "
+                f"fetching in up to {self.max_segments} segments"
+            )
+        try:
+            finished = SegmentedDownload(self, partial, file_name, aborted, slot).run()
+        except PartialMismatch as ex:
+            return self._restart_download(url, partial, file_name, aborted, slot, fresh, ex)
+        return finished and partial.complete()
 
     def monitor_downloads(self, futures):
         """Monitors the download threads and updates the UI upon completion."""
@@ -356,4 +1429,8 @@ class Backend:
                     completed += 1
             except (concurrent.futures.CancelledError, RuntimeError) as ex:
                 self._log(f"[Download] Error in future: {str(ex)}")
+        self.download_progress.end_batch()
+        self._log_limits("download", self.download_limits)
+        self._log_connection_stats("download")
+        self._log_write_stats()
         self._call_ui_hook("on_downloads_finished", completed=completed, total=total)
@@ -0,0 +1,237 @@
+"""Benchmarks on synthetic data.
+
+* ``python -m index_ripper --bench-parse``: listing parsers on large pages,
+  including the per-flavour line extractors and nginx's JSON and XML
+  autoindex formats.
+* ``python -m index_ripper --bench-crawl``: crawler speed and memory on a
+  synthetic tree of millions of entries.
+"""
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+from index_ripper.listing import available_backends, make_listing_parser, parse_listing
+from index_ripper.listing_flavors import FlavorParser
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+STRUCTURED_FLAVORS = {"json": "application/json", "xml": "text/xml"}
+LISTING_FLAVORS = ("nginx", "apache", *STRUCTURED_FLAVORS)
+# synthetic_listing flavour -> listing_flavors extractor
+_EXTRACTORS = {"nginx": "nginx", "apache": "apache-table"}
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    backend: str
+    flavor: str
+    entries: int
+    found: int
+    seconds: float
+
+    @property
+    def usec_per_entry(self) -> float:
+        return self.seconds / max(1, self.entries) * 1e6
+
+
+def synthetic_listing(entries: int, flavor: str = "nginx") -> str:
+    """Build an nginx <pre>, Apache table, or nginx JSON/XML listing with ``entries`` files."""
+    if flavor == "nginx":
+        lines = ['<html><body><h1>Index of /pub/</h1><hr><pre><a href="../">../</a>']
+        for i in range(entries):
+            lines.append(
+                f'<a href="file-{i:07d}.bin">file-{i:07d}.bin</a>'
+                f"                     05-Jan-2024 12:31     {1024 + i}"
+            )
+        lines.append("</pre><hr></body></html>")
+        return "\n".join(lines)
+    if flavor == "apache":
+        rows = ["<html><body><h1>Index of /pub</h1><table>"]
+        for i in range(entries):
+            rows.append(
+                f'<tr><td valign="top"><img src="/icons/unknown.gif" alt="[   ]"></td>'
+                f'<td><a href="file-{i:07d}.bin">file-{i:07d}.bin</a></td>'
+                f'<td align="right">2024-03-02 10:20  </td><td align="right">1.5K</td>'
+                f"<td>&nbsp;</td></tr>"
+            )
+        rows.append("</table></body></html>")
+        return "\n".join(rows)
+    if flavor == "json":
+        return json.dumps(
+            [
+                {"name": f"file-{i:07d}.bin", "type": "file",
+                 "mtime": "Fri, 05 Jan 2024 12:31:00 GMT", "size": 1024 + i}
+                for i in range(entries)
+            ]
+        )
+    if flavor == "xml":
+        rows = ['<?xml version="1.0"?>', "<list>"]
+        for i in range(entries):
+            rows.append(
+                f'<file mtime="2024-01-05T12:31:00Z" size="{1024 + i}">file-{i:07d}.bin</file>'
+            )
+        rows.append("</list>")
+        return "\n".join(rows)
+    raise ValueError(f"Unknown listing flavor: {flavor}")
+
+
+def _parse_structured(text: str, content_type: str) -> list:
+    parser = make_listing_parser(content_type)
+    parser.feed(text)
+    parser.close()
+    return parser.pop_entries()
+
+
+def _extract_lines(text: str, flavor: str) -> list:
+    parser = FlavorParser(flavor)
+    parser.feed(text)
+    parser.close()
+    return parser.pop_entries()
+
+
+def _bs4_hrefs(text: str) -> list[str]:
+    """The pre-listing-parser approach: full DOM, then find_all("a")."""
+    soup = BeautifulSoup(text, "html.parser")
+    return [link.get("href") for link in soup.find_all("a") if link.get("href")]
+
+
+def run_parse_benchmark(
+    sizes=DEFAULT_SIZES,
+    flavors=("nginx", "apache"),
+    repeat: int = 3,
+    include_bs4: bool = True,
+    include_extractors: bool = False,
+) -> list[BenchmarkResult]:
+    """Time every available parser backend; the best of ``repeat`` runs is kept.
+
+    JSON and XML flavours go through their structured parser only.
+    ``include_extractors`` adds the nginx/Apache line extractor as "lines".
+    """
+    html_parsers = {
+        backend: (lambda text, b=backend: parse_listing(text, b)) for backend in available_backends()
+    }
+    if include_bs4 and BeautifulSoup is not None:
+        html_parsers["bs4 (dom)"] = _bs4_hrefs
+
+    results = []
+    for flavor in flavors:
+        parsers = html_parsers
+        if include_extractors and flavor in _EXTRACTORS:
+            parsers = {
+                **html_parsers,
+                "lines": lambda text, f=_EXTRACTORS[flavor]: _extract_lines(text, f),
+            }
+        if flavor in STRUCTURED_FLAVORS:
+            content_type = STRUCTURED_FLAVORS[flavor]
+            parsers = {flavor: lambda text, ct=content_type: _parse_structured(text, ct)}
+        for size in sizes:
+            text = synthetic_listing(size, flavor)
+            for name, parse in parsers.items():
+                best = None
+                found = 0
+                for _ in range(max(1, repeat)):
+                    started = time.perf_counter()
+                    found = len(parse(text))
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                results.append(BenchmarkResult(name, flavor, size, found, best))
+    return results
+
+
+def format_results(results: list[BenchmarkResult]) -> str:
+    lines = [f"{'backend':<12} {'flavor':<7} {'entries':>8} {'seconds':>9} {'us/entry':>9}"]
+    for result in results:
+        lines.append(
+            f"{result.backend:<12} {result.flavor:<7} {result.entries:>8} "
+            f"{result.seconds:>9.3f} {result.usec_per_entry:>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+@dataclass(frozen=True)
+class CrawlBenchmarkResult:
+    entries: int
+    listings: int
+    seconds: float
+    peak_bytes: int        # traced peak while crawling, with nothing retained per entry
+    seen_bytes_per_url: float
+
+    def format(self) -> str:
+        return (
+            f"{self.entries} entries in {self.listings} listings: {self.seconds:.1f}s, "
+            f"peak {self.peak_bytes / 2**20:.1f} MiB, "
+            f"seen-set {self.seen_bytes_per_url:.0f} B/dir"
+        )
+
+
+def synthetic_tree_fetcher(files_per_dir: int = 100, dirs_per_dir: int = 10):
+    """fetch_listing for an endless synthetic tree: every directory has the same shape."""
+
+    def fetch(url):
+        for i in range(dirs_per_dir):
+            child = f"{url}d{i}/"
+            yield {"url": child, "is_directory": True, "path": child}
+        for i in range(files_per_dir):
+            child = f"{url}file-{i:05d}.bin"
+            yield {"url": child, "is_directory": False, "path": child, "size": 1024 + i}
+
+    return fetch
+
+
+def measure_seen_set(urls: int = 100_000, exact: bool = False) -> float:
+    """Bytes per URL held by a SeenSet of realistic directory URLs."""
+    import tracemalloc
+
+    from index_ripper.crawler import SeenSet
+
+    candidates = [f"http://mirror.example.com/pub/releases/{i // 1000}/{i:08d}/" for i in range(urls)]
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        seen = SeenSet(exact=exact)
+        seen.update(candidates)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    # Exact keys share the candidate strings here; charge them as a real crawl would
+    strings = sum(sys.getsizeof(url) for url in candidates) if exact else 0
+    return (after - before + strings) / len(seen)
+
+
+def run_crawl_benchmark(entries: int = 1_000_000, workers: int = 4) -> CrawlBenchmarkResult:
+    """Crawl a synthetic tree until ``entries`` entries were found, tracing memory."""
+    import tracemalloc
+
+    from index_ripper.crawler import DirectoryCrawler
+
+    found = 0
+    lock = threading.Lock()
+    crawler = None
+
+    def on_listing(_url, batch):
+        nonlocal found
+        with lock:
+            found += len(batch)
+            if found >= entries:
+                crawler.frontier.close()
+
+    crawler = DirectoryCrawler(synthetic_tree_fetcher(), workers=workers, on_listing=on_listing)
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        crawler.crawl("http://mirror.example.com/")
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return CrawlBenchmarkResult(
+        found, crawler.listings_fetched, elapsed, peak, measure_seen_set()
+    )
@@ -0,0 +1,253 @@
+"""Adaptive per-host concurrency limits (additive increase, multiplicative decrease).
+
+Every request to a host runs inside a slot of that host's HostLimiter. A
+healthy response (fast compared with the host's baseline latency) raises
+the limit by ``1/limit``, so about one extra slot per window of successes;
+429/502/503/504, connection resets and timeouts halve it. Only requests
+started after the last decrease can trigger another one, so a burst of
+failures from one overloaded window backs off once, not once per failure.
+
+A WorkerBudget on top caps the requests in flight across every host, so
+several scans sharing one AdaptiveConcurrency stay within one global budget.
+"""
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from typing import Callable
+from urllib.parse import urlparse
+
+OVERLOAD_STATUSES = frozenset((429, 502, 503, 504))
+
+
+class HostLimiter:
+    """Concurrency limit and in-flight count for one host."""
+
+    def __init__(
+        self,
+        host: str,
+        initial: int,
+        *,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        latency_tolerance: float = 3.0,
+        on_change: Callable[[str, int, int, str], None] | None = None,
+    ):
+        self.host = host
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.on_change = on_change
+        self._limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self._in_flight = 0
+        self._baseline: float | None = None
+        self._last_decrease = float("-inf")
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        with self._cond:
+            return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        with self._cond:
+            return self._in_flight
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self._in_flight >= int(self._limit):
+                return False
+            self._in_flight += 1
+            return True
+
+    def acquire(self, should_stop: Callable[[], bool] | None = None) -> bool:
+        """Block until a slot is free. Return False if should_stop() turned true."""
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                if should_stop is not None and should_stop():
+                    return False
+                self._cond.wait(0.2)
+            self._in_flight += 1
+            return True
+
+    def release(self, started: float, outcome: str | None, latency: float | None) -> None:
+        """Free a slot and adapt: outcome is "ok", "overload" or None (no signal)."""
+        change = None
+        with self._cond:
+            self._in_flight -= 1
+            before = int(self._limit)
+            if outcome == "overload" and started >= self._last_decrease:
+                self._limit = max(self.min_limit, self._limit / 2)
+                self._last_decrease = time.monotonic()
+                change = "backoff"
+            elif outcome == "ok" and latency is not None and self._is_healthy(latency):
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+                change = "ramp up"
+            after = int(self._limit)
+            self._cond.notify_all()
+        if change and after != before and self.on_change is not None:
+            self.on_change(self.host, before, after, change)
+
+    def _is_healthy(self, latency: float) -> bool:
+        # Baseline follows the fastest responses and drifts up slowly
+        if self._baseline is None or latency < self._baseline:
+            self._baseline = latency
+        else:
+            self._baseline += (latency - self._baseline) * 0.01
+        return latency <= max(self._baseline * self.latency_tolerance, 0.05)
+
+
+class WorkerBudget:
+    """Global cap on in-flight requests, shared by every host and scan job."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, int(limit))
+        self.peak = 0
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    @property
+    def in_flight(self) -> int:
+        with self._cond:
+            return self._in_flight
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self._in_flight >= self.limit:
+                return False
+            self._take()
+            return True
+
+    def acquire(self, should_stop: Callable[[], bool] | None = None) -> bool:
+        """Block until the budget has room. Return False if should_stop() turned true."""
+        with self._cond:
+            while self._in_flight >= self.limit:
+                if should_stop is not None and should_stop():
+                    return False
+                self._cond.wait(0.2)
+            self._take()
+            return True
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def _take(self) -> None:
+        self._in_flight += 1
+        self.peak = max(self.peak, self._in_flight)
+
+
+class Slot:
+    """One in-flight request; record its status before leaving the ``with`` block."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.outcome: str | None = None
+        self.latency: float | None = None
+
+    def record_status(self, status: int) -> None:
+        self.latency = time.monotonic() - self.started
+        if not isinstance(status, int):
+            return
+        if status in OVERLOAD_STATUSES:
+            self.outcome = "overload"
+        elif status < 400 or status in (401, 403, 404, 410):
+            self.outcome = "ok"
+
+    def mark_overloaded(self) -> None:
+        self.outcome = "overload"
+
+
+class AdaptiveConcurrency:
+    """Registry of HostLimiters, created on first use with ``initial`` slots.
+
+    ``overload_errors`` are exception types that count as an overload signal
+    when they escape a slot (timeouts, connection resets, exhausted retries).
+    ``on_change(host, old, new, reason)`` fires whenever a host's limit moves.
+    Set ``enabled`` to False to keep the limit fixed at ``initial``.
+    With a ``budget``, every slot also holds one unit of that WorkerBudget.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        *,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        overload_errors: tuple[type[BaseException], ...] = (ConnectionError, TimeoutError),
+        on_change: Callable[[str, int, int, str], None] | None = None,
+    ):
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.overload_errors = overload_errors
+        self.on_change = on_change
+        self.enabled = True
+        self.budget: WorkerBudget | None = None
+        self._hosts: dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, url: str) -> HostLimiter:
+        host = urlparse(url).netloc or url
+        with self._lock:
+            limiter = self._hosts.get(host)
+            if limiter is None:
+                limiter = HostLimiter(
+                    host,
+                    self.initial,
+                    min_limit=self.min_limit,
+                    max_limit=self.max_limit if self.enabled else self.initial,
+                    on_change=self.on_change,
+                )
+                self._hosts[host] = limiter
+            return limiter
+
+    def limits(self) -> dict[str, int]:
+        """Current limit per host seen so far."""
+        with self._lock:
+            hosts = list(self._hosts.values())
+        return {limiter.host: limiter.limit for limiter in hosts}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hosts.clear()
+
+    def try_acquire(self, limiter: HostLimiter) -> bool:
+        """Take a slot on limiter and a unit of the budget without blocking."""
+        if not limiter.try_acquire():
+            return False
+        if self.budget is not None and not self.budget.try_acquire():
+            limiter.release(time.monotonic(), None, None)
+            return False
+        return True
+
+    def finish(self, limiter: HostLimiter, slot: Slot, exc: BaseException | None) -> None:
+        """Release slot on limiter, treating an escaped overload error as backoff."""
+        if exc is not None and isinstance(exc, self.overload_errors):
+            slot.mark_overloaded()
+        outcome = slot.outcome if self.enabled else None
+        limiter.release(slot.started, outcome, slot.latency)
+        if self.budget is not None:
+            self.budget.release()
+
+    @contextlib.contextmanager
+    def slot(self, url: str, should_stop: Callable[[], bool] | None = None):
+        """Hold one of the host's slots; yields None if should_stop() fired while waiting."""
+        limiter = self.limiter(url)
+        if not limiter.acquire(should_stop):
+            yield None
+            return
+        if self.budget is not None and not self.budget.acquire(should_stop):
+            limiter.release(time.monotonic(), None, None)
+            yield None
+            return
+        slot = Slot()
+        try:
+            yield slot
+        except BaseException as ex:
+            self.finish(limiter, slot, ex)
+            raise
+        self.finish(limiter, slot, None)
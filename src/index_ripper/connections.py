@@ -0,0 +1,270 @@
+"""HTTP connection pools sized to the configured concurrency, and a DNS cache.
+
+requests mounts HTTPAdapters with ``pool_maxsize=10``. With more workers
+than that on a session, urllib3 opens extra connections and closes them
+again after one request, and over TLS each of them costs a full handshake.
+``make_session`` sizes the pool to the number of workers that share the
+session. The app keeps separate sessions for scan and download traffic, so
+bulk downloads cannot hold every connection while listings wait.
+
+A CountingAdapter records how many requests went out and how many
+connections were opened for them. It reads the ``num_connections`` counter
+of each urllib3 pool it hands out. Connections opened beyond the pool size
+are counted as discarded, because a full pool closes them again when they
+are returned.
+
+A session made with a DnsCache resolves each host once per TTL instead of
+once per connection. The adapter connects to the cached address and keeps
+the host name for the Host header, TLS SNI and certificate checks. The cache
+belongs to the sessions it is passed to. As with urllib3's own lookups, a
+host's addresses are tried in turn: one that cannot be connected to moves
+to the back of the list, and the request goes to the next one. Other code in the process still
+resolves through the socket module as usual. Requests that go through a
+proxy are left to the proxy to resolve.
+"""
+from __future__ import annotations
+
+import ipaddress
+import socket
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import select_proxy
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.retry import Retry
+
+DEFAULT_DNS_TTL = 300.0
+DEFAULT_HOST_POOLS = 32  # hosts whose pools are kept open at once
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def default_retry() -> Retry:
+    """Retries for the initial response of every request on our sessions."""
+    return Retry(total=3, backoff_factor=0.1, status_forcelist=[500, 502, 503, 504])
+
+
+@dataclass
+class PoolStats:
+    requests: int = 0
+    opened: int = 0     # new connections, including TLS handshakes
+    discarded: int = 0  # connections closed because the pool was full
+
+    @property
+    def reused(self) -> int:
+        return max(0, self.requests - self.opened)
+
+    def __sub__(self, other: PoolStats) -> PoolStats:
+        return PoolStats(
+            self.requests - other.requests,
+            self.opened - other.opened,
+            self.discarded - other.discarded,
+        )
+
+    def format(self) -> str:
+        share = self.reused / self.requests if self.requests else 0.0
+        return (
+            f"{self.requests} requests over {self.opened} connections "
+            f"({share:.0%} reused, {self.discarded} discarded)"
+        )
+
+
+class CountingAdapter(HTTPAdapter):
+    """HTTPAdapter that keeps PoolStats over all of its host pools, and
+    resolves hosts through dns_cache when one is given."""
+
+    def __init__(self, *args, pool_maxsize: int = 10, dns_cache: DnsCache | None = None, **kwargs):
+        self.pool_size = pool_maxsize
+        self.dns_cache = dns_cache
+        self._stats = PoolStats()
+        self._lock = threading.Lock()
+        # pool -> its num_connections when last counted; pools the manager
+        # evicted drop out, their connections stay counted
+        self._pool_counts: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        # Pool, and (host, address, address count) when pinned, of the request this thread is sending
+        self._local = threading.local()
+        super().__init__(*args, pool_maxsize=pool_maxsize, **kwargs)
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        pool = self._pool_for(request, verify, proxies, cert)
+        self._local.pool = pool
+        return pool
+
+    def _pool_for(self, request, verify, proxies, cert):
+        self._local.pinned = None
+        if self.dns_cache is None or select_proxy(request.url, proxies):
+            return super().get_connection_with_tls_context(request, verify, proxies, cert)
+        host_params, pool_kwargs = self.build_connection_pool_key_attributes(request, verify, cert)
+        host = host_params["host"]
+        port = host_params["port"] or _DEFAULT_PORTS.get(host_params["scheme"])
+        addresses = self.dns_cache.addresses(host, port)
+        if addresses:
+            self._local.pinned = (host, addresses[0], len(addresses))
+            host_params["host"] = addresses[0]
+            if host_params["scheme"] == "https":
+                pool_kwargs["server_hostname"] = host
+                pool_kwargs["assert_hostname"] = host
+        return self.poolmanager.connection_from_host(**host_params, pool_kwargs=pool_kwargs)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        self._count_request()
+        pinned = self.dns_cache is not None and not select_proxy(request.url, proxies)
+        if pinned:
+            # The connection may go to a cached address; the server still needs the name
+            request = request.copy()
+            request.headers["Host"] = urlparse(request.url).netloc.rpartition("@")[2]
+        failed = 0
+        while True:
+            try:
+                return self._send_once(request, stream, timeout, verify, cert, proxies)
+            except requests.exceptions.ConnectionError as ex:
+                pinned_to = getattr(self._local, "pinned", None)
+                if not pinned or pinned_to is None or not _is_connect_error(ex):
+                    raise
+                host, address, count = pinned_to
+                self.dns_cache.demote(host, address)
+                failed += 1
+                if failed >= count:
+                    raise
+
+    def _send_once(self, request, stream, timeout, verify, cert, proxies):
+        try:
+            return super().send(request, stream, timeout, verify, cert, proxies)
+        finally:
+            pool, self._local.pool = getattr(self._local, "pool", None), None
+            if pool is not None:
+                self._count_connections(pool)
+
+    @property
+    def stats(self) -> PoolStats:
+        with self._lock:
+            return PoolStats(self._stats.requests, self._stats.opened, self._stats.discarded)
+
+    def _count_request(self) -> None:
+        with self._lock:
+            self._stats.requests += 1
+
+    def _count_connections(self, pool) -> None:
+        with self._lock:
+            opened = pool.num_connections
+            counted = self._pool_counts.get(pool, 0)
+            if opened <= counted:
+                return
+            self._stats.opened += opened - counted
+            # Beyond pool_size, every new connection is closed again on return
+            self._stats.discarded += max(0, opened - self.pool_size) - max(0, counted - self.pool_size)
+            self._pool_counts[pool] = opened
+
+
+def make_session(
+    pool_size: int, retries: Retry | None = None, dns_cache: DnsCache | None = None
+) -> requests.Session:
+    """A session whose per-host pool holds pool_size connections, resolving
+    hosts through dns_cache when one is given."""
+    session = requests.Session()
+    adapter = CountingAdapter(
+        pool_connections=DEFAULT_HOST_POOLS,
+        pool_maxsize=max(1, int(pool_size)),
+        max_retries=retries if retries is not None else default_retry(),
+        dns_cache=dns_cache,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _counting_adapter(session) -> CountingAdapter | None:
+    try:
+        adapter = session.get_adapter("https://")
+    except (AttributeError, requests.exceptions.InvalidSchema):
+        return None
+    return adapter if isinstance(adapter, CountingAdapter) else None
+
+
+def session_stats(session) -> PoolStats | None:
+    """PoolStats of a session built by make_session, else None."""
+    adapter = _counting_adapter(session)
+    return adapter.stats if adapter is not None else None
+
+
+def session_dns_cache(session) -> DnsCache | None:
+    """The DnsCache a session built by make_session resolves through, if any."""
+    adapter = _counting_adapter(session)
+    return adapter.dns_cache if adapter is not None else None
+
+
+class DnsCache:
+    """TTL cache of ``socket.getaddrinfo`` results. Failed lookups are not cached."""
+
+    def __init__(self, ttl: float = DEFAULT_DNS_TTL, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[tuple, tuple[float, list]] = {}
+        self._lock = threading.Lock()
+        self._resolve = socket.getaddrinfo
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] > now:
+                self.hits += 1
+                return list(cached[1])
+            self.misses += 1
+        result = self._resolve(host, port, family, type, proto, flags)
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (now + self.ttl, result)
+        return list(result)
+
+    def addresses(self, host: str | None, port: int | None) -> list[str]:
+        """host's addresses in the order to try them; empty to let the
+        connection resolve host itself (IP literals, failed lookups)."""
+        if not host or port is None or _is_ip_address(host):
+            return []
+        try:
+            infos = self.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        except OSError:
+            return []
+        return list(dict.fromkeys(info[4][0] for info in infos))
+
+    def demote(self, host: str, address: str) -> None:
+        """Move address to the back of host's cached results, after a
+        connection to it failed, so the next request tries another one."""
+        with self._lock:
+            for key, (expires, infos) in self._entries.items():
+                if key[0] == host:
+                    infos = [info for info in infos if info[4][0] != address] + [
+                        info for info in infos if info[4][0] == address
+                    ]
+                    self._entries[key] = (expires, infos)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def format(self) -> str:
+        return f"{self.misses} lookups, {self.hits} cache hits"
+
+
+def _is_connect_error(error: requests.exceptions.ConnectionError) -> bool:
+    """Whether no connection could be made at all (nothing was sent)."""
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+def _is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+    except ValueError:
+        return False
+    return True
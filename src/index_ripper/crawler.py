@@ -0,0 +1,379 @@
+"""Concurrent crawler for directory listing pages, fetched in priority order."""
+from __future__ import annotations
+
+import hashlib
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from typing import Callable, Iterable
+from urllib.parse import unquote, urlparse
+
+
+@dataclass
+class CrawlPriority:
+    """How the frontier orders queued directories; the lowest score is fetched first.
+
+    ``depth_weight`` > 0 fetches shallow levels first (the tree takes shape
+    quickly), 0 keeps discovery order, < 0 goes deep first. Directories the
+    user focused on (expanded, searched for) are boosted by ``focus_boost``.
+    Directories whose path matches one of ``hot_patterns`` (fnmatch globs on
+    the unquoted URL path, e.g. ``*/releases/*``) are boosted by ``hot_boost``.
+    """
+
+    depth_weight: float = 1.0
+    focus_boost: float = 1000.0
+    hot_boost: float = 100.0
+    hot_patterns: tuple[str, ...] = ()
+
+    def score(self, url: str, depth: int, focused: bool = False) -> float:
+        score = self.depth_weight * depth
+        if focused:
+            score -= self.focus_boost
+        if self.hot_patterns:
+            path = unquote(urlparse(url).path)
+            if any(fnmatchcase(path, pattern) for pattern in self.hot_patterns):
+                score -= self.hot_boost
+        return score
+
+
+class SeenSet:
+    """Set of URLs kept as 64-bit hashes instead of the URL strings.
+
+    A hashed key costs a fixed ~70 bytes per URL (int plus set slot), against
+    ~150+ for a typical URL string, and it does not grow with path length.
+    A false "seen" needs two URLs with the same 64-bit hash, which is
+    negligible even for hundreds of millions of URLs. ``exact=True`` keeps the
+    strings themselves.
+    """
+
+    def __init__(self, exact: bool = False):
+        self.exact = exact
+        self._keys: set = set()
+
+    def _key(self, url: str):
+        if self.exact:
+            return url
+        digest = hashlib.blake2b(url.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    def add(self, url: str) -> bool:
+        """Add url; return True if it was not in the set before."""
+        key = self._key(url)
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        return True
+
+    def update(self, urls: Iterable[str]) -> None:
+        self._keys.update(self._key(url) for url in urls)
+
+    def __contains__(self, url: str) -> bool:
+        return self._key(url) in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class CrawlFrontier:
+    """Thread-safe priority queue of directory URLs still to fetch, plus the shared seen-set.
+
+    ``pending`` counts URLs that are queued, deferred or currently being
+    fetched; the crawl is finished once it drops to zero. URLs come out in
+    ``priority`` order, first-queued first among equal scores; ``focus()``
+    re-ranks what is queued. ``defer()`` puts a URL back after a delay (a
+    retry), bypassing the seen-set.
+    """
+
+    def __init__(self, priority: CrawlPriority | None = None, seen: SeenSet | None = None):
+        self.priority = priority or CrawlPriority()
+        self._heap: list[tuple[float, int, str, int]] = []
+        self._deferred: list[tuple[float, int, str, int]] = []  # (due, order, url, depth)
+        self._order = itertools.count()
+        self._focus_urls: list[str] = []
+        self._focus_term = ""
+        self._seen = seen if seen is not None else SeenSet()
+        self._pending = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def add(self, url: str, depth: int = 0) -> bool:
+        """Queue url unless it was seen before. Return True when it was queued."""
+        with self._cond:
+            if self._closed or not self._seen.add(url):
+                return False
+            heapq.heappush(self._heap, (self._score(url, depth), next(self._order), url, depth))
+            self._pending += 1
+            self._cond.notify()
+            return True
+
+    def defer(self, url: str, depth: int, delay: float) -> None:
+        """Queue url again once delay seconds have passed."""
+        with self._cond:
+            if self._closed:
+                return
+            due = time.monotonic() + max(0.0, delay)
+            heapq.heappush(self._deferred, (due, next(self._order), url, depth))
+            self._pending += 1
+            self._cond.notify_all()
+
+    def get(self, should_stop: Callable[[], bool] | None = None) -> tuple[str, int] | None:
+        """Block until a URL is available. Return None once the crawl is over
+        (or ``should_stop()`` turns true while waiting)."""
+        with self._cond:
+            while True:
+                self._release_due()
+                if self._closed or (should_stop is not None and should_stop()):
+                    return None
+                if self._heap:
+                    return self._pop()
+                if self._pending <= 0:
+                    return None
+                timeout = self._next_due()
+                if should_stop is not None:
+                    timeout = 0.2 if timeout is None else min(timeout, 0.2)
+                self._cond.wait(timeout)
+
+    def try_get(self) -> tuple[str, int] | None:
+        """Non-blocking get for event-loop callers: None when nothing is queued now."""
+        with self._cond:
+            self._release_due()
+            if self._closed or not self._heap:
+                return None
+            return self._pop()
+
+    def next_due(self) -> float | None:
+        """Seconds until the next deferred URL is due, or None if none are deferred."""
+        with self._cond:
+            return self._next_due()
+
+    def focus(self, url: str | None = None, term: str | None = None) -> None:
+        """Fetch queued directories at or below url, or whose path contains term, first.
+
+        Focused URLs accumulate; a new term replaces the previous one ("" clears it).
+        """
+        with self._cond:
+            if url:
+                self._focus_urls.append(url)
+            if term is not None:
+                self._focus_term = term.strip().lower()
+            self._heap = [
+                (self._score(queued, depth), order, queued, depth)
+                for _score, order, queued, depth in self._heap
+            ]
+            heapq.heapify(self._heap)
+
+    def _release_due(self) -> None:
+        now = time.monotonic()
+        while self._deferred and self._deferred[0][0] <= now:
+            _due, order, url, depth = heapq.heappop(self._deferred)
+            heapq.heappush(self._heap, (self._score(url, depth), order, url, depth))
+
+    def _next_due(self) -> float | None:
+        if not self._deferred:
+            return None
+        return max(0.0, self._deferred[0][0] - time.monotonic())
+
+    def _pop(self) -> tuple[str, int]:
+        _score, _order, url, depth = heapq.heappop(self._heap)
+        return url, depth
+
+    def _score(self, url: str, depth: int) -> float:
+        return self.priority.score(url, depth, self._focused(url))
+
+    def _focused(self, url: str) -> bool:
+        if any(url.startswith(prefix) for prefix in self._focus_urls):
+            return True
+        if self._focus_term:
+            return self._focus_term in unquote(urlparse(url).path).lower()
+        return False
+
+    def task_done(self) -> None:
+        with self._cond:
+            self._pending -= 1
+            if self._pending <= 0:
+                self._cond.notify_all()
+
+    def close(self) -> None:
+        """Abandon queued work and release every blocked worker."""
+        with self._cond:
+            self._closed = True
+            self._heap.clear()
+            self._deferred.clear()
+            self._cond.notify_all()
+
+    def mark_seen(self, urls: Iterable[str]) -> None:
+        """Treat urls as already fetched (e.g. listings done before a resume)."""
+        with self._cond:
+            self._seen.update(urls)
+
+    def seen(self, url: str) -> bool:
+        with self._cond:
+            return url in self._seen
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return self._pending
+
+    @property
+    def finished(self) -> bool:
+        with self._cond:
+            return self._closed or self._pending <= 0
+
+    @property
+    def seen_count(self) -> int:
+        with self._cond:
+            return len(self._seen)
+
+
+class DirectoryCrawler:
+    """Fetch directory listings with a pool of worker threads.
+
+    ``fetch_listing(url)`` returns or yields the url_info dicts of one listing
+    page. Directory entries that have not been seen yet are queued for
+    fetching; new entries are handed to ``on_listing(url, entries)`` in
+    batches of up to ``batch_size`` from the worker thread that fetched them,
+    so a huge page streams out while it is still being read.
+    ``on_queued(url, depth)`` and ``on_listed(url)`` report frontier changes
+    (a directory queued, a listing read completely) for checkpointing.
+    Queued directories are fetched in ``priority`` order (see CrawlPriority).
+    ``wait_for_capacity()`` is called before each fetch, outside any request,
+    so the consumer can hold the crawl back while its backlog is full; it
+    returns False to stop. ``retry_after(url)`` is called after each fetch;
+    a delay in seconds re-queues the listing (it failed), None means no retry
+    is due. ``gave_up(url)`` then tells a listing that failed for good from
+    one that was read. A failed one is not counted as fetched and is reported
+    to ``on_failed(url)`` instead of ``on_listed``.
+    """
+
+    def __init__(
+        self,
+        fetch_listing: Callable[[str], Iterable[dict]],
+        *,
+        workers: int = 10,
+        pause_event: threading.Event | None = None,
+        should_stop: Callable[[], bool] | None = None,
+        on_listing: Callable[[str, list[dict]], None] | None = None,
+        batch_size: int = 256,
+        on_queued: Callable[[str, int], None] | None = None,
+        on_listed: Callable[[str], None] | None = None,
+        priority: CrawlPriority | None = None,
+        wait_for_capacity: Callable[[], bool] | None = None,
+        retry_after: Callable[[str], float | None] | None = None,
+        gave_up: Callable[[str], bool] | None = None,
+        on_failed: Callable[[str], None] | None = None,
+    ):
+        self.fetch_listing = fetch_listing
+        self.workers = max(1, int(workers))
+        self.pause_event = pause_event
+        self.should_stop = should_stop or (lambda: False)
+        self.on_listing = on_listing
+        self.batch_size = max(1, int(batch_size))
+        self.on_queued = on_queued
+        self.on_listed = on_listed
+        self.wait_for_capacity = wait_for_capacity
+        self.retry_after = retry_after
+        self.gave_up = gave_up
+        self.on_failed = on_failed
+        self.frontier = CrawlFrontier(priority)
+        self.listings_fetched = 0
+        self.entries_found = 0
+        self._stats_lock = threading.Lock()
+
+    def crawl(
+        self,
+        root_url: str,
+        pending: Iterable[tuple[str, int]] | None = None,
+        done: Iterable[str] = (),
+    ) -> None:
+        """Crawl everything reachable from root_url; return when done or stopped.
+
+        To resume, pass the listings still ``pending`` as (url, depth) pairs and
+        the ones already ``done``; root_url is then not queued again.
+        """
+        self.frontier.mark_seen(done)
+        for url, depth in [(root_url, 0)] if pending is None else pending:
+            self._queue(url, depth)
+        threads = [
+            threading.Thread(target=self._worker, name=f"crawler-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def estimated_remaining(self) -> int:
+        """Guess how many entries the listings still queued will yield."""
+        with self._stats_lock:
+            if not self.listings_fetched:
+                return 0
+            per_listing = self.entries_found / self.listings_fetched
+        return round(per_listing * self.frontier.pending)
+
+    def _wait_if_paused(self) -> bool:
+        """Block while paused. Return False if a stop was requested meanwhile."""
+        if self.pause_event is not None:
+            while not self.pause_event.wait(0.2):
+                if self.should_stop():
+                    return False
+        return not self.should_stop()
+
+    def _wait_for_capacity(self) -> bool:
+        return self.wait_for_capacity is None or self.wait_for_capacity()
+
+    def _worker(self) -> None:
+        while True:
+            item = self.frontier.get(self.should_stop)
+            if item is None:
+                return
+            url, depth = item
+            try:
+                if not self._wait_if_paused() or not self._wait_for_capacity():
+                    self.frontier.close()
+                    return
+                new_entries = []
+                files = 0
+                for entry in self.fetch_listing(url):
+                    if entry["is_directory"] and not self._queue(entry["url"], depth + 1):
+                        continue
+                    new_entries.append(entry)
+                    files += not entry["is_directory"]
+                    if len(new_entries) >= self.batch_size:
+                        self._emit(url, new_entries)
+                        new_entries = []
+                        if self.should_stop():
+                            break
+                self._emit(url, new_entries)
+                delay = self.retry_after(url) if self.retry_after is not None else None
+                if delay is not None:
+                    with self._stats_lock:
+                        self.entries_found -= files  # the retry lists them again
+                    self.frontier.defer(url, depth, delay)
+                    continue
+                if self.gave_up is not None and self.gave_up(url):
+                    if self.on_failed is not None and not self.should_stop():
+                        self.on_failed(url)
+                    continue
+                with self._stats_lock:
+                    self.listings_fetched += 1
+                if self.on_listed is not None and not self.should_stop():
+                    self.on_listed(url)
+            finally:
+                self.frontier.task_done()
+
+    def _queue(self, url: str, depth: int) -> bool:
+        if not self.frontier.add(url, depth):
+            return False
+        if self.on_queued is not None:
+            self.on_queued(url, depth)
+        return True
+
+    def _emit(self, url: str, entries: list[dict]) -> None:
+        with self._stats_lock:
+            self.entries_found += len(entries)
+        if self.on_listing is not None and entries:
+            self.on_listing(url, entries)
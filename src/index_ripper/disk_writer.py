@@ -0,0 +1,205 @@
+"""Disk stage of a download: large buffered writes on a thread of their own.
+
+The download worker (the network stage) hands every chunk it reads to a
+DiskWriter. The writer gathers chunks into blocks of ``write_size`` bytes
+and passes them to a writer thread through a queue of at most
+``queue_blocks`` blocks. A slow disk therefore stalls the socket only once
+that queue is full. The file is also written in a few large sequential
+writes rather than one small write per network read.
+
+Each writer keeps StageStats. They record how long the network stage waited
+for room in the queue, which means the disk is the bottleneck, and how long
+the writer thread waited for data, which means the network is.
+``preallocate`` reserves a file's full length with posix_fallocate where
+the platform has it, so the blocks of a large download land contiguously.
+"""
+from __future__ import annotations
+
+import errno
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+
+DEFAULT_READ_SIZE = 64 * 1024
+DEFAULT_WRITE_SIZE = 1024 * 1024
+DEFAULT_QUEUE_BLOCKS = 8
+
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    bytes: int = 0
+    writes: int = 0
+    write_time: float = 0.0  # seconds spent in write calls
+    network_wait: float = 0.0  # seconds the network stage waited for the disk
+    disk_wait: float = 0.0  # seconds the disk stage waited for the network
+
+    def add(self, other: StageStats) -> None:
+        self.bytes += other.bytes
+        self.writes += other.writes
+        self.write_time += other.write_time
+        self.network_wait += other.network_wait
+        self.disk_wait += other.disk_wait
+
+    @property
+    def bottleneck(self) -> str:
+        return "disk" if self.network_wait > self.disk_wait else "network"
+
+    def format(self) -> str:
+        return (
+            f"{self.bytes / (1024 * 1024):.1f} MB in {self.writes} writes "
+            f"({self.write_time:.1f}s writing); network waited {self.network_wait:.1f}s "
+            f"for the disk, disk waited {self.disk_wait:.1f}s for the network "
+            f"({self.bottleneck}-bound)"
+        )
+
+
+def preallocate(file_handle, length: int) -> bool:
+    """Give the file its full length up front. Return True if disk blocks were
+    reserved, False if it could only be extended sparsely (no posix_fallocate,
+    or a filesystem that does not support it). A full disk raises OSError."""
+    fallocate = getattr(os, "posix_fallocate", None)
+    if fallocate is not None and length > 0:
+        file_handle.flush()
+        try:
+            fallocate(file_handle.fileno(), 0, length)
+            return True
+        except OSError as ex:
+            if ex.errno in (errno.ENOSPC, errno.EFBIG):
+                raise
+    file_handle.truncate(length)
+    return False
+
+
+class DiskWriter:
+    """Write to file_handle, from its current position, on a writer thread.
+
+    Use as a context manager, or call ``close()``. After that, the handle
+    is back with the caller. A write error is raised by the next ``write``
+    or by ``close``.
+    """
+
+    def __init__(
+        self,
+        file_handle,
+        write_size: int = DEFAULT_WRITE_SIZE,
+        queue_blocks: int = DEFAULT_QUEUE_BLOCKS,
+    ):
+        self.file_handle = file_handle
+        self.write_size = max(1, int(write_size))
+        self.stats = StageStats()
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(queue_blocks)))
+        self._lock = threading.Lock()
+        self._buffer = bytearray()
+        self._buffer_start = file_handle.tell()  # file position of _buffer[0]
+        self._pending: list[tuple[int, int]] = []  # queued [first, end) ranges, oldest first
+        self._written_to = self._buffer_start
+        self._error: BaseException | None = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="download-writer", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> DiskWriter:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+            return
+        try:
+            self.close()  # still write what was received, so a retry can continue after it
+        except Exception:
+            pass  # the exception already on its way out says more
+
+    def write(self, data: bytes) -> None:
+        self._raise_error()
+        with self._lock:
+            self._buffer += data
+            full = len(self._buffer) >= self.write_size
+        if full:
+            self._submit()
+
+    def seek(self, position: int) -> None:
+        """Continue at position; bytes written before go to their old place."""
+        self._submit()
+        with self._lock:
+            self._buffer_start = position
+
+    @property
+    def written_to(self) -> int:
+        """File position up to which every byte handed over is on disk (sequential writes)."""
+        with self._lock:
+            return self._written_to
+
+    def unwritten(self) -> list[list[int]]:
+        """[first, last] byte ranges handed to the writer but not on disk yet."""
+        with self._lock:
+            ranges = [[first, end - 1] for first, end in self._pending]
+            if self._buffer:
+                ranges.append([self._buffer_start, self._buffer_start + len(self._buffer) - 1])
+            return ranges
+
+    def close(self) -> None:
+        """Write what is buffered and wait for the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if self._error is None:
+                self._submit()
+        finally:
+            self._queue.put(_DONE)  # the writer thread drains the queue even after an error
+            self._thread.join()
+        self._raise_error()
+
+    def _submit(self) -> None:
+        with self._lock:
+            if not self._buffer:
+                return
+            block = (self._buffer_start, bytes(self._buffer))
+            end = self._buffer_start + len(block[1])
+            self._pending.append((self._buffer_start, end))
+            self._buffer_start = end
+            self._buffer.clear()
+        started = time.monotonic()
+        while True:
+            self._raise_error()
+            try:
+                self._queue.put(block, timeout=0.2)
+                break
+            except queue.Full:
+                continue
+        self.stats.network_wait += time.monotonic() - started
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def _run(self) -> None:
+        handle = self.file_handle
+        while True:
+            started = time.monotonic()
+            item = self._queue.get()
+            self.stats.disk_wait += time.monotonic() - started
+            if item is _DONE:
+                return
+            if self._error is not None:
+                continue  # keep draining so the network stage never blocks on a dead writer
+            position, data = item
+            started = time.monotonic()
+            try:
+                if handle.tell() != position:
+                    handle.seek(position)
+                handle.write(data)
+            except Exception as ex:
+                self._error = ex
+                continue
+            self.stats.write_time += time.monotonic() - started
+            self.stats.bytes += len(data)
+            self.stats.writes += 1
+            with self._lock:
+                self._pending.pop(0)
+                self._written_to = position + len(data)
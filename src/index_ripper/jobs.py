@@ -0,0 +1,243 @@
+"""Scan several roots at once under one worker budget and one connection pool.
+
+A ScanJobManager runs one Backend per root (a ScanJob), up to
+``max_concurrent_jobs`` at a time. The jobs share the parent's HTTP session,
+so keep-alive connections are reused across jobs. They also share one
+AdaptiveConcurrency, which means per-host limits hold across every job
+scanning a host, and its WorkerBudget caps the requests in flight across all
+jobs. Rate limits are shared the same way. Each job collects its files and
+folders in its own JobResults, so two mirrors with the same layout do not
+overwrite each other.
+
+The asyncio engine opens an aiohttp pool per scan. Jobs using it still share
+the limits and budget, but not the connections.
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import threading
+from dataclasses import dataclass, field
+
+from index_ripper.backend import (
+    DEFAULT_SCAN_WORKERS,
+    MAX_SCAN_CONCURRENCY,
+    OVERLOAD_ERRORS,
+    Backend,
+)
+from index_ripper.concurrency import AdaptiveConcurrency, WorkerBudget
+from index_ripper.connections import DEFAULT_DNS_TTL, DnsCache, make_session, session_stats
+from index_ripper.ratelimit import RateLimiter
+
+DEFAULT_SCAN_BUDGET = 32
+DEFAULT_CONCURRENT_JOBS = 4
+
+
+class JobResults:
+    """The ui_manager a job's Backend writes to: its own results namespace,
+    the parent's session, and log lines tagged with the job's root."""
+
+    def __init__(self, parent, url: str):
+        self.parent = parent
+        self.url = url
+        self.session = parent.session
+        self.timeout = parent.timeout
+        self.USER_AGENT = parent.USER_AGENT
+        # Per job: Backend sets it when its scan ends, which must not resume the others
+        self.scan_pause_event = threading.Event()
+        self.scan_pause_event.set()
+        self.is_scanning = False
+        self.scanned_urls = 0
+        self.total_urls = 0
+        self.files_dict: dict = {}
+        self.folders: dict = {}
+        self.files_dict_lock = threading.Lock()
+        self.log_messages: list[str] = []
+
+    def log_message(self, message: str) -> None:
+        self.log_messages.append(message)
+        log = getattr(self.parent, "log_message", None)
+        if callable(log):
+            log(f"[{self.url}] {message}")
+
+    def notify_info(self, title: str, message: str) -> None:
+        # One popup per job would bury the user; the log is enough
+        self.log_message(f"{title}: {message}")
+
+    notify_warning = notify_info
+    notify_error = notify_info
+
+    def on_scan_item(self, **payload) -> None:
+        if payload.get("is_directory"):
+            self.folders[payload["path"]] = payload["url"]
+        else:
+            with self.files_dict_lock:
+                self.files_dict[payload["full_path"]] = payload
+
+
+@dataclass
+class ScanJob:
+    url: str
+    backend: Backend
+    results: JobResults
+    status: str = "queued"  # queued, running, done, stopped or failed
+    error: str | None = None
+    future: concurrent.futures.Future | None = field(default=None, repr=False)
+
+
+class ScanJobManager:
+    """Run ScanJobs concurrently; see the module docstring.
+
+    ``max_workers`` is the global budget of in-flight scan requests.
+    ``configure_backend(backend)`` is called on each job's Backend before it
+    starts, to apply the same settings the single-root app uses. The parent
+    ui_manager may define ``on_job_started(job)`` and ``on_job_finished(job)``.
+    """
+
+    def __init__(
+        self,
+        ui_manager,
+        max_workers: int = DEFAULT_SCAN_BUDGET,
+        max_concurrent_jobs: int = DEFAULT_CONCURRENT_JOBS,
+        configure_backend=None,
+    ):
+        self.ui_manager = ui_manager
+        self.budget = WorkerBudget(max_workers)
+        self.scan_limits = AdaptiveConcurrency(
+            min(DEFAULT_SCAN_WORKERS, self.budget.limit),
+            max_limit=MAX_SCAN_CONCURRENCY,
+            overload_errors=OVERLOAD_ERRORS,
+            on_change=self._on_limit_change,
+        )
+        self.scan_limits.budget = self.budget
+        self.rate_limits = RateLimiter()
+        self.configure_backend = configure_backend
+        self.jobs: list[ScanJob] = []
+        self.paused = False
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, int(max_concurrent_jobs)), thread_name_prefix="scan-job"
+        )
+
+    def add(self, url: str) -> ScanJob:
+        """Queue a scan of url; it starts as soon as a job slot is free."""
+        results = JobResults(self.ui_manager, url)
+        if self.paused:
+            results.scan_pause_event.clear()
+        backend = Backend(results)
+        if self.configure_backend is not None:
+            self.configure_backend(backend)
+        backend.scan_limits = self.scan_limits
+        backend.rate_limits = self.rate_limits
+        job = ScanJob(url, backend, results)
+        self.jobs.append(job)
+        job.future = self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job: ScanJob) -> None:
+        if job.backend.should_stop:
+            job.status = "stopped"
+            return
+        job.status = "running"
+        self._call_hook("on_job_started", job)
+        try:
+            job.backend.scan_website(job.url)
+            job.status = "stopped" if job.backend.should_stop else "done"
+        except Exception as ex:  # one broken root must not take the others down
+            job.status = "failed"
+            job.error = str(ex)
+        self._call_hook("on_job_finished", job)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until every queued job has finished. Return False on timeout."""
+        futures = [job.future for job in self.jobs]
+        _done, pending = concurrent.futures.wait(futures, timeout=timeout)
+        return not pending
+
+    def pause(self) -> None:
+        self.paused = True
+        for job in self.jobs:
+            job.results.scan_pause_event.clear()
+
+    def resume(self) -> None:
+        self.paused = False
+        for job in self.jobs:
+            job.results.scan_pause_event.set()
+
+    def stop(self) -> None:
+        """Stop running jobs and drop queued ones."""
+        for job in self.jobs:
+            job.backend.should_stop = True
+        self.resume()
+
+    def close(self) -> None:
+        self.stop()
+        self._executor.shutdown(wait=True)
+
+    def _on_limit_change(self, host, old, new, reason):
+        self._log(f"[Concurrency] scan limit for {host}: {old} -> {new} ({reason})")
+
+    def _log(self, message: str) -> None:
+        log = getattr(self.ui_manager, "log_message", None)
+        if callable(log):
+            log(message)
+
+    def _call_hook(self, hook_name: str, job: ScanJob) -> None:
+        hook = getattr(self.ui_manager, hook_name, None)
+        if callable(hook):
+            try:
+                hook(job=job)
+            except Exception as ex:
+                self._log(f"[Hook] {hook_name} failed: {ex}")
+
+
+class _HeadlessUI:
+    """Parent ui_manager for ``python -m index_ripper --scan-roots``."""
+
+    USER_AGENT = "IndexRipper/2.0"
+
+    def __init__(self, pool_size: int, dns_ttl: float = DEFAULT_DNS_TTL):
+        self.timeout = (10, 20)
+        self.dns_cache = DnsCache(dns_ttl) if dns_ttl > 0 else None
+        # One pooled connection per budgeted request, so no job has to drop one
+        self.session = make_session(pool_size, dns_cache=self.dns_cache)
+
+    def log_message(self, message: str) -> None:
+        print(message, flush=True)
+
+
+def scan_roots_cli(args: list[str]) -> int:
+    """Scan every URL in args concurrently and print a summary line per root.
+
+    ``--budget=N`` sets the global in-flight request budget, ``--jobs=N``
+    how many roots are scanned at once and ``--dns-ttl=SECONDS`` how long
+    host names stay cached (0 disables the cache). Returns the process exit
+    code.
+    """
+    options = dict(arg[2:].split("=", 1) for arg in args if arg.startswith("--") and "=" in arg)
+    urls = [arg for arg in args if not arg.startswith("--")]
+    if not urls:
+        print("usage: python -m index_ripper --scan-roots URL [URL ...] [--budget=N] [--jobs=N]")
+        return 2
+    budget = int(options.get("budget", DEFAULT_SCAN_BUDGET))
+    ui_manager = _HeadlessUI(budget, float(options.get("dns-ttl", DEFAULT_DNS_TTL)))
+    manager = ScanJobManager(
+        ui_manager,
+        max_workers=budget,
+        max_concurrent_jobs=int(options.get("jobs", DEFAULT_CONCURRENT_JOBS)),
+    )
+    jobs = [manager.add(url) for url in urls]
+    try:
+        manager.wait()
+    except KeyboardInterrupt:
+        manager.stop()
+    manager.close()
+    for job in jobs:
+        print(
+            f"{job.status:8} {job.url}: {len(job.results.files_dict)} files, "
+            f"{len(job.results.folders)} folders" + (f" ({job.error})" if job.error else "")
+        )
+    print(f"Peak in-flight requests: {manager.budget.peak} (budget {manager.budget.limit})")
+    summary = f"Connections: {session_stats(ui_manager.session).format()}"
+    if ui_manager.dns_cache is not None:
+        summary += f"; DNS: {ui_manager.dns_cache.format()}"
+    print(summary)
+    return 0 if all(job.status == "done" for job in jobs) else 1
@@ -0,0 +1,138 @@
+"""Lazy scanning: list directories when they are opened instead of crawling everything.
+
+Selected with ``Backend.lazy_scan = True`` (or ``INDEX_RIPPER_LAZY_SCAN=1``).
+The scan itself lists only the start page. Every folder in the tree is
+listed the first time it is expanded, through ``Backend.expand_directory``.
+After a folder is listed, its first few subfolders are prefetched in the
+background, so the next expansion is usually answered from memory.
+Prefetched listings are only cached, not emitted. Their files get HEAD
+requests only once the folder is actually opened.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+DEFAULT_PREFETCH = 4
+MAX_CACHED_LISTINGS = 256
+
+
+class LazyScanner:
+    def __init__(
+        self,
+        backend,
+        base_url: str,
+        prefetch: int = DEFAULT_PREFETCH,
+        max_cached: int = MAX_CACHED_LISTINGS,
+    ):
+        self.backend = backend
+        self.base_url = base_url
+        self.prefetch = max(0, int(prefetch))
+        self.max_cached = max(1, int(max_cached))
+        # Expansions, prefetches and per-item work (HEADs) get separate pools so
+        # a click never waits behind background prefetching.
+        self._expand_pool = ThreadPoolExecutor(2, thread_name_prefix="lazy-expand")
+        self._prefetch_pool = ThreadPoolExecutor(2, thread_name_prefix="lazy-prefetch")
+        self._item_pool = ThreadPoolExecutor(backend.scan_workers, thread_name_prefix="lazy-item")
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[str, list[dict]] = OrderedDict()
+        self._inflight: dict[str, Future] = {}
+        self._expanded: set[str] = set()
+        self._seen_dirs: set[str] = set()  # folders already emitted, like the crawler's seen-set
+        self._closed = False
+
+    def close(self) -> None:
+        """Drop queued work; listings already in flight finish without emitting."""
+        self._closed = True
+        for pool in (self._expand_pool, self._prefetch_pool, self._item_pool):
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def expand(self, url: str) -> Future:
+        """List url (once), emit its items to the UI and prefetch its subfolders.
+
+        The returned future resolves to the number of items emitted.
+        """
+        return self._expand_pool.submit(self._expand, url)
+
+    def is_expanded(self, url: str) -> bool:
+        with self._lock:
+            return url in self._expanded
+
+    def cached(self, url: str) -> bool:
+        with self._lock:
+            return url in self._cache
+
+    def _expand(self, url: str) -> int:
+        with self._lock:
+            if url in self._expanded or self._closed:
+                return 0
+            self._expanded.add(url)
+            self._seen_dirs.add(url)
+        entries = self._new_entries(self._entries(url))
+        if self._closed:
+            return 0
+        self._prefetch([info["url"] for info in entries if info["is_directory"]])
+        list(self._item_pool.map(self._process_item, entries))
+        self.backend._call_ui_hook("on_directory_listed", url=url, count=len(entries))
+        return len(entries)
+
+    def _new_entries(self, entries: list[dict]) -> list[dict]:
+        """Drop parent and cross links to folders that are already in the tree."""
+        kept = []
+        with self._lock:
+            for url_info in entries:
+                if url_info["is_directory"]:
+                    if url_info["url"] in self._seen_dirs:
+                        continue
+                    self._seen_dirs.add(url_info["url"])
+                kept.append(url_info)
+        return kept
+
+    def _process_item(self, url_info: dict) -> None:
+        if self._closed:
+            return
+        if url_info["is_directory"]:
+            self.backend._process_directory(url_info["url"])
+        else:
+            self.backend._process_file(url_info["url"], url_info)
+        self.backend._count_scanned_item()
+
+    def _entries(self, url: str) -> list[dict]:
+        with self._lock:
+            entries = self._cache.pop(url, None)
+            future = self._inflight.get(url)
+        if entries is not None:
+            return entries
+        if future is not None:
+            wait([future])
+            with self._lock:
+                entries = self._cache.pop(url, None)
+            if entries is not None:
+                return entries
+        return list(self.backend._list_directory(url, self.base_url))
+
+    def _prefetch(self, urls: list[str]) -> None:
+        with self._lock:
+            for url in urls[: self.prefetch]:
+                if url in self._cache or url in self._inflight or url in self._expanded:
+                    continue
+                try:
+                    self._inflight[url] = self._prefetch_pool.submit(self._fetch, url)
+                except RuntimeError:  # closed
+                    return
+
+    def _fetch(self, url: str) -> None:
+        try:
+            if self._closed:
+                return
+            entries = list(self.backend._list_directory(url, self.base_url))
+            with self._lock:
+                # Empty results are not cached: they may be a failed request
+                if entries:
+                    self._cache[url] = entries
+                    while len(self._cache) > self.max_cached:
+                        self._cache.popitem(last=False)
+        finally:
+            with self._lock:
+                self._inflight.pop(url, None)
@@ -0,0 +1,64 @@
+"""Validator cache for listing pages, so re-scans can ask "has this changed?".
+
+For every listing page that came with an ETag or Last-Modified header, the
+cache keeps those validators and the page's parsed entries. The next scan
+sends them back as If-None-Match / If-Modified-Since; on 304 Not Modified
+the cached entries are replayed instead of downloading and parsing the page.
+Entries are stored as parsed (before scope filtering), so a cached page is
+valid whatever start URL the next scan uses. Pages are rows of the scan
+index database (see scan_index) and are read one at a time, so the cache
+holds nothing in memory; without an index it uses an in-memory database.
+"""
+from __future__ import annotations
+
+from index_ripper.listing import ListingEntry
+from index_ripper.scan_index import ScanIndex
+
+
+class ListingCache:
+    def __init__(self, index: ScanIndex | None = None):
+        self.index = index if index is not None else ScanIndex(":memory:")
+
+    def __len__(self) -> int:
+        return self.index.page_count()
+
+    def save(self) -> None:
+        """Write pages stored since the last save."""
+        self.index.flush()
+
+    def request_headers(self, url: str) -> dict[str, str]:
+        """Conditional request headers for url, or {} if nothing is cached."""
+        validators = self.index.validators(url)
+        if validators is None:
+            return {}
+        etag, last_modified = validators
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def entries(self, url: str) -> list[ListingEntry] | None:
+        """Entries parsed the last time url was fetched, or None if not cached."""
+        page = self.index.page(url)
+        if page is None:
+            return None
+        return [ListingEntry(*fields) for fields in page[2]]
+
+    def store(
+        self, url: str, etag: str | None, last_modified: str | None, entries: list[ListingEntry]
+    ) -> None:
+        """Remember a freshly parsed page; pages without validators are forgotten."""
+        if not etag and not last_modified:
+            self.index.forget_page(url)
+            return
+        self.index.store_page(
+            url,
+            etag or "",
+            last_modified or "",
+            [[e.href, e.name, e.size, e.modified, e.file_type, e.directory_hint] for e in entries],
+        )
+
+    def clear(self) -> None:
+        self.index.clear_pages()
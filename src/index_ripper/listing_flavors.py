@@ -0,0 +1,234 @@
+"""Per-server listing flavours: recognize the autoindex module once, then use a
+specialized extractor for the rest of the crawl.
+
+The generic parser in ``listing`` tokenizes every tag and pairs each link
+with its row text, because it has to cope with any layout. nginx and Apache
+mod_autoindex pages are much more regular: one entry per line, with the
+name, date and size always in the same place. ``detect_flavor`` looks at the
+first page of a host (Server header and markup signature). Later pages from
+the host go through a ``FlavorParser``, which matches each line with a single
+regex and skips the parent-directory and sort-order links without looking
+at them further.
+
+Hosts whose pages match no flavour keep using the generic parser, and each
+of their pages is sniffed until one matches. A page that does not fit the
+locked-in layout (a custom header, a README table, a different module on
+one path) falls back to the generic parser for that page only. The parser
+does not keep the whole page for that. It keeps the head of the page, up to
+the first entry, and the last REPLAY_LINES lines. On fallback it replays
+those to the generic parser and drops the entries it already emitted from
+them. A line longer than MAX_LINE_CHARS also means the page is not
+line-oriented, and it falls back as well.
+"""
+from __future__ import annotations
+
+import html
+import re
+from collections import deque
+from functools import lru_cache
+from urllib.parse import unquote
+
+from index_ripper.listing import ListingEntry, ListingParser, parse_listing_date, parse_size
+
+# Enough of the first page to contain the <h1>, sort links and first rows
+SNIFF_CHARS = 8192
+# Lines kept for replay when a page falls back to the generic parser
+REPLAY_LINES = 64
+MAX_LINE_CHARS = 64 * 1024
+
+_DATE = (
+    r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}(?::\d{2})?"
+    r"|\d{1,2}-[A-Za-z]{3}-\d{4} \d{2}:\d{2}(?::\d{2})?)"
+)
+_LINK = r'<a href="([^"]*)">([^<]*)</a>'
+
+# One regex per flavour; groups are (href, link text, date, size)
+_LINE_RES = {
+    "nginx": re.compile(_LINK + r"\s+" + _DATE + r"\s+(\S+)\s*$"),
+    "apache-pre": re.compile(_LINK + r"\s+" + _DATE + r"\s+(\S+)"),
+    "apache-table": re.compile(
+        _LINK + r"\s*</td><td[^>]*>\s*" + _DATE + r"\s*</td><td[^>]*>\s*([^<\s]+)\s*</td>"
+    ),
+}
+FLAVORS = tuple(_LINE_RES)
+
+# Links every page of a flavour carries and that never are entries
+_DECORATIONS = (
+    'href="?',              # Apache sort-order links (header row)
+    'href="../"',           # nginx parent link
+    "Parent Directory</a>",  # Apache parent link
+)
+_PARENT_NAMES = ("../", "Parent Directory")
+
+_APACHE_SORT_RE = re.compile(r'<a href="\?C=[NMSD];O=[AD]"', re.I)
+_NGINX_SIGNATURE = '<hr><pre><a href="../">../</a>'
+
+
+def detect_flavor(server: str | None, head: str) -> str | None:
+    """Guess the listing flavour from a Server header and the start of a page.
+
+    Returns one of FLAVORS, or None for layouts without a specialized
+    extractor (lighttpd, Caddy, IIS, python http.server, custom pages).
+    """
+    server = server.lower() if isinstance(server, str) else ""
+    if _APACHE_SORT_RE.search(head):
+        if "<table" in head:
+            return "apache-table"
+        if "<pre" in head:
+            return "apache-pre"
+        return None
+    if _NGINX_SIGNATURE in head or (
+        server.startswith("nginx") and "<h1>Index of " in head and "<pre>" in head
+    ):
+        return "nginx"
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _stamp(date: str) -> str:
+    return parse_listing_date(date)[0]
+
+
+def _entry_from_match(match: re.Match) -> ListingEntry | None:
+    href, name, date, size_text = match.groups()
+    if href.startswith("?") or name in _PARENT_NAMES:
+        return None
+    if "&" in href:
+        href = html.unescape(href)
+    if "&" in name:
+        name = html.unescape(name)
+    if name.endswith("..>"):
+        # nginx and Apache cut long names in the link text; the href is complete
+        name = unquote(href.rstrip("/").rsplit("/", 1)[-1]) + ("/" if href.endswith("/") else "")
+    is_directory = size_text == "-" or href.endswith("/")
+    return ListingEntry(
+        href=href,
+        name=name,
+        size=None if is_directory else int(size_text) if size_text.isdigit() else parse_size(size_text),
+        modified=_stamp(date),
+        directory_hint=is_directory,
+    )
+
+
+class FlavorParser:
+    """Line-by-line extractor for one flavour, with per-page generic fallback.
+
+    Same feed/close/pop_entries interface as ListingParser. ``fell_back`` is
+    True once the page turned out not to match the flavour; ``on_fall_back``
+    is called at that point.
+    """
+
+    def __init__(self, flavor: str, backend: str | None = None, on_fall_back=None):
+        self.flavor = flavor
+        self.backend = backend
+        self._on_fall_back = on_fall_back
+        self.entries: list[ListingEntry] = []
+        self.fell_back = False
+        self._line_re = _LINE_RES[flavor]
+        self._tail = ""
+        # Replay context: the head of the page (its <pre> or <table>) and recent lines,
+        # each with the href emitted from it, if any
+        self._head: list[tuple[str, str | None]] = []
+        self._head_chars = 0
+        self._recent: deque[tuple[str, str | None]] = deque(maxlen=REPLAY_LINES)
+        self._emitted: set[str] = set()
+        self._generic: ListingParser | None = None
+
+    def feed(self, text: str) -> None:
+        if self._generic is not None:
+            self._generic.feed(text)
+            return
+        lines = (self._tail + text).split("\n")
+        self._tail = lines.pop()
+        self._extract(lines)
+        if self._generic is None and len(self._tail) > MAX_LINE_CHARS:
+            self._fall_back([])
+
+    def close(self) -> None:
+        if self._generic is None:
+            tail, self._tail = self._tail, ""
+            self._extract([tail])
+        if self._generic is not None:
+            self._generic.close()
+        self._head.clear()
+        self._recent.clear()
+
+    def pop_entries(self) -> list[ListingEntry]:
+        if self._generic is not None:
+            entries = [e for e in self._generic.pop_entries() if e.href not in self._emitted]
+            self.entries.extend(entries)
+        entries = self.entries[:]
+        self.entries.clear()
+        return entries
+
+    def _extract(self, lines: list[str]) -> None:
+        search = self._line_re.search
+        for index, line in enumerate(lines):
+            href = None
+            if "href=" in line:
+                match = search(line)
+                if match is None:
+                    if not any(mark in line for mark in _DECORATIONS):
+                        self._fall_back(lines[index:])
+                        return
+                else:
+                    entry = _entry_from_match(match)
+                    if entry is not None:
+                        href = entry.href
+                        self.entries.append(entry)
+            self._keep(line, href)
+
+    def _keep(self, line: str, href: str | None) -> None:
+        if self._head_chars < SNIFF_CHARS:
+            self._head.append((line, href))
+            # The head ends with the first entry
+            self._head_chars = SNIFF_CHARS if href is not None else self._head_chars + len(line) + 1
+        else:
+            self._recent.append((line, href))
+
+    def _fall_back(self, rest: list[str]) -> None:
+        self.fell_back = True
+        kept = self._head + list(self._recent)
+        self._emitted = {href for _line, href in kept if href is not None}
+        replay = [line for line, _href in kept] + rest
+        self._head.clear()
+        self._recent.clear()
+        self._generic = ListingParser(self.backend)
+        self._generic.feed("".join(line + "\n" for line in replay) + self._tail)
+        self._tail = ""
+        if self._on_fall_back is not None:
+            self._on_fall_back()
+
+
+class FlavorSniffer:
+    """Generic ListingParser that looks for a known flavour in the first
+    SNIFF_CHARS of the page and reports it with ``on_flavor(flavor)``."""
+
+    def __init__(self, server: str | None, on_flavor, backend: str | None = None):
+        self._server = server
+        self._on_flavor = on_flavor
+        self._parser = ListingParser(backend)
+        self._head: list[str] | None = []
+        self._head_len = 0
+
+    def feed(self, text: str) -> None:
+        if self._head is not None:
+            self._head.append(text)
+            self._head_len += len(text)
+            if self._head_len >= SNIFF_CHARS:
+                self._sniff()
+        self._parser.feed(text)
+
+    def close(self) -> None:
+        if self._head is not None:
+            self._sniff()
+        self._parser.close()
+
+    def pop_entries(self) -> list[ListingEntry]:
+        return self._parser.pop_entries()
+
+    def _sniff(self) -> None:
+        head, self._head = "".join(self._head), None
+        flavor = detect_flavor(self._server, head[:SNIFF_CHARS])
+        if flavor is not None:
+            self._on_flavor(flavor)
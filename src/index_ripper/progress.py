@@ -0,0 +1,227 @@
+"""Download progress, coalesced for the UI.
+
+Download workers report every chunk to a ProgressBoard. A report only
+updates a few counters under a lock. For each file, ``update`` returns True
+at most ``rate`` times a second, and always for the first report. A
+ui_manager that takes ``update_progress`` calls therefore gets a bounded
+stream of them however fast the chunks arrive. The desktop app does not
+take those calls. Its Tk thread drains ``snapshot()`` once per tick instead:
+the files whose progress changed since the last snapshot, plus the totals of
+the current batch (bytes, throughput and ETA).
+
+The caller that starts a set of downloads opens a batch with
+``start_batch``, listing every file with its size where known, and closes it
+with ``end_batch``. Files still queued count toward the totals and the ETA
+from the start, so the ETA covers the whole selection rather than only the
+downloads currently running. A download that starts outside any batch opens
+an implicit one, which lasts while downloads are running.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+DEFAULT_PROGRESS_RATE = 10.0  # progress updates per file and second
+RATE_SMOOTHING = 2.0  # time constant, in seconds, of the throughput average
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+@dataclass(frozen=True)
+class ProgressTotals:
+    done: int  # bytes on disk of the batch's files, resumed bytes included
+    total: int  # sum of the known sizes
+    transferred: int  # bytes received during this batch
+    rate: float  # bytes per second, smoothed
+    eta: float | None  # seconds left, None while unknown
+    active: int  # downloads still running
+    files: int
+    queued: int = 0  # files of the batch not started yet
+
+    def format(self) -> str:
+        text = _format_bytes(self.done)
+        if self.total:
+            text += f" of {_format_bytes(self.total)}"
+        if self.active or self.queued:
+            text += f" · {_format_bytes(self.rate)}/s"
+            if self.eta is not None:
+                text += f" · {_format_duration(self.eta)} left"
+        return text
+
+
+@dataclass(frozen=True)
+class ProgressSnapshot:
+    # file_path -> (file_name, percent), for files changed since the last snapshot;
+    # percent is None while the size is unknown
+    files: dict[str, tuple[str, float | None]]
+    totals: ProgressTotals
+
+
+class _FileProgress:
+    __slots__ = ("name", "done", "total", "last_emit", "changed", "active", "queued")
+
+    def __init__(self, name: str, done: int, total: int | None, queued: bool = False):
+        self.name = name
+        self.done = done
+        self.total = total
+        self.last_emit: float | None = None
+        self.changed = not queued
+        self.active = not queued
+        self.queued = queued
+
+    @property
+    def percent(self) -> float | None:
+        if not self.total:
+            return None
+        return min(100.0, self.done / self.total * 100)
+
+
+class ProgressBoard:
+    """Per-file and batch progress of downloads; see the module docstring."""
+
+    def __init__(self, rate: float = DEFAULT_PROGRESS_RATE):
+        self.rate = rate
+        self._files: dict[str, _FileProgress] = {}
+        self._lock = threading.Lock()
+        self._batch = False  # a batch opened by start_batch is running
+        self._transferred = 0
+        self._speed = 0.0
+        self._mark = (time.monotonic(), 0)  # (time, transferred) of the last speed sample
+
+    @property
+    def interval(self) -> float:
+        """Least time between two reported updates of one file."""
+        return 1.0 / self.rate if self.rate > 0 else 0.0
+
+    def start_batch(self, files) -> None:
+        """Begin a batch of downloads. files holds (file_path, file_name, size)
+        for every file of it; size is None where unknown."""
+        with self._lock:
+            self._reset()
+            self._batch = True
+            for file_path, file_name, size in files:
+                self._files[file_path] = _FileProgress(file_name, 0, size, queued=True)
+
+    def end_batch(self) -> None:
+        """End the batch; files that never started (cancelled) no longer count."""
+        with self._lock:
+            self._batch = False
+            for file_path in [path for path, entry in self._files.items() if entry.queued]:
+                del self._files[file_path]
+
+    def begin(self, file_path: str, file_name: str, done: int = 0, total: int | None = None) -> None:
+        """Start (or restart at done bytes) the progress of a download."""
+        with self._lock:
+            self._begin(file_path, file_name, done, total)
+
+    def _begin(self, file_path, file_name, done, total) -> _FileProgress:
+        if not self._batch and not any(entry.active for entry in self._files.values()):
+            self._reset()
+        queued = self._files.get(file_path)
+        if total is None and queued is not None:
+            total = queued.total
+        entry = _FileProgress(file_name, done, total)
+        self._files[file_path] = entry
+        return entry
+
+    def _reset(self) -> None:
+        self._files.clear()
+        self._transferred = 0
+        self._speed = 0.0
+        self._mark = (time.monotonic(), 0)
+
+    def update(self, file_path: str, file_name: str, done: int, total: int | None = None) -> bool:
+        """Record that done bytes of file_path are on disk. Return True when the
+        update is due to be shown, at most ``rate`` times a second per file."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._files.get(file_path)
+            if entry is None or not entry.active:
+                entry = self._begin(file_path, file_name, done, total)
+            else:
+                self._transferred += max(0, done - entry.done)
+                entry.done = done
+                if total:
+                    entry.total = total
+                entry.changed = True
+            if entry.last_emit is not None and now - entry.last_emit < self.interval:
+                return False
+            entry.last_emit = now
+            return True
+
+    def finish(self, file_path: str, completed: bool = False) -> None:
+        """Take a download out of the running ones; a completed one counts as full."""
+        with self._lock:
+            entry = self._files.get(file_path)
+            if entry is None:
+                return
+            entry.active = False
+            if completed and entry.total:
+                self._transferred += max(0, entry.total - entry.done)
+                entry.done = entry.total
+                entry.changed = True
+
+    def percent(self, file_path: str) -> float | None:
+        with self._lock:
+            entry = self._files.get(file_path)
+            return entry.percent if entry is not None else None
+
+    def snapshot(self) -> ProgressSnapshot:
+        """Files changed since the last snapshot, and the batch totals."""
+        with self._lock:
+            files = {}
+            for path, entry in self._files.items():
+                if entry.changed:
+                    files[path] = (entry.name, entry.percent)
+                    entry.changed = False
+            return ProgressSnapshot(files, self._totals())
+
+    def totals(self) -> ProgressTotals:
+        with self._lock:
+            return self._totals()
+
+    def _totals(self) -> ProgressTotals:
+        now = time.monotonic()
+        elapsed = now - self._mark[0]
+        if elapsed > 0:
+            sample = (self._transferred - self._mark[1]) / elapsed
+            # Exponential average whose weight depends on the time covered,
+            # not on how often totals are asked for
+            weight = 1 - math.exp(-elapsed / RATE_SMOOTHING) if self._speed else 1.0
+            self._speed += (sample - self._speed) * weight
+            self._mark = (now, self._transferred)
+        entries = self._files.values()
+        done = sum(entry.done for entry in entries)
+        total = sum(entry.total or 0 for entry in entries)
+        active = sum(entry.active for entry in entries)
+        queued = sum(entry.queued for entry in entries)
+        left = sum(
+            max(0, entry.total - entry.done)
+            for entry in entries
+            if (entry.active or entry.queued) and entry.total
+        )
+        eta = left / self._speed if active and self._speed > 0 else None
+        return ProgressTotals(
+            done=done,
+            total=total,
+            transferred=self._transferred,
+            rate=self._speed if active else 0.0,
+            eta=eta,
+            active=active,
+            files=len(self._files),
+            queued=queued,
+        )
@@ -0,0 +1,144 @@
+"""Per-host token-bucket limits on requests per second and bytes per second.
+
+Each host gets one bucket for requests and one for bytes. A bucket holds up
+to ``burst_seconds`` worth of its rate, so a short transfer after an idle
+spell goes through at full speed, and sustained traffic settles at the rate.
+A take larger than the bucket (one big chunk) is allowed once the bucket is
+full and leaves it in debt. Rates can be changed at any time; waiters pick
+the new rate up within a fraction of a second.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+from urllib.parse import urlparse
+
+_WAIT_SLICE = 0.2
+
+
+class TokenBucket:
+    """``rate`` tokens per second, at most ``rate * burst_seconds`` banked. 0 = unlimited."""
+
+    def __init__(self, rate: float = 0, burst_seconds: float = 1.0):
+        self._lock = threading.Lock()
+        self._rate = 0.0
+        self._capacity = 0.0
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self.set_rate(rate, burst_seconds)
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def set_rate(self, rate: float, burst_seconds: float = 1.0) -> None:
+        with self._lock:
+            self._refill()
+            was_limited = bool(self._rate)
+            self._rate = max(0.0, float(rate or 0))
+            self._capacity = max(1.0, self._rate * burst_seconds) if self._rate else 0.0
+            # A newly limited bucket starts full; otherwise keep what is banked
+            self._tokens = min(self._tokens, self._capacity) if was_limited else self._capacity
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self._rate:
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def try_take(self, amount: float) -> float:
+        """Take ``amount`` tokens if available and return 0.0, else the seconds to wait."""
+        with self._lock:
+            if not self._rate:
+                return 0.0
+            self._refill()
+            need = min(amount, self._capacity)
+            if self._tokens >= need:
+                self._tokens -= amount
+                return 0.0
+            return (need - self._tokens) / self._rate
+
+    def take(self, amount: float, should_stop: Callable[[], bool] | None = None) -> bool:
+        """Block until ``amount`` tokens are taken. Return False if should_stop() fired."""
+        while True:
+            wait = self.try_take(amount)
+            if not wait:
+                return True
+            if should_stop is not None and should_stop():
+                return False
+            time.sleep(min(wait, _WAIT_SLICE))
+
+
+class RateLimiter:
+    """Request and byte buckets per host, with optional per-host overrides.
+
+    ``configure()`` changes the default limits (applied to every host without
+    an override) or, with ``host=``, one host's limits; existing buckets are
+    updated in place so running scans and downloads slow down or speed up.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = 0,
+        bytes_per_second: float = 0,
+        burst_seconds: float = 1.0,
+    ):
+        self.burst_seconds = burst_seconds
+        self._defaults = (float(requests_per_second or 0), float(bytes_per_second or 0))
+        self._overrides: dict[str, tuple[float, float]] = {}
+        self._buckets: dict[str, tuple[TokenBucket, TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        requests_per_second: float | None = None,
+        bytes_per_second: float | None = None,
+        host: str | None = None,
+    ) -> None:
+        """Set limits (None keeps the current value, 0 removes the limit)."""
+        with self._lock:
+            current = self._overrides.get(host, self._defaults) if host else self._defaults
+            limits = (
+                current[0] if requests_per_second is None else float(requests_per_second),
+                current[1] if bytes_per_second is None else float(bytes_per_second),
+            )
+            if host:
+                self._overrides[host] = limits
+                targets = [host] if host in self._buckets else []
+            else:
+                self._defaults = limits
+                targets = [h for h in self._buckets if h not in self._overrides]
+            for name in targets:
+                self._apply(name, limits)
+
+    def limits(self, host: str | None = None) -> tuple[float, float]:
+        """(requests/s, bytes/s) that apply to host; 0 means unlimited."""
+        with self._lock:
+            return self._overrides.get(host, self._defaults) if host else self._defaults
+
+    def _apply(self, host: str, limits: tuple[float, float]) -> None:
+        requests_bucket, bytes_bucket = self._buckets[host]
+        requests_bucket.set_rate(limits[0], self.burst_seconds)
+        bytes_bucket.set_rate(limits[1], self.burst_seconds)
+
+    def buckets(self, url: str) -> tuple[TokenBucket, TokenBucket]:
+        host = urlparse(url).netloc or url
+        with self._lock:
+            pair = self._buckets.get(host)
+            if pair is None:
+                rps, bps = self._overrides.get(host, self._defaults)
+                pair = (
+                    TokenBucket(rps, self.burst_seconds),
+                    TokenBucket(bps, self.burst_seconds),
+                )
+                self._buckets[host] = pair
+            return pair
+
+    def wait_request(self, url: str, should_stop: Callable[[], bool] | None = None) -> bool:
+        return self.buckets(url)[0].take(1, should_stop)
+
+    def wait_bytes(
+        self, url: str, count: int, should_stop: Callable[[], bool] | None = None
+    ) -> bool:
+        return self.buckets(url)[1].take(count, should_stop)
@@ -0,0 +1,212 @@
+"""Interrupted downloads kept as ``<file>.part`` and continued with HTTP Range.
+
+Bytes are written to ``<file>.part``. A sidecar, ``<file>.part.json``,
+records the URL and the validators of the response the bytes came from
+(ETag, Last-Modified, full length). The next attempt, whether a retry, a
+manual restart or a run after an app restart, asks for the rest with
+``Range: bytes=<size of .part>-`` and ``If-Range: <validator>``. A server
+whose copy changed answers with the whole file (200), so the .part file is
+rewritten from the start. A 206 whose Content-Range does not continue the
+.part file, or whose validators differ, also starts over. The .part file is
+renamed to its final name only once it has the full length.
+
+Downloads ask for ``Accept-Encoding: identity``. A server that compresses
+anyway sends a Content-Length of the compressed body, while the .part file
+holds the decoded bytes. Such a response has no usable length or offsets,
+so nothing is recorded for it and the next attempt starts over.
+
+A segmented download (see ``segmented``) preallocates the .part file and
+records the byte ranges still missing in the sidecar as ``segments``. Each
+range is continued with the same If-Range request and checked the same way.
+A single-stream download of known length also preallocates it (see
+``disk_writer``). Its sidecar records how many bytes were ``written``, which
+then takes the place of the file size.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+
+from index_ripper.utils import cleanup_partial_file
+
+PART_SUFFIX = ".part"
+META_SUFFIX = ".part.json"
+
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)", re.I)
+
+
+class PartialMismatch(IOError):
+    """A ranged response does not continue the .part file on disk."""
+
+
+def parse_content_range(value: str | None) -> tuple[int, int | None] | None:
+    """(first byte, full length or None) of a Content-Range header."""
+    match = _CONTENT_RANGE_RE.match(value or "")
+    if match is None:
+        return None
+    total = match.group(3)
+    return int(match.group(1)), None if total == "*" else int(total)
+
+
+def is_encoded(headers) -> bool:
+    """Whether a response body comes with a Content-Encoding (e.g. gzip)."""
+    return (headers.get("content-encoding") or "identity").strip().lower() != "identity"
+
+
+def _int_or_none(value) -> int | None:
+    return int(value) if isinstance(value, str) and value.isdigit() else None
+
+
+class PartialDownload:
+    """The .part file and validators for one download target."""
+
+    def __init__(
+        self,
+        file_path: str,
+        url: str,
+        etag=None,
+        last_modified=None,
+        length=None,
+        segments=None,
+        written=None,
+    ):
+        self.file_path = file_path
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.length = length
+        # Missing [first, last] byte ranges of a segmented download, else None
+        self.segments: list[list[int]] | None = segments
+        # Bytes written to a preallocated single-stream .part file, else None
+        self.written: int | None = written
+
+    @property
+    def part_path(self) -> str:
+        return self.file_path + PART_SUFFIX
+
+    @property
+    def meta_path(self) -> str:
+        return self.file_path + META_SUFFIX
+
+    @classmethod
+    def load(cls, file_path: str, url: str) -> PartialDownload:
+        """The partial download of url into file_path, or an empty one when the
+        sidecar is missing, unreadable or belongs to another URL."""
+        try:
+            with open(file_path + META_SUFFIX, encoding="utf-8") as file_obj:
+                meta = json.load(file_obj)
+        except (OSError, ValueError):
+            return cls(file_path, url)
+        if not isinstance(meta, dict) or meta.get("url") != url:
+            return cls(file_path, url)
+        return cls(
+            file_path,
+            url,
+            etag=meta.get("etag"),
+            last_modified=meta.get("last_modified"),
+            length=meta.get("length"),
+            segments=meta.get("segments"),
+            written=meta.get("written"),
+        )
+
+    @property
+    def offset(self) -> int:
+        """Bytes already on disk (of a preallocated, segmented file: its length)."""
+        try:
+            size = os.path.getsize(self.part_path)
+        except OSError:
+            return 0
+        return size if self.written is None else min(self.written, size)
+
+    @property
+    def received(self) -> int:
+        """Bytes of the file already downloaded."""
+        if self.segments is None or self.length is None:
+            return self.offset
+        return self.length - sum(last - first + 1 for first, last in self.segments)
+
+    @property
+    def validator(self) -> str | None:
+        """If-Range value: a strong ETag, else Last-Modified."""
+        if self.etag and not self.etag.startswith("W/"):
+            return self.etag
+        return self.last_modified
+
+    def request_headers(self) -> dict[str, str]:
+        """Range/If-Range headers that continue the .part file, or {} to start over."""
+        offset = self.offset
+        if not offset or (self.length is not None and offset >= self.length):
+            return {}
+        if self.validator is None and self.length is None:
+            return {}  # nothing to tell whether the server's copy changed
+        return self.range_headers(offset)
+
+    def range_headers(self, first: int, last: int | None = None) -> dict[str, str]:
+        headers = {"Range": f"bytes={first}-{'' if last is None else last}"}
+        if self.validator is not None:
+            headers["If-Range"] = self.validator
+        return headers
+
+    def accept(self, status: int, headers) -> int:
+        """Offset at which the response body continues the file; 0 means the
+        .part file is rewritten. Raises PartialMismatch for a 206 that does
+        not line up with the bytes on disk."""
+        if status != 206:
+            self.written = None
+            if is_encoded(headers):
+                # Lengths and offsets of the encoded body say nothing about the file
+                self.etag = self.last_modified = self.length = None
+            else:
+                self.etag = headers.get("etag")
+                self.last_modified = headers.get("last-modified")
+                self.length = _int_or_none(headers.get("content-length"))
+            self.save()
+            return 0
+        offset = self.offset
+        total = self.check_range(status, headers, offset)
+        if self.length is None:
+            self.length = total
+            self.save()
+        return offset
+
+    def check_range(self, status: int, headers, first: int) -> int | None:
+        """Check that a response carries the bytes from first onwards of the same
+        copy of the file. Return its full length; raise PartialMismatch if not."""
+        content_range = parse_content_range(headers.get("content-range"))
+        etag = headers.get("etag")
+        if (
+            status != 206
+            or is_encoded(headers)
+            or content_range is None
+            or content_range[0] != first
+            or (self.length is not None and content_range[1] not in (None, self.length))
+            or (etag and self.etag and etag != self.etag)
+        ):
+            raise PartialMismatch(f"Range response does not continue {self.part_path}")
+        return content_range[1]
+
+    def save(self) -> None:
+        meta = {
+            "url": self.url,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "length": self.length,
+            "segments": self.segments,
+            "written": self.written,
+        }
+        with open(self.meta_path, "w", encoding="utf-8") as file_obj:
+            json.dump(meta, file_obj)
+
+    def complete(self) -> bool:
+        """Move the .part file to its final name if it has the full length."""
+        if self.segments or (self.length is not None and self.offset != self.length):
+            return False
+        os.replace(self.part_path, self.file_path)
+        cleanup_partial_file(self.meta_path)
+        return True
+
+    def discard(self) -> None:
+        cleanup_partial_file(self.part_path)
+        cleanup_partial_file(self.meta_path)
+        self.etag = self.last_modified = self.length = self.segments = self.written = None
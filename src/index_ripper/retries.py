@@ -0,0 +1,114 @@
+"""Deferred retries for directory listings that failed with a transient error.
+
+A listing that times out, resets the connection or answers 429/5xx goes back
+into the crawl frontier after an exponential backoff instead of taking its
+whole subtree out of the results. Each directory gets ``RetryPolicy.attempts``
+retries, and a scan gets ``RetryPolicy.budget`` retries in total, so a host
+that is down does not keep a scan alive forever. Listings that still fail,
+or fail with a permanent error (403, 404, ...), are reported at the end of
+the scan, and ``Backend.scan_website(url, retry_failed=True)`` crawls only
+those directories again.
+"""
+from __future__ import annotations
+
+import random
+import threading
+from dataclasses import dataclass
+
+TRANSIENT_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether a failed listing request is worth retrying.
+
+    HTTP errors (requests' HTTPError, aiohttp's ClientResponseError) are
+    retried only for TRANSIENT_STATUSES. Connection errors and timeouts are
+    always retried.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status", None)
+    if isinstance(status, int):
+        return status in TRANSIENT_STATUSES
+    return True
+
+
+def error_reason(error: BaseException) -> str:
+    """Short reason for a failed request, for status lines: "HTTP 503",
+    "ReadTimeout", "ChunkedEncodingError", ..."""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status", None)
+    if isinstance(status, int):
+        return f"HTTP {status}"
+    return type(error).__name__
+
+
+@dataclass
+class RetryPolicy:
+    attempts: int = 3        # retries per directory; 0 disables retrying
+    base_delay: float = 2.0  # seconds before the first retry, doubled for each further one
+    max_delay: float = 60.0
+    budget: int = 500        # retries per scan, across all directories (listings only)
+
+    def delay(self, attempt: int) -> float:
+        """Backoff before retry number ``attempt`` (1-based), with jitter."""
+        backoff = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return backoff * random.uniform(0.5, 1.0)
+
+
+class ListingRetries:
+    """Per-scan record of failed listings and the retries scheduled for them."""
+
+    def __init__(self, policy: RetryPolicy | None = None):
+        self.policy = policy or RetryPolicy()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._attempts: dict[str, int] = {}
+            self._errors: dict[str, str] = {}  # url -> last error, until it is listed
+            # Outcome of the fetch in progress: retry delay, or None when given up
+            self._outcome: dict[str, float | None] = {}
+            self.retries_used = 0
+            self.recovered = 0
+
+    def failed(self, url: str, error: BaseException, retry: bool = True) -> float | None:
+        """Record a failed listing. Return the delay before retrying it, or None
+        if it is given up on (permanent error, attempts or budget used up)."""
+        with self._lock:
+            self._errors[url] = str(error) or type(error).__name__
+            attempt = self._attempts.get(url, 0) + 1
+            delay = None
+            if (
+                retry
+                and is_transient(error)
+                and attempt <= self.policy.attempts
+                and self.retries_used < self.policy.budget
+            ):
+                self._attempts[url] = attempt
+                self.retries_used += 1
+                delay = self.policy.delay(attempt)
+            self._outcome[url] = delay
+            return delay
+
+    def take_retry(self, url: str) -> float | None:
+        """Call after each fetch of url: the retry delay scheduled during the
+        fetch, or None. A fetch that did not fail clears url's record."""
+        with self._lock:
+            if url in self._outcome:
+                return self._outcome.pop(url)
+            if self._errors.pop(url, None) is not None:
+                self._attempts.pop(url, None)
+                self.recovered += 1
+            return None
+
+    def gave_up(self, url: str) -> bool:
+        """Whether url failed for good; ask after take_retry(url) returned None."""
+        with self._lock:
+            return url in self._errors
+
+    @property
+    def failures(self) -> dict[str, str]:
+        """Listings that could not be read, with their last error."""
+        with self._lock:
+            return dict(self._errors)
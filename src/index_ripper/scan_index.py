@@ -0,0 +1,234 @@
+"""SQLite checkpoint of scans: discovered items, their results and the frontier.
+
+Rows are keyed by the scan's root URL, so one database holds many sites.
+
+* ``listings``: every directory URL queued for fetching, with its depth and
+  whether its listing has been read completely (1) or failed for good (-1).
+* ``items``: every entry found in a listing (its url_info), plus the
+  ``on_scan_item`` payload once the item was processed.
+* ``pages``: the validators and parsed entries of listing pages, shared by
+  all roots, for conditional re-scans (see listing_cache).
+
+A scan that crashed or was stopped resumes from this state. Finished items
+are replayed to the UI, unfinished ones are processed again, and only the
+listings that were never completed, or failed, are fetched. The tree of a finished scan
+can be reloaded without any network access. Writes are buffered and
+committed in batches; a crash loses at most the last batch, whose work is
+simply redone on resume.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    root TEXT PRIMARY KEY,
+    started REAL NOT NULL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS listings (
+    root TEXT NOT NULL,
+    url TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,  -- 1 read, -1 failed
+    PRIMARY KEY (root, url)
+);
+CREATE TABLE IF NOT EXISTS items (
+    root TEXT NOT NULL,
+    url TEXT NOT NULL,
+    info TEXT NOT NULL,
+    result TEXT,
+    PRIMARY KEY (root, url)
+);
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    etag TEXT NOT NULL,
+    last_modified TEXT NOT NULL,
+    entries TEXT NOT NULL
+);
+"""
+
+
+@dataclass
+class ResumeState:
+    """What a resumed scan starts from."""
+
+    results: list[dict] = field(default_factory=list)     # on_scan_item payloads
+    unprocessed: list[dict] = field(default_factory=list)  # url_infos still to process
+    pending_listings: list[tuple[str, int]] = field(default_factory=list)  # failed ones included
+    failed_listings: list[str] = field(default_factory=list)
+    done_listings: list[str] = field(default_factory=list)
+
+
+class ScanIndex:
+    def __init__(self, path: str, flush_every: int = 500):
+        self.path = path
+        self.flush_every = max(1, int(flush_every))
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._pending: list[tuple[str, tuple]] = []
+        self._pages_pending = False  # a buffered write touches the pages table
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    # --- scan lifecycle ---
+
+    def status(self, root: str) -> str | None:
+        """None if root was never scanned, else "finished" or "interrupted"."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT finished FROM scans WHERE root = ?", (root,)
+            ).fetchone()
+        if row is None:
+            return None
+        return "finished" if row[0] is not None else "interrupted"
+
+    def start(self, root: str) -> None:
+        """Forget any earlier scan of root and begin a fresh one."""
+        self.flush()
+        with self._lock, self._conn:
+            for table in ("listings", "items"):
+                self._conn.execute(f"DELETE FROM {table} WHERE root = ?", (root,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scans (root, started, finished) VALUES (?, ?, NULL)",
+                (root, time.time()),
+            )
+
+    def reopen(self, root: str) -> None:
+        """Mark root's scan as running again (for resume)."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE scans SET finished = NULL WHERE root = ?", (root,))
+
+    def finish(self, root: str) -> None:
+        self.flush()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE scans SET finished = ? WHERE root = ?", (time.time(), root)
+            )
+
+    # --- checkpoints (buffered) ---
+
+    def listing_queued(self, root: str, url: str, depth: int) -> None:
+        self._write(
+            "INSERT OR IGNORE INTO listings (root, url, depth) VALUES (?, ?, ?)",
+            (root, url, depth),
+        )
+
+    def listing_done(self, root: str, url: str) -> None:
+        self._write("UPDATE listings SET done = 1 WHERE root = ? AND url = ?", (root, url))
+
+    def listing_failed(self, root: str, url: str) -> None:
+        self._write("UPDATE listings SET done = -1 WHERE root = ? AND url = ?", (root, url))
+
+    def item_found(self, root: str, url_info: dict) -> None:
+        self._write(
+            "INSERT OR IGNORE INTO items (root, url, info) VALUES (?, ?, ?)",
+            (root, url_info["url"], json.dumps(url_info)),
+        )
+
+    def item_done(self, root: str, url: str, result: dict) -> None:
+        self._write(
+            "UPDATE items SET result = ? WHERE root = ? AND url = ?",
+            (json.dumps(result), root, url),
+        )
+
+    def _write(self, sql: str, params: tuple) -> None:
+        with self._lock:
+            self._pending.append((sql, params))
+            if len(self._pending) < self.flush_every:
+                return
+        self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._pages_pending = False
+            if not pending:
+                return
+            with self._conn:
+                for sql, params in pending:
+                    self._conn.execute(sql, params)
+
+    # --- listing pages (see listing_cache) ---
+
+    def store_page(self, url: str, etag: str, last_modified: str, entries: list) -> None:
+        self._write(
+            "INSERT OR REPLACE INTO pages (url, etag, last_modified, entries) VALUES (?, ?, ?, ?)",
+            (url, etag, last_modified, json.dumps(entries)),
+        )
+        self._pages_pending = True
+
+    def forget_page(self, url: str) -> None:
+        self._write("DELETE FROM pages WHERE url = ?", (url,))
+        self._pages_pending = True
+
+    def page(self, url: str) -> tuple[str, str, list] | None:
+        """(etag, last_modified, entries) stored for url, or None."""
+        if self._pages_pending:
+            self.flush()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, entries FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def validators(self, url: str) -> tuple[str, str] | None:
+        """(etag, last_modified) stored for url, or None. Reads committed pages
+        only, without flushing: it is asked before every listing request."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, last_modified FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+
+    def page_count(self) -> int:
+        self.flush()
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def clear_pages(self) -> None:
+        self.flush()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages")
+
+    # --- reading back ---
+
+    def resume_state(self, root: str) -> ResumeState:
+        self.flush()
+        state = ResumeState()
+        with self._lock:
+            for info, result in self._conn.execute(
+                "SELECT info, result FROM items WHERE root = ? ORDER BY rowid", (root,)
+            ):
+                if result is None:
+                    state.unprocessed.append(json.loads(info))
+                else:
+                    state.results.append(json.loads(result))
+            for url, depth, done in self._conn.execute(
+                "SELECT url, depth, done FROM listings WHERE root = ? ORDER BY rowid", (root,)
+            ):
+                if done > 0:
+                    state.done_listings.append(url)
+                    continue
+                state.pending_listings.append((url, depth))
+                if done < 0:
+                    state.failed_listings.append(url)
+        return state
+
+    def results(self, root: str) -> list[dict]:
+        """The on_scan_item payloads recorded for root, in discovery order."""
+        return self.resume_state(root).results
@@ -0,0 +1,169 @@
+"""Scan-time pruning rules: include/exclude globs, max depth, extension lists.
+
+Rules are checked for every listing entry before it is queued or probed, so
+an excluded directory is never fetched and an excluded file never gets a
+HEAD request. Paths are relative to the scan's start URL, unquoted, with a
+trailing "/" on directories (``releases/v1/``, ``releases/v1/disk.iso``).
+
+Glob syntax, per path segment:
+
+* ``*``, ``?`` and ``[...]`` match within one segment; ``**`` matches any
+  number of segments.
+* A pattern without "/" matches the entry's name at any depth
+  (``*.log``, ``thumbs``).
+* A leading "/" is ignored (patterns are always anchored at the start URL).
+  A trailing "/" makes a pattern match directories only. For includes, it
+  also takes in everything below the directory (``releases/*/``).
+
+A file is kept when it matches an include pattern (or there are none),
+matches no exclude pattern, and passes the extension allow/deny lists. A
+directory is descended into unless it is excluded, deeper than
+``max_depth`` (0 = start page only), or no include pattern could match
+anything below it.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+
+
+def _split_list(value: str | None) -> tuple[str, ...]:
+    if not value:
+        return ()
+    return tuple(part.strip() for part in value.split(",") if part.strip())
+
+
+def _normalize_ext(ext: str) -> str:
+    return ext.strip().lower().lstrip(".")
+
+
+@dataclass(frozen=True)
+class _Pattern:
+    segments: tuple[str, ...]
+    anchored: bool   # contains "/": matched against the whole relative path
+    dir_only: bool   # trailing "/"
+
+    @classmethod
+    def parse(cls, text: str) -> "_Pattern":
+        body = text.strip("/")
+        anchored = "/" in body or text.startswith("/")
+        return cls(tuple(body.split("/")) if body else ("**",), anchored, text.endswith("/"))
+
+    def matches(self, segments: list[str], is_directory: bool) -> bool:
+        if self.dir_only and not is_directory:
+            return False
+        if not self.anchored:
+            return bool(segments) and fnmatchcase(segments[-1], self.segments[0])
+        return _match(self.segments, segments)
+
+    def could_match_below(self, dir_segments: list[str]) -> bool:
+        """Whether some path under this directory can match the pattern."""
+        if not self.anchored:
+            return True
+        return _prefix_match(self.segments, dir_segments)
+
+
+def _match(pattern: tuple[str, ...], path: list[str]) -> bool:
+    if not pattern:
+        return not path
+    if pattern[0] == "**":
+        return any(_match(pattern[1:], path[i:]) for i in range(len(path) + 1))
+    return bool(path) and fnmatchcase(path[0], pattern[0]) and _match(pattern[1:], path[1:])
+
+
+def _prefix_match(pattern: tuple[str, ...], path: list[str]) -> bool:
+    if not path:
+        return True
+    if not pattern:
+        return False
+    if pattern[0] == "**":
+        return True
+    return fnmatchcase(path[0], pattern[0]) and _prefix_match(pattern[1:], path[1:])
+
+
+@dataclass(frozen=True)
+class ScanRules:
+    include: tuple[str, ...] = ()
+    exclude: tuple[str, ...] = ()
+    max_depth: int | None = None
+    allow_extensions: frozenset[str] = field(default_factory=frozenset)
+    deny_extensions: frozenset[str] = field(default_factory=frozenset)
+
+    def __post_init__(self):
+        object.__setattr__(self, "_include", tuple(_Pattern.parse(p) for p in self.include))
+        object.__setattr__(self, "_exclude", tuple(_Pattern.parse(p) for p in self.exclude))
+        object.__setattr__(
+            self, "allow_extensions", frozenset(map(_normalize_ext, self.allow_extensions))
+        )
+        object.__setattr__(
+            self, "deny_extensions", frozenset(map(_normalize_ext, self.deny_extensions))
+        )
+
+    @classmethod
+    def from_strings(
+        cls,
+        include: str | None = None,
+        exclude: str | None = None,
+        max_depth: str | int | None = None,
+        allow_extensions: str | None = None,
+        deny_extensions: str | None = None,
+    ) -> "ScanRules":
+        """Build rules from comma-separated lists (as typed in settings or env vars)."""
+        depth = None
+        if max_depth not in (None, ""):
+            depth = max(0, int(max_depth))
+        return cls(
+            include=_split_list(include),
+            exclude=_split_list(exclude),
+            max_depth=depth,
+            allow_extensions=frozenset(_split_list(allow_extensions)),
+            deny_extensions=frozenset(_split_list(deny_extensions)),
+        )
+
+    @property
+    def active(self) -> bool:
+        return bool(
+            self.include
+            or self.exclude
+            or self.max_depth is not None
+            or self.allow_extensions
+            or self.deny_extensions
+        )
+
+    def allows(self, relative_path: str, is_directory: bool) -> bool:
+        segments = [seg for seg in relative_path.split("/") if seg]
+        if not segments:
+            return True
+        if any(p.matches(segments, is_directory) for p in self._exclude):
+            return False
+        if is_directory:
+            if self.max_depth is not None and len(segments) > self.max_depth:
+                return False
+            return not self._include or any(
+                self._include_reaches_directory(p, segments) for p in self._include
+            )
+        ext = _normalize_ext(os.path.splitext(segments[-1])[1])
+        if self.allow_extensions and ext not in self.allow_extensions:
+            return False
+        if ext in self.deny_extensions:
+            return False
+        if not self._include:
+            return True
+        return any(self._include_matches_file(p, segments) for p in self._include)
+
+    @staticmethod
+    def _include_reaches_directory(pattern: _Pattern, segments: list[str]) -> bool:
+        if pattern.could_match_below(segments):
+            return True
+        # Below a directory that a "dir/" include takes in whole
+        return pattern.dir_only and any(
+            pattern.matches(segments[:i], True) for i in range(1, len(segments))
+        )
+
+    @staticmethod
+    def _include_matches_file(pattern: _Pattern, segments: list[str]) -> bool:
+        if pattern.dir_only:
+            # "releases/*/" takes in every file below a matching directory
+            return any(pattern.matches(segments[:i], True) for i in range(1, len(segments)))
+        return pattern.matches(segments, False)
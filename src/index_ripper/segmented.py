@@ -0,0 +1,328 @@
+"""Segmented downloads: one large file fetched over several Range connections.
+
+Used for files of at least ``Backend.segment_threshold`` bytes whose server
+supports byte ranges and sends a validator. The .part file is preallocated
+to the full length, and each connection writes its range in place, so no
+stitching is needed afterwards. The download starts with INITIAL_SEGMENTS
+connections. Once per second a SegmentTuner compares the throughput with the
+previous second and adds a connection while each new one still raised it by
+at least ``gain``. A new connection takes an untouched range or splits the
+largest range still in progress, so connections that finish early keep
+working until the end. Every connection after the first needs a free slot
+in the host's download limits.
+
+A range that fails mid-stream is requested again from its first missing
+byte, with the If-Range check of ``resumable`` and the backoff of
+``retries.RetryPolicy``. The missing ranges are saved in the .part sidecar,
+so a failed, stopped or restarted download continues segmented.
+
+Each connection writes through a ``disk_writer.DiskWriter`` of its own. The
+ranges saved as missing include bytes received but not yet written.
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+import requests
+
+from index_ripper.concurrency import Slot
+from index_ripper.disk_writer import DiskWriter, preallocate
+from index_ripper.retries import RetryPolicy, is_transient
+
+DEFAULT_SEGMENT_THRESHOLD = 64 * 1024 * 1024
+DEFAULT_MAX_SEGMENTS = 8
+INITIAL_SEGMENTS = 2
+MIN_SEGMENT_SIZE = 1024 * 1024  # never split a range into pieces smaller than this
+TUNE_INTERVAL = 1.0
+
+
+def merge_ranges(ranges) -> list[list[int]]:
+    """Sorted [first, last] ranges with overlapping and adjacent ones joined."""
+    merged: list[list[int]] = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return merged
+
+
+class Segment:
+    """Byte range [first, last] still to fetch; ``first`` advances as bytes arrive."""
+
+    __slots__ = ("first", "last", "active")
+
+    def __init__(self, first: int, last: int):
+        self.first = first
+        self.last = last
+        self.active = False
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.last - self.first + 1)
+
+
+class SegmentPlan:
+    """The missing ranges of a file, handed out to connections."""
+
+    def __init__(self, ranges, min_size: int = MIN_SEGMENT_SIZE):
+        self.min_size = min_size
+        self._segments = [Segment(first, last) for first, last in ranges if last >= first]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def split(cls, length: int, count: int, min_size: int = MIN_SEGMENT_SIZE) -> SegmentPlan:
+        count = max(1, min(count, length // max(1, min_size)))
+        bounds = [length * i // count for i in range(count + 1)]
+        return cls([(bounds[i], bounds[i + 1] - 1) for i in range(count)], min_size)
+
+    def take(self) -> Segment | None:
+        """An untouched range, or the upper half of the largest range in progress."""
+        with self._lock:
+            for segment in self._segments:
+                if not segment.active and segment.remaining:
+                    segment.active = True
+                    return segment
+            largest = max(self._segments, key=lambda s: s.remaining, default=None)
+            if largest is None or largest.remaining < 2 * self.min_size:
+                return None
+            middle = largest.first + largest.remaining // 2
+            segment = Segment(middle, largest.last)
+            segment.active = True
+            largest.last = middle - 1
+            self._segments.append(segment)
+            return segment
+
+    def advance(self, segment: Segment, nbytes: int) -> int:
+        """Record nbytes written at segment.first; return how many of them
+        belong to the segment (it may have been split meanwhile)."""
+        with self._lock:
+            nbytes = min(nbytes, segment.remaining)
+            segment.first += nbytes
+            return nbytes
+
+    def release(self, segment: Segment) -> None:
+        with self._lock:
+            segment.active = False
+
+    def missing(self) -> list[list[int]]:
+        with self._lock:
+            return [[s.first, s.last] for s in self._segments if s.remaining]
+
+    @property
+    def remaining(self) -> int:
+        with self._lock:
+            return sum(s.remaining for s in self._segments)
+
+
+class SegmentTuner:
+    """Add connections while each one raises throughput by at least ``gain``."""
+
+    def __init__(self, maximum: int, gain: float = 0.1):
+        self.maximum = maximum
+        self.gain = gain
+        self.settled = False
+        self._best: float | None = None
+
+    def should_grow(self, rate: float, connections: int) -> bool:
+        if self.settled or connections >= self.maximum:
+            return False
+        if self._best is not None and rate < self._best * (1 + self.gain):
+            self.settled = True
+            return False
+        self._best = rate
+        return True
+
+
+class SegmentedDownload:
+    """Download partial.url into its preallocated .part file over several connections.
+
+    ``run()`` returns True once every byte is written, False when aborted. It
+    raises PartialMismatch if the file changed on the server, or the error of
+    a range that ran out of retries.
+    """
+
+    def __init__(self, backend, partial, file_name, aborted, slot):
+        self.backend = backend
+        self.partial = partial
+        self.url = partial.url
+        self.file_name = file_name
+        self.aborted = aborted
+        self.retry_policy = RetryPolicy(attempts=3, base_delay=1.0, max_delay=15.0)
+        self.tuner = SegmentTuner(max(1, backend.max_segments))
+        self.min_segment_size = MIN_SEGMENT_SIZE
+        self._first_slot = slot
+        self._threads: list[threading.Thread] = []
+        self._writers: list[DiskWriter] = []
+        self._error: BaseException | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._exited = threading.Event()  # set whenever a connection ends
+
+    def run(self) -> bool:
+        partial = self.partial
+        if partial.segments is None:
+            with open(partial.part_path, "wb") as file_handle:
+                preallocate(file_handle, partial.length)
+            self.plan = SegmentPlan.split(partial.length, INITIAL_SEGMENTS, self.min_segment_size)
+        else:
+            self.plan = SegmentPlan(partial.segments, self.min_segment_size)
+        self._save()
+        self.backend.download_progress.begin(
+            partial.file_path, self.file_name, partial.received, partial.length
+        )
+        self._start_connection(self._first_slot)
+        for _ in range(INITIAL_SEGMENTS - 1):
+            self._add_connection()
+        self._supervise()
+        for thread in self._threads:
+            thread.join()
+        self._save()
+        if self._error is not None:
+            raise self._error
+        return self.plan.remaining == 0
+
+    def _supervise(self) -> None:
+        """Save progress and tune the connection count until every connection is done."""
+        last_remaining, last_time = self.plan.remaining, time.monotonic()
+        while any(thread.is_alive() for thread in self._threads):
+            self._exited.wait(0.2)
+            self._exited.clear()
+            if self.aborted() or self._error is not None:
+                self._stop.set()
+            remaining = self.plan.remaining
+            self._report_progress(remaining)
+            now = time.monotonic()
+            if now - last_time < TUNE_INTERVAL:
+                continue
+            rate = (last_remaining - remaining) / (now - last_time)
+            last_remaining, last_time = remaining, now
+            self._save()
+            alive = sum(thread.is_alive() for thread in self._threads)
+            if not self._stop.is_set() and self.tuner.should_grow(rate, alive):
+                self._add_connection()
+
+    def _add_connection(self) -> None:
+        limits = self.backend.download_limits
+        limiter = limits.limiter(self.url)
+        if limits.try_acquire(limiter):
+            self._start_connection(Slot(), limiter)
+
+    def _start_connection(self, slot, limiter=None) -> None:
+        thread = threading.Thread(
+            target=self._connection, args=(slot, limiter), name="download-segment", daemon=True
+        )
+        self._threads.append(thread)
+        thread.start()
+
+    def _connection(self, slot, limiter) -> None:
+        """One connection: fetch ranges from the plan until none is left."""
+        error = None
+        backend = self.backend
+        try:
+            with open(self.partial.part_path, "r+b") as file_handle:
+                writer = DiskWriter(file_handle, backend.write_block_size, backend.write_queue_blocks)
+                with self._lock:
+                    self._writers.append(writer)
+                try:
+                    with writer:
+                        self._fetch_ranges(writer, slot)
+                finally:
+                    backend.add_write_stats(writer.stats)
+        except BaseException as ex:
+            error = ex
+            with self._lock:
+                if self._error is None:
+                    self._error = ex
+            self._stop.set()
+        finally:
+            if limiter is not None:
+                self.backend.download_limits.finish(limiter, slot, error)
+            self._exited.set()
+
+    def _fetch_ranges(self, writer, slot) -> None:
+        while not self._stop.is_set():
+            segment = self.plan.take()
+            if segment is None:
+                return
+            try:
+                self._fetch_with_retries(segment, writer, slot)
+            finally:
+                self.plan.release(segment)
+
+    def _fetch_with_retries(self, segment, writer, slot) -> None:
+        attempt = 0
+        while segment.remaining and not self._stop.is_set():
+            first = segment.first
+            try:
+                self._fetch(segment, writer, slot)
+                if self._stopped() or not segment.remaining:
+                    return
+                # The response ended before the range did
+                error = requests.exceptions.ChunkedEncodingError(
+                    f"response ended {segment.remaining} bytes short"
+                )
+            except requests.exceptions.RequestException as ex:
+                error = ex
+            # A response that moved the segment on earns a fresh set of attempts
+            attempt = 1 if segment.first > first else attempt + 1
+            if not is_transient(error) or attempt > self.retry_policy.attempts:
+                raise error
+            delay = self.retry_policy.delay(attempt)
+            self.backend._log(
+                f"[Download] {self.file_name}: range at byte {segment.first} failed "
+                f"({error}); retrying in {delay:.1f}s"
+            )
+            if self._stop.wait(delay):
+                return
+
+    def _fetch(self, segment, writer, slot) -> None:
+        backend = self.backend
+        if not backend.rate_limits.wait_request(self.url, self._stopped):
+            return
+        response = backend._download_session().get(
+            self.url,
+            stream=True,
+            timeout=backend.ui_manager.timeout,
+            headers={
+                "User-Agent": backend.ui_manager.USER_AGENT,
+                "Accept-Encoding": "identity",
+                **self.partial.range_headers(segment.first, segment.last),
+            },
+        )
+        with response:
+            slot.record_status(response.status_code)
+            response.raise_for_status()
+            self.partial.check_range(response.status_code, response.headers, segment.first)
+            writer.seek(segment.first)
+            for data in response.iter_content(backend.download_block_size):
+                backend.ui_manager.pause_event.wait()
+                if self._stopped() or not data:
+                    return
+                if not backend.rate_limits.wait_bytes(self.url, len(data), self._stopped):
+                    return
+                # Checking before writing: a split may have moved segment.last
+                written = self.plan.advance(segment, len(data))
+                writer.write(data[:written])
+                if not segment.remaining:
+                    return
+
+    def _stopped(self) -> bool:
+        return self._stop.is_set() or self.aborted()
+
+    def _save(self) -> None:
+        missing = self.plan.missing()
+        with self._lock:
+            writers = list(self._writers)
+        for writer in writers:
+            missing.extend(writer.unwritten())
+        self.partial.segments = merge_ranges(missing)
+        self.partial.save()
+
+    def _report_progress(self, remaining: int) -> None:
+        length = self.partial.length
+        self.backend._report_download_progress(
+            self.partial.file_path, self.file_name, length - remaining, length
+        )
+
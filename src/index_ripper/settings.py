@@ -1,7 +1,21 @@
 from __future__ import annotations
 
 import json
-from typing import Any
+import math
+import os
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Any, Mapping
+
+from index_ripper.connections import DEFAULT_DNS_TTL
+from index_ripper.crawler import CrawlPriority
+from index_ripper.listing_cache import ListingCache
+from index_ripper.scan_index import ScanIndex
+from index_ripper.scan_rules import ScanRules
+from index_ripper.utils import app_data_dir
+
+# INDEX_RIPPER_CRAWL_ORDER -> CrawlPriority.depth_weight
+CRAWL_ORDERS = {"shallow": 1.0, "fifo": 0.0, "deep": -1.0}
 
 
 def load_settings(path: str) -> dict[str, Any]:
@@ -19,3 +33,136 @@ def save_settings(path: str, data: dict[str, Any]) -> None:
             json.dump(data, file_obj, ensure_ascii=False, indent=2)
     except OSError:
         pass
+
+
+@dataclass
+class EnvSettings:
+    """App-level INDEX_RIPPER_* values, and the problems found while reading them."""
+
+    debug: bool = False
+    modal_dialogs: bool = False
+    dns_ttl: float = DEFAULT_DNS_TTL  # 0 disables the DNS cache
+    messages: list[str] = field(default_factory=list)  # for the log
+
+
+class _Environment:
+    def __init__(self, environ: Mapping[str, str], messages: list[str]):
+        self._environ = environ
+        self._messages = messages
+
+    def get(self, name: str, default: str | None = None) -> str | None:
+        return self._environ.get(name, default)
+
+    def flag(self, name: str, default: bool) -> bool:
+        """An on-by-default flag is off only for "0"; an off-by-default one is on only for "1"."""
+        value = self._environ.get(name)
+        if value is None:
+            return default
+        return value != "0" if default else value == "1"
+
+    def number(self, name: str) -> float | None:
+        value = self._environ.get(name)
+        if value is None:
+            return None
+        try:
+            number = float(value)
+        except ValueError:
+            self.ignore(name, value, "not a number")
+            return None
+        if not math.isfinite(number):
+            self.ignore(name, value, "not a finite number")
+            return None
+        return number
+
+    def ignore(self, name: str, value: str, reason: str) -> None:
+        self._messages.append(f"[Settings] Ignoring {name}={value!r}: {reason}")
+
+
+def apply_env_settings(backend, environ: Mapping[str, str] | None = None) -> EnvSettings:
+    """Configure backend from INDEX_RIPPER_* environment variables (see the
+    README). Invalid values are skipped and described in ``messages``."""
+    settings = EnvSettings()
+    env = _Environment(os.environ if environ is None else environ, settings.messages)
+    settings.debug = env.get("INDEX_RIPPER_DEBUG", "0") != "0"
+    settings.modal_dialogs = env.flag("INDEX_RIPPER_MODAL_DIALOGS", False)
+
+    backend.scan_engine = env.get("INDEX_RIPPER_SCAN_ENGINE", "threads")
+    if env.flag("INDEX_RIPPER_SCAN_INDEX", True):
+        try:
+            backend.scan_index = ScanIndex(
+                os.path.join(app_data_dir(env.get("INDEX_RIPPER_DATA_DIR")), "scan_index.sqlite3")
+            )
+        except (OSError, sqlite3.Error) as ex:
+            settings.messages.append(f"[Scan] Scan index unavailable: {ex}")
+    backend.rate_limits.configure(
+        env.number("INDEX_RIPPER_MAX_RPS"), env.number("INDEX_RIPPER_MAX_BPS")
+    )
+    # Listing validators live in the scan index database, so they need it
+    if backend.scan_index is not None and env.flag("INDEX_RIPPER_LISTING_CACHE", True):
+        backend.listing_cache = ListingCache(backend.scan_index)
+    backend.trust_unchanged_subtrees = env.flag("INDEX_RIPPER_TRUST_304_SUBTREES", False)
+
+    crawl_order = env.get("INDEX_RIPPER_CRAWL_ORDER", "shallow")
+    if crawl_order not in CRAWL_ORDERS:
+        env.ignore("INDEX_RIPPER_CRAWL_ORDER", crawl_order, f"use one of {', '.join(CRAWL_ORDERS)}")
+    backend.crawl_priority = CrawlPriority(
+        depth_weight=CRAWL_ORDERS.get(crawl_order, 1.0),
+        hot_patterns=tuple(
+            pattern.strip()
+            for pattern in env.get("INDEX_RIPPER_HOT_DIRS", "").split(",")
+            if pattern.strip()
+        ),
+    )
+
+    if not env.flag("INDEX_RIPPER_DETECT_ALIASES", True):
+        backend.alias_detector = None
+    elif env.flag("INDEX_RIPPER_DEDUPE_LISTINGS", False):
+        backend.alias_detector.match_fingerprints = True
+    backend.structured_listings = env.flag("INDEX_RIPPER_STRUCTURED_LISTINGS", True)
+    backend.listing_flavors = env.flag("INDEX_RIPPER_LISTING_FLAVORS", True)
+    backend.lazy_scan = env.flag("INDEX_RIPPER_LAZY_SCAN", False)
+    lazy_prefetch = env.number("INDEX_RIPPER_LAZY_PREFETCH")
+    if lazy_prefetch is not None:
+        backend.lazy_prefetch = int(lazy_prefetch)
+    listing_retries = env.number("INDEX_RIPPER_LISTING_RETRIES")
+    if listing_retries is not None:
+        backend.listing_retries.policy.attempts = max(0, int(listing_retries))
+    try:
+        backend.scan_rules = ScanRules.from_strings(
+            include=env.get("INDEX_RIPPER_SCAN_INCLUDE"),
+            exclude=env.get("INDEX_RIPPER_SCAN_EXCLUDE"),
+            max_depth=env.get("INDEX_RIPPER_SCAN_MAX_DEPTH"),
+            allow_extensions=env.get("INDEX_RIPPER_SCAN_EXTENSIONS"),
+            deny_extensions=env.get("INDEX_RIPPER_SCAN_SKIP_EXTENSIONS"),
+        )
+    except ValueError as ex:
+        settings.messages.append(f"[Scan] Ignoring invalid scan rules: {ex}")
+
+    backend.resume_downloads = env.flag("INDEX_RIPPER_RESUME_DOWNLOADS", True)
+    segment_threshold_mb = env.number("INDEX_RIPPER_SEGMENT_THRESHOLD_MB")
+    if segment_threshold_mb is not None:
+        backend.segment_threshold = int(segment_threshold_mb * 1024 * 1024)
+    max_segments = env.number("INDEX_RIPPER_MAX_SEGMENTS")
+    if max_segments is not None:
+        backend.max_segments = max(1, int(max_segments))
+    download_retries = env.number("INDEX_RIPPER_DOWNLOAD_RETRIES")
+    if download_retries is not None:
+        backend.download_retries.attempts = max(0, int(download_retries))
+    read_block_kb = env.number("INDEX_RIPPER_READ_BLOCK_KB")
+    if read_block_kb is not None:
+        backend.download_block_size = max(1, int(read_block_kb * 1024))
+    write_block_kb = env.number("INDEX_RIPPER_WRITE_BLOCK_KB")
+    if write_block_kb is not None:
+        backend.write_block_size = max(1, int(write_block_kb * 1024))
+    write_buffers = env.number("INDEX_RIPPER_WRITE_BUFFERS")
+    if write_buffers is not None:
+        backend.write_queue_blocks = max(1, int(write_buffers))
+    backend.preallocate_downloads = env.flag("INDEX_RIPPER_PREALLOCATE", True)
+    progress_hz = env.number("INDEX_RIPPER_PROGRESS_HZ")
+    if progress_hz is not None:
+        backend.download_progress.rate = progress_hz
+
+    dns_ttl = env.number("INDEX_RIPPER_DNS_CACHE_TTL")
+    if dns_ttl is not None:
+        settings.dns_ttl = max(0.0, dns_ttl)
+    return settings
@@ -3,6 +3,8 @@ import threading
 
 def download_status_state(text: str) -> str:
     lower = (text or "").lower()
+    if lower.startswith("retrying"):
+        return "warning"
     if "fail" in lower:
         return "error"
     if "complete" in lower:
@@ -19,6 +19,9 @@ class TreeNode:
     expanded: bool = False
     hidden: bool = False  # True when filtered out by search
     children: list[str] = field(default_factory=list)  # ordered list of child node_ids
+    url: str = ""         # folder URL, for listing it on expand in lazy scans
+    unlisted: bool = False  # lazy scan: folder not listed yet
+    link: str = ""        # path of the folder this one is an alias of (not crawled)
 
 
 _EMOJI_ICONS = {
@@ -31,6 +34,7 @@ _EMOJI_ICONS = {
     "video":    "🎬",
     "text":     "📝",
     "binary":   "⚙️",
+    "link":     "🔗",
 }
 
 _BG_NORMAL        = "transparent"
@@ -80,7 +84,7 @@ class RowWidget:
         # Name label
         self.name_label = ctk.CTkLabel(
             self.frame,
-            text=node.name,
+            text=f"{node.name}  \u2192 {node.link}" if node.link else node.name,
             anchor="w",
             font=ctk.CTkFont(size=14, weight="bold" if node.kind == "folder" else "normal"),
         )
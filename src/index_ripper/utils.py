@@ -110,6 +110,14 @@ def default_download_folder(url: str, fallback_root: str) -> str:
     return os.path.join(fallback_root, site_name)
 
 
+def app_data_dir(configured: str | None = None) -> str:
+    """Where scan caches live: configured, else $INDEX_RIPPER_DATA_DIR, else
+    ~/.index_ripper."""
+    return configured or os.environ.get("INDEX_RIPPER_DATA_DIR") or os.path.join(
+        os.path.expanduser("~"), ".index_ripper"
+    )
+
+
 def cleanup_partial_file(file_path: str) -> None:
     """Best-effort removal of a partial download file."""
     try:
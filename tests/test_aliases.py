@@ -0,0 +1,93 @@
+"""Tests for listing fingerprints and alias/loop detection."""
+import unittest
+
+from index_ripper.aliases import AliasDetector
+
+
+def _info(url, size=None, modified=""):
+    return {"url": url, "is_directory": url.endswith("/"), "size": size, "modified": modified}
+
+
+def _listing(detector, base, names, size=100):
+    fingerprint = detector.fingerprint(base)
+    passed = [
+        info["url"]
+        for info in (_info(base + name, None if name.endswith("/") else size) for name in names)
+        if fingerprint.add(info)
+    ]
+    held, canonical = detector.finish(fingerprint)
+    return passed, [info["url"] for info in held], canonical
+
+
+class TestAliasDetector(unittest.TestCase):
+    def test_loop_is_linked_to_ancestor(self):
+        detector = AliasDetector()
+        passed, held, canonical = _listing(detector, "http://h/a/", ["x.iso", "loop/"])
+        self.assertEqual((held, canonical), (["http://h/a/loop/"], None))
+        passed, held, canonical = _listing(detector, "http://h/a/loop/", ["x.iso", "loop/"])
+        self.assertEqual(passed, ["http://h/a/loop/x.iso"])  # files still stream out
+        self.assertEqual((held, canonical), ([], "http://h/a/"))
+        self.assertEqual(detector.aliases, {"http://h/a/loop/": "http://h/a/"})
+        self.assertEqual(detector.requests_avoided, 1)
+
+    def test_identical_siblings_are_not_aliases_by_default(self):
+        detector = AliasDetector()
+        names = ["Release", "InRelease", "binary-amd64/", "source/"]
+        _listing(detector, "http://h/dists/main/", names)
+        _passed, held, canonical = _listing(detector, "http://h/dists/contrib/", names)
+        self.assertIsNone(canonical)
+        self.assertEqual(len(held), 2)
+
+    def test_fingerprint_dedupe_is_opt_in_and_strict(self):
+        detector = AliasDetector(match_fingerprints=True)
+        few = ["a.iso", "b.iso", "sub/"]
+        _listing(detector, "http://h/x/", few)
+        self.assertIsNone(_listing(detector, "http://h/y/", few)[2])
+        many = [f"f{i}.bin" for i in range(40)] + ["sub/"]
+        _listing(detector, "http://h/pub/2026.10/", many)
+        _passed, held, canonical = _listing(detector, "http://h/pub/current/", many)
+        self.assertEqual((held, canonical), ([], "http://h/pub/2026.10/"))
+
+    def test_different_sizes_are_not_aliases(self):
+        detector = AliasDetector()
+        _listing(detector, "http://h/a/", ["x.bin", "sub/"], size=1)
+        _passed, held, canonical = _listing(detector, "http://h/b/", ["x.bin", "sub/"], size=2)
+        self.assertIsNone(canonical)
+        self.assertEqual(held, ["http://h/b/sub/"])
+
+    def test_parent_links_are_ignored(self):
+        detector = AliasDetector()
+        fingerprint = detector.fingerprint("http://h/a/loop/")
+        self.assertTrue(fingerprint.add(_info("http://h/a/")))  # parent link passes through
+        self.assertEqual(fingerprint.entries, 0)
+
+    def test_small_listings_without_metadata_are_not_compared(self):
+        detector = AliasDetector()
+        for base in ("http://h/a/", "http://h/b/"):
+            fingerprint = detector.fingerprint(base)
+            fingerprint.add(_info(base + "css/"))
+            fingerprint.add(_info(base + "js/"))
+            _held, canonical = detector.finish(fingerprint)
+            self.assertIsNone(canonical)
+
+    def test_redirects(self):
+        detector = AliasDetector()
+        self.assertIsNone(detector.claim("http://h/pub/2026.10/"))
+        self.assertEqual(
+            detector.redirected("http://h/pub/current/", "http://h/pub/2026.10/"),
+            "http://h/pub/2026.10/",
+        )
+        self.assertIsNone(detector.redirected("http://h/latest/", "http://h/pub/2027.01/"))
+        self.assertEqual(detector.claim("http://h/pub/2027.01/"), "http://h/latest/")
+        self.assertEqual(detector.requests_avoided, 1)
+
+    def test_reset(self):
+        detector = AliasDetector()
+        detector.claim("http://h/")
+        detector.reset()
+        self.assertIsNone(detector.claim("http://h/"))
+        self.assertEqual(detector.aliases, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
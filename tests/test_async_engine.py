@@ -0,0 +1,136 @@
+"""Tests for the asyncio scan engine against a local HTTP server."""
+import http.server
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from index_ripper.async_engine import async_engine_available
+from index_ripper.backend import Backend
+from index_ripper.scan_index import ScanIndex
+from index_ripper.self_test import _LocalHTTPServer
+from tests.test_backend import MockUIManager
+
+
+@unittest.skipUnless(async_engine_available(), "aiohttp not installed")
+class TestAsyncScanEngine(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        root = self._tmp.name
+        os.makedirs(os.path.join(root, "a", "deep"))
+        os.makedirs(os.path.join(root, "b"))
+        for rel, size in (("root.txt", 3), ("a/a1.txt", 10), ("a/deep/d.bin", 2048), ("b/b1.txt", 1)):
+            with open(os.path.join(root, rel), "wb") as file_obj:
+                file_obj.write(b"x" * size)
+        self.ui = MockUIManager()
+        self.backend = Backend(self.ui)
+        self.backend.scan_engine = "asyncio"
+        self.backend.async_concurrency = 8
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_scan_finds_same_tree_as_threaded_engine(self):
+        with _LocalHTTPServer(self._tmp.name) as server:
+            url = f"http://127.0.0.1:{server.port}/"
+            self.backend.scan_website(url)
+            async_files = dict(self.ui.files_dict)
+            async_folders = dict(self.ui.folders)
+
+            threaded_ui = MockUIManager()
+            threaded = Backend(threaded_ui)
+            threaded_ui.session = requests.Session()
+            threaded.scan_website(url)
+
+        self.assertEqual(
+            set(async_files), {"root.txt", "a/a1.txt", "a/deep/d.bin", "b/b1.txt"}
+        )
+        self.assertEqual(async_files, threaded_ui.files_dict)
+        self.assertEqual(async_folders, threaded_ui.folders)
+        self.assertEqual(self.ui.scanned_urls, 7)
+        self.assertEqual(self.ui.progress_events[-1][:2], (7, 7))
+
+    def test_stop_before_start_fetches_nothing(self):
+        self.backend.should_stop = True
+        with _LocalHTTPServer(self._tmp.name) as server:
+            self.backend.scan_website(f"http://127.0.0.1:{server.port}/")
+        self.assertEqual(self.ui.files_dict, {})
+
+    def test_indexed_scan_reloads_after_server_is_gone(self):
+        index_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(index_dir.cleanup)
+        index_path = os.path.join(index_dir.name, "index.sqlite3")
+        self.backend.scan_index = ScanIndex(index_path)
+        with _LocalHTTPServer(self._tmp.name) as server:
+            url = f"http://127.0.0.1:{server.port}/"
+            self.backend.scan_website(url)
+        self.backend.scan_index.close()
+
+        ui = MockUIManager()
+        backend = Backend(ui)
+        backend.scan_engine = "asyncio"
+        backend.scan_index = ScanIndex(index_path)
+        self.addCleanup(backend.scan_index.close)
+        backend.scan_website(url, resume=True)
+        self.assertEqual(
+            set(ui.files_dict), {"root.txt", "a/a1.txt", "a/deep/d.bin", "b/b1.txt"}
+        )
+        self.assertFalse(any("Error" in msg for msg in ui.log_messages))
+
+    def test_json_autoindex(self):
+        def list_directory(handler, path):
+            """Answer like nginx with autoindex_format json."""
+            entries = [
+                {"name": name, "type": "directory" if os.path.isdir(os.path.join(path, name)) else "file",
+                 "mtime": "Fri, 05 Jan 2024 12:31:00 GMT", "size": os.path.getsize(os.path.join(path, name))}
+                for name in sorted(os.listdir(path))
+            ]
+            body = json.dumps(entries).encode()
+            handler.send_response(200)
+            handler.send_header("Content-Type", "application/json")
+            handler.send_header("Content-Length", str(len(body)))
+            handler.end_headers()
+            return io.BytesIO(body)
+
+        with patch.object(http.server.SimpleHTTPRequestHandler, "list_directory", list_directory):
+            with _LocalHTTPServer(self._tmp.name) as server:
+                self.backend.scan_website(f"http://127.0.0.1:{server.port}/")
+        self.assertEqual(
+            set(self.ui.files_dict), {"root.txt", "a/a1.txt", "a/deep/d.bin", "b/b1.txt"}
+        )
+        self.assertTrue(any("JSON listings" in msg for msg in self.ui.log_messages))
+
+    def test_failed_listing_retried(self):
+        original = http.server.SimpleHTTPRequestHandler.list_directory
+        failures = {"/a/": 1}
+
+        def flaky_list_directory(handler, path):
+            if failures.get(handler.path):
+                failures[handler.path] -= 1
+                handler.send_error(503)
+                return None
+            return original(handler, path)
+
+        self.backend.listing_retries.policy.base_delay = 0.01
+        with patch.object(
+            http.server.SimpleHTTPRequestHandler, "list_directory", flaky_list_directory
+        ):
+            with _LocalHTTPServer(self._tmp.name) as server:
+                self.backend.scan_website(f"http://127.0.0.1:{server.port}/")
+        self.assertEqual(
+            set(self.ui.files_dict), {"root.txt", "a/a1.txt", "a/deep/d.bin", "b/b1.txt"}
+        )
+        self.assertEqual(self.backend.listing_retries.recovered, 1)
+
+    def test_missing_aiohttp_falls_back_to_threads(self):
+        with patch("index_ripper.backend.async_engine_available", return_value=False):
+            self.assertFalse(self.backend._use_async_engine())
+        self.assertTrue(any("aiohttp" in msg for msg in self.ui.log_messages))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,10 +2,20 @@
 import os
 import tempfile
 import threading
+import time
 import unittest
 from unittest.mock import MagicMock, patch
 
+import requests
+
 from index_ripper.backend import Backend
+from index_ripper.connections import PoolStats
+from index_ripper.listing import STRUCTURED_ACCEPT
+from index_ripper.listing_cache import ListingCache
+from index_ripper.resumable import PartialDownload
+from index_ripper.retries import RetryPolicy
+from index_ripper.scan_index import ScanIndex
+from index_ripper.scan_rules import ScanRules
 
 
 class MockUIManager:
@@ -27,6 +37,7 @@ class MockUIManager:
         self.pause_event = threading.Event()
         self.pause_event.set()
         self.log_messages = []
+        self.progress_events = []
         self.session = MagicMock()
 
     def log_message(self, message):
@@ -44,9 +55,8 @@ class MockUIManager:
     def on_scan_started(self, url):
         self.is_scanning = True
 
-    def on_scan_progress(self, scanned_urls, total_urls):
-        self.scanned_urls = scanned_urls
-        self.total_urls = total_urls
+    def on_scan_progress(self, scanned_urls, total_urls, estimated=False):
+        self.progress_events.append((scanned_urls, total_urls, estimated))
 
     def on_scan_item(self, **payload):
         is_directory = payload.get("is_directory")
@@ -126,6 +136,646 @@ class TestBackendScan(unittest.TestCase):
         self.assertFalse(result)
 
 
+def _page_response(text, chunk_size=16):
+    """Build a fake streamed response whose body arrives in small chunks."""
+    body = text.encode("utf-8")
+    response = MagicMock()
+    response.encoding = "utf-8"
+    response.iter_content = lambda size: (
+        body[i:i + chunk_size] for i in range(0, len(body), chunk_size)
+    )
+    return response
+
+
+def _listing_response(links):
+    """Build a fake listing page response with one <a> per href."""
+    return _page_response(
+        "<html><body>"
+        + "".join(f'<a href="{href}">{href}</a>' for href in links)
+        + "</body></html>"
+    )
+
+
+class TestBackendGetAllUrls(unittest.TestCase):
+    """Tests for listing discovery via the concurrent crawler."""
+
+    PAGES = {
+        "http://example.com/pub/": ["../", "?C=N;O=D", "a/", "b/", "top.txt"],
+        "http://example.com/pub/a/": ["../", "one.iso", "/pub/b/"],
+        "http://example.com/pub/b/": ["../", "two.iso", "http://other.com/x.iso"],
+    }
+
+    def setUp(self):
+        self.ui = MockUIManager()
+        self.backend = Backend(self.ui)
+
+        def fake_get(url, **kwargs):
+            return _listing_response(self.PAGES.get(url, []))
+
+        self.ui.session.get = MagicMock(side_effect=fake_get)
+
+    def test_collects_files_and_directories_in_scope(self):
+        urls = self.backend._get_all_urls("http://example.com/pub/")
+        found = sorted(info["url"] for info in urls)
+        self.assertEqual(
+            found,
+            [
+                "http://example.com/pub/a/",
+                "http://example.com/pub/a/one.iso",
+                "http://example.com/pub/b/",
+                "http://example.com/pub/b/two.iso",
+                "http://example.com/pub/top.txt",
+            ],
+        )
+
+    def test_each_listing_fetched_once(self):
+        self.backend._get_all_urls("http://example.com/pub/")
+        fetched = [c.args[0] for c in self.ui.session.get.call_args_list]
+        self.assertEqual(sorted(fetched), sorted(self.PAGES))
+
+    def test_honors_should_stop(self):
+        self.backend.should_stop = True
+        self.assertEqual(self.backend._get_all_urls("http://example.com/pub/"), [])
+        self.ui.session.get.assert_not_called()
+
+
+class TestBackendStreamedListing(unittest.TestCase):
+    """Listing pages are streamed and parsed chunk by chunk."""
+
+    def setUp(self):
+        self.ui = MockUIManager()
+        self.backend = Backend(self.ui)
+
+    def test_entries_yielded_before_body_is_read(self):
+        links = "".join(f'<li><a href="f{i}.txt">f{i}</a></li>' for i in range(1000))
+        body = f"<ul>{links}</ul>".encode()
+        consumed = []
+
+        def iter_content(size):
+            for i in range(0, len(body), 256):
+                consumed.append(i)
+                yield body[i:i + 256]
+
+        response = _page_response("")
+        response.iter_content = iter_content
+        self.ui.session.get = MagicMock(return_value=response)
+
+        entries = self.backend._list_directory("http://example.com/", "http://example.com/")
+        first = next(entries)
+        self.assertEqual(first["url"], "http://example.com/f0.txt")
+        self.assertLess(len(consumed), 5)
+        self.assertEqual(self.ui.session.get.call_args.kwargs["stream"], True)
+        entries.close()
+        response.close.assert_called_once()
+
+    def test_multibyte_characters_split_across_chunks(self):
+        page = '<ul><li><a href="caf\u00e9-\u6a94\u6848.txt">x</a></li></ul>'
+        self.ui.session.get = MagicMock(return_value=_page_response(page, chunk_size=1))
+        urls = [info["url"] for info in self.backend._list_directory(
+            "http://example.com/", "http://example.com/"
+        )]
+        self.assertEqual(urls, ["http://example.com/caf\u00e9-\u6a94\u6848.txt"])
+
+
+class TestBackendScanWebsite(unittest.TestCase):
+    """Tests for the full scan pipeline in streaming and batch modes."""
+
+    PAGES = TestBackendGetAllUrls.PAGES
+
+    def setUp(self):
+        self.ui = MockUIManager()
+        self.backend = Backend(self.ui)
+        self.release_b = threading.Event()
+        self.release_b.set()
+
+        def fake_get(url, **kwargs):
+            if url.endswith("/b/"):
+                self.release_b.wait(timeout=5)
+            return _listing_response(self.PAGES.get(url, []))
+
+        head = MagicMock()
+        head.headers = {"content-length": "2048", "content-type": "application/octet-stream"}
+        self.ui.session.get = MagicMock(side_effect=fake_get)
+        self.ui.session.head = MagicMock(return_value=head)
+
+    def _expected_files(self):
+        return {"pub/top.txt", "pub/a/one.iso", "pub/b/two.iso"}
+
+    def test_streaming_scan_finds_everything(self):
+        self.backend.scan_website("http://example.com/pub/")
+        self.assertEqual(set(self.ui.files_dict), self._expected_files())
+        self.assertEqual(set(self.ui.folders), {"/pub/a", "/pub/b"})
+        scanned, total, estimated = self.ui.progress_events[-1]
+        self.assertEqual((scanned, total, estimated), (5, 5, False))
+
+    def test_batch_scan_finds_everything(self):
+        self.backend.streaming_scan = False
+        self.backend.scan_website("http://example.com/pub/")
+        self.assertEqual(set(self.ui.files_dict), self._expected_files())
+        self.assertFalse(any(event[2] for event in self.ui.progress_events))
+
+    def test_streaming_emits_items_before_crawl_finishes(self):
+        self.release_b.clear()
+        scan = threading.Thread(
+            target=self.backend.scan_website, args=("http://example.com/pub/",)
+        )
+        scan.start()
+        deadline = time.monotonic() + 5
+        while "pub/a/one.iso" not in self.ui.files_dict and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIn("pub/a/one.iso", self.ui.files_dict)
+        self.assertTrue(any(event[2] for event in self.ui.progress_events))
+        self.release_b.set()
+        scan.join(timeout=5)
+        self.assertIn("pub/b/two.iso", self.ui.files_dict)
+
+
+class TestBackendScanBacklog(unittest.TestCase):
+    """The crawl waits for room in the task backlog instead of queueing without bound."""
+
+    def setUp(self):
+        self.ui = MockUIManager()
+        self.backend = Backend(self.ui)
+        self.pages = {"http://example.com/pub/": [f"d{i}/" for i in range(10)]}
+        for i in range(10):
+            self.pages[f"http://example.com/pub/d{i}/"] = [f"f{j}.bin" for j in range(20)]
+
+        def slow_head(url, **kwargs):
+            time.sleep(0.002)
+            head = MagicMock()
+            head.headers = {"content-length": "1"}
+            return head
+
+        self.ui.session.get = MagicMock(
+            side_effect=lambda url, **kwargs: _listing_response(self.pages.get(url, []))
+        )
+        self.ui.session.head = MagicMock(side_effect=slow_head)
+
+    def _scan_peak(self):
+        peaks = []
+        original = self.backend._log_scan_backlog
+
+        def record(tasks):
+            peaks.append(tasks.peak)
+            original(tasks)
+
+        with patch.object(self.backend, "_log_scan_backlog", side_effect=record):
+            self.backend.scan_website("http://example.com/pub/")
+        return peaks[0]
+
+    def test_streaming_backlog_is_bounded(self):
+        self.backend.scan_backlog = 15
+        self.backend.scan_workers = 2
+        self.backend.scan_limits.enabled = False
+        peak = self._scan_peak()
+        self.assertEqual(len(self.ui.files_dict), 200)
+        # one listing may overshoot the limit by its own size per crawl worker
+        self.assertLessEqual(peak, 15 + 2 * 20)
+
+    def test_batch_backlog_is_bounded(self):
+        self.backend.streaming_scan = False
+        self.backend.scan_backlog = 15
+        peak = self._scan_peak()
+        self.assertEqual(len(self.ui.files_dict), 200)
+        self.assertLessEqual(peak, 15)
+
+
+class TestBackendScanRules(unittest.TestCase):
+    """Scan rules prune the crawl: excluded listings are never fetched or probed."""
+
+    PAGES = TestBackendGetAllUrls.PAGES
+
+    def setUp(self):
+        self.ui = MockUIManager()
+        self.backend = Backend(self.ui)
+
+        def fake_get(url, **kwargs):
+            return _listing_response(self.PAGES.get(url, []))
+
+        head = MagicMock()
+        head.headers = {"content-length": "2048"}
+        self.ui.session.get = MagicMock(side_effect=fake_get)
+        self.ui.session.head = MagicMock(return_value=head)
+
+    def test_excluded_directory_is_never_fetched(self):
+        self.backend.scan_rules = ScanRules.from_strings(exclude="b/")
+        self.backend.scan_website("http://example.com/pub/")
+        fetched = {c.args[0] for c in self.ui.session.get.call_args_list}
+        self.assertNotIn("http://example.com/pub/b/", fetched)
+        self.assertEqual(set(self.ui.files_dict), {"pub/top.txt", "pub/a/one.iso"})
+        self.assertIn("[Scan] Scan rules skipped 2 entries", self.ui.log_messages)
+
+    def test_excluded_files_are_never_probed(self):
+        self.backend.scan_rules = ScanRules.from_strings(allow_extensions="iso")
+        self.backend.scan_website("http://example.com/pub/")
+        probed = {c.args[0] for c in self.ui.session.head.call_args_list}
+        self.assertNotIn("http://example.com/pub/top.txt", probed)
+        self.assertEqual(set(self.ui.files_dict), {"pub/a/one.iso", "pub/b/two.iso"})
+
+    def test_max_depth_stops_descent(self):
+        self.backend.scan_rules = ScanRules(max_depth=0)
+        self.backend.scan_website("http://example.com/pub/")
+        fetched = [c.args[0] for c in self.ui.session.get.call_args_list]
+        self.assertEqual(fetched, ["http://example.com/pub/"])
+        self.assertEqual(set(self.ui.files_dict), {"pub/top.txt"})
+
+
+class TestBackendAliases(unittest.TestCase):
+    """Symlink loops and redirected aliases are crawled once."""
+
+    FILES = [f"f{i}.txt" for i in range(8)]
+
+    def setUp(self):
+        self.ui = MockUIManager()
+        self.backend = Backend(self.ui)
+        self.pages = {
+            "http://example.com/pub/": ["../", "a/", "current/"],
+            # a symlink loop: /pub/a/loop/ shows /pub/a/ again, forever
+            "http://example.com/pub/a/": ["../", "loop/"] + self.FILES,
+        }
+        self.redirects = {}
+
+        def fake_get(url, **kwargs):
+            target = self.redirects.get(url, url)
+            if target.startswith("http://example.com/pub/a/"):
+                response = _listing_response(self.pages["http://example.com/pub/a/"])
+            else:
+                response = _listing_response(self.pages.get(target, []))
+            response.url = target
+            return response
+
+        self.ui.session.get = MagicMock(side_effect=fake_get)
+
+    def _fetched(self):
+        return [c.args[0] for c in self.ui.session.get.call_args_list]
+
+    def test_symlink_loop_is_not_followed(self):
+        self.backend.scan_website("http://example.com/pub/")
+        self.assertNotIn("http://example.com/pub/a/loop/loop/", self._fetched())
+        self.assertIn("pub/a/loop/f0.txt", self.ui.files_dict)
+        self.assertEqual(
+            self.backend.alias_detector.aliases,
+            {"http://example.com/pub/a/loop/": "http://example.com/pub/a/"},
+        )
+        self.assertTrue(any("[Scan] Aliases: 1" in m for m in self.ui.log_messages))
+
+    def test_redirect_to_listed_directory_is_linked(self):
+        self.redirects["http://example.com/pub/current/"] = "http://example.com/pub/a/"
+        self.backend.scan_limits.enabled = False
+        self.backend.scan_workers = 1  # list /pub/a/ before /pub/current/
+        self.backend.scan_rules = ScanRules(exclude=("loop/",))
+        self.backend.scan_website("http://example.com/pub/")
+        self.assertNotIn("pub/current/f0.txt", self.ui.files_dict)
+        self.assertIn(
+            "http://example.com/pub/current/", self.backend.alias_detector.aliases
+        )
+
+    def test_identical_sibling_directories_are_both_crawled(self):
+        self.pages["http://example.com/pub/"] = ["../", "main/", "contrib/"]
+        for name in ("main", "contrib"):
+            self.pages[f"http://example.com/pub/{name}/"] = ["../", "binary/"] + self.FILES
+            self.pages[f"http://example.com/pub/{name}/binary/"] = ["../", "Packages"]
+        self.backend.scan_website("http://example.com/pub/")
+        self.assertIn("pub/contrib/binary/Packages", self.ui.files_dict)
+        self.assertIn("pub/main/binary/Packages", self.ui.files_dict)
+        self.assertEqual(self.backend.alias_detector.aliases, {})
+
+    def test_truncated_listing_is_not_fingerprinted(self):
+        chunks = list(_listing_response(self.pages["http://example.com/pub/a/"]).iter_content(16))
+
+        def truncated(size):
+            yield from chunks[:-1]  # every entry, but not the end of the page
+            raise requests.exceptions.ChunkedEncodingError("connection reset")
+
+        response = _page_response("")
+        response.iter_content = truncated
+        self.ui.session.get = MagicMock(return_value=response)
+        url_infos = list(
+            self.backend._list_directory("http://example.com/pub/a/", "http://example.com/pub/")
+        )
+        self.assertIn("http://example.com/pub/a/loop/", [info["url"] for info in url_infos])
+        self.assertEqual(self.backend.alias_detector._url_digests, {})
+
+    def test_alias_hook_reports_paths(self):
+        self.ui.on_scan_alias = MagicMock()
+        self.backend.scan_website("http://example.com/pub/")
+        self.ui.on_scan_alias.assert_called_once_with(
+            url="http://example.com/pub/a/loop/",
+            canonical="http://example.com/pub/a/",
+            path="/pub/a/loop",
+            canonical_path="/pub/a",
+        )
+
+    def test_detection_can_be_disabled(self):
+        self.backend.alias_detector = None
+        self.backend.scan_rules = ScanRules(max_depth=3)
+        self.backend.scan_website("http://example.com/pub/")
+        self.assertIn("http://example.com/pub/a/loop/loop/", self._fetched())
+
+
+class TestBackendScanIndex(unittest.TestCase):
+    """Checkpointing to the scan index, resuming and reloading without network."""
+
+    PAGES = TestBackendGetAllUrls.PAGES
+    URL = "http://example.com/pub/"
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self._tmp.name, "scan_index.sqlite3")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _backend(self, stop_at=None):
+        ui = MockUIManager()
+        backend = Backend(ui)
+        backend.scan_index = ScanIndex(self.index_path)
+        backend.scan_limits.enabled = False
+        backend.scan_workers = 1  # listings are fetched strictly in FIFO order
+
+        def fake_get(url, **kwargs):
+            if url == stop_at:
+                backend.should_stop = True
+            return _listing_response(self.PAGES.get(url, []))
+
+        head = MagicMock()
+        head.headers = {"content-length": "2048", "content-type": "application/octet-stream"}
+        ui.session.get = MagicMock(side_effect=fake_get)
+        ui.session.head = MagicMock(return_value=head)
+        self.addCleanup(backend.scan_index.close)
+        return ui, backend
+
+    def test_stopped_scan_resumes_from_checkpoint(self):
+        _ui, backend = self._backend(stop_at=self.URL + "b/")
+        backend.scan_website(self.URL)
+        self.assertEqual(backend.scan_index.status(self.URL), "interrupted")
+        backend.scan_index.close()
+
+        ui, backend = self._backend()
+        backend.scan_website(self.URL, resume=True)
+        fetched = [c.args[0] for c in ui.session.get.call_args_list]
+        self.assertEqual(fetched, [self.URL + "b/"])
+        self.assertEqual(
+            set(ui.files_dict), {"pub/top.txt", "pub/a/one.iso", "pub/b/two.iso"}
+        )
+        self.assertEqual(set(ui.folders), {"/pub/a", "/pub/b"})
+        self.assertEqual(backend.scan_index.status(self.URL), "finished")
+
+    def test_finished_scan_reloads_without_network(self):
+        _ui, backend = self._backend()
+        backend.scan_website(self.URL)
+        backend.scan_index.close()
+
+        ui, backend = self._backend()
+        backend.scan_website(self.URL, resume=True)
+        ui.session.get.assert_not_called()
+        ui.session.head.assert_not_called()
+        self.assertEqual(
+            set(ui.files_dict), {"pub/top.txt", "pub/a/one.iso", "pub/b/two.iso"}
+        )
+        self.assertEqual(ui.progress_events[-1][:2], (5, 5))
+
+    def test_fresh_scan_ignores_previous_results(self):
+        _ui, backend = self._backend()
+        backend.scan_website(self.URL)
+        backend.scan_index.close()
+
+        ui, backend = self._backend()
+        backend.scan_website(self.URL)
+        self.assertEqual(len(ui.session.get.call_args_list), 3)
+
+
+class TestBackendListingMetadata(unittest.TestCase):
+    """Listing metadata replaces per-file HEAD requests when available."""
+
+    NGINX_PAGE = (
+        '<html><body><pre><a href="../">../</a>\n'
+        '<a href="notes.txt">notes.txt</a>     05-Jan-2024 12:31     2048\n'
+        "</pre></body></html>"
+    )
+
+    def setUp(self):
+        self.ui = MockUIManager()
+        self.items = []
+        self.ui.on_scan_item = lambda **payload: self.items.append(payload)
+        self.backend = Backend(self.ui)
+
+    def test_listing_metadata_skips_head(self):
+        self.ui.session.get = MagicMock(return_value=_page_response(self.NGINX_PAGE))
+        self.backend.scan_website("http://example.com/")
+        self.ui.session.head.assert_not_called()
+        files = [item for item in self.items if not item["is_directory"]]
+        self.assertEqual(len(files), 1)
+        self.assertEqual(files[0]["size"], "2.00 KB")
+        self.assertEqual(files[0]["modified"], "2024-01-05 12:31")
+        self.assertEqual(files[0]["file_type"], "text/plain")
+
+    def test_unrecognized_listing_falls_back_to_head(self):
+        self.ui.session.get = MagicMock(return_value=_listing_response(["plain.bin"]))
+        head = MagicMock()
+        head.headers = {"content-length": "1024", "content-type": "application/x-bin"}
+        self.ui.session.head = MagicMock(return_value=head)
+        self.backend.scan_website("http://example.com/")
+        self.ui.session.head.assert_called_once()
+        self.assertEqual(self.items[0]["size"], "1.00 KB")
+        self.assertEqual(self.items[0]["file_type"], "application/x-bin")
+
+
+class TestBackendStructuredListings(unittest.TestCase):
+    """JSON/XML autoindex output is preferred and parsed without the HTML path."""
+
+    JSON_PAGES = {
+        "http://example.com/pub/": '[{"name":"a","type":"directory","mtime":"Fri, 05 Jan 2024 12:30:00 GMT"},'
+        '{"name":"top.txt","type":"file","mtime":"Fri, 05 Jan 2024 12:31:00 GMT","size":2048}]',
+        "http://example.com/pub/a/": '[{"name":"one.iso","type":"file","mtime":"Fri, 05 Jan 2024 12:32:00 GMT","size":10}]',
+    }
+
+    def setUp(self):
+        self.ui = MockUIManager()
+        self.backend = Backend(self.ui)
+
+    def _serve(self, pages, content_type):
+        def fake_get(url, **kwargs):
+            response = _page_response(pages.get(url, "[]"))
+            response.headers = {"content-type": content_type}
+            return response
+
+        self.ui.session.get = MagicMock(side_effect=fake_get)
+
+    def _accepts(self):
+        return [c.kwargs["headers"].get("Accept") for c in self.ui.session.get.call_args_list]
+
+    def test_json_listing_crawled_with_exact_metadata(self):
+        self._serve(self.JSON_PAGES, "application/json")
+        urls = {info["url"]: info for info in self.backend._get_all_urls("http://example.com/pub/")}
+        self.assertEqual(
+            sorted(urls),
+            [
+                "http://example.com/pub/a/",
+                "http://example.com/pub/a/one.iso",
+                "http://example.com/pub/top.txt",
+            ],
+        )
+        self.assertEqual(urls["http://example.com/pub/top.txt"]["size"], 2048)
+        self.assertEqual(urls["http://example.com/pub/top.txt"]["modified"], "2024-01-05 12:31")
+        self.assertTrue(all(accept == STRUCTURED_ACCEPT for accept in self._accepts()))
+
+    def test_html_host_is_asked_once(self):
+        self.ui.session.get = MagicMock(
+            side_effect=lambda url, **kwargs: _listing_response(
+                TestBackendGetAllUrls.PAGES.get(url, [])
+            )
+        )
+        self.backend._get_all_urls("http://example.com/pub/")
+        accepts = self._accepts()
+        self.assertEqual(accepts[0], STRUCTURED_ACCEPT)
+        self.assertEqual(accepts[1:], [None] * (len(accepts) - 1))
+
+    def test_unreadable_json_falls_back_to_html(self):
+        html = '<html><body><a href="fallback.txt">fallback.txt</a></body></html>'
+
+        def fake_get(url, headers=None, **kwargs):
+            if headers.get("Accept") == STRUCTURED_ACCEPT:
+                response = _page_response('{"error": "not a listing"}')
+                response.headers = {"content-type": "application/json"}
+                return response
+            return _page_response(html)
+
+        self.ui.session.get = MagicMock(side_effect=fake_get)
+        urls = [info["url"] for info in self.backend._list_directory(
+            "http://example.com/", "http://example.com/"
+        )]
+        self.assertEqual(urls, ["http://example.com/fallback.txt"])
+        self.assertEqual(self._accepts(), [STRUCTURED_ACCEPT, None])
+
+    def test_structured_listings_disabled(self):
+        self.backend.structured_listings = False
+        self._serve(self.JSON_PAGES, "application/json")
+        self.backend._get_all_urls("http://example.com/pub/")
+        self.assertTrue(all(accept is None for accept in self._accepts()))
+
+
+class TestBackendListingFlavors(unittest.TestCase):
+    """The first nginx/Apache page of a host locks in a line extractor."""
+
+    PAGES = {
+        "http://example.com/pub/": '<hr><pre><a href="../">../</a>\n'
+        '<a href="a/">a/</a>   05-Jan-2024 12:30   -\n'
+        '<a href="top.txt">top.txt</a>   05-Jan-2024 12:31   2048\n</pre>',
+        "http://example.com/pub/a/": '<hr><pre><a href="../">../</a>\n'
+        '<a href="one.iso">one.iso</a>   05-Jan-2024 12:32   10\n'
+        '</pre><p><a href="/about">About this mirror</a></p>',
+    }
+
+    def setUp(self):
+        self.ui = MockUIManager()
+        self.backend = Backend(self.ui)
+        self.ui.session.get = MagicMock(
+            side_effect=lambda url, **kwargs: _page_response(self.PAGES.get(url, ""))
+        )
+
+    def test_flavor_locked_per_host_with_page_fallback(self):
+        urls = {info["url"]: info for info in self.backend._get_all_urls("http://example.com/pub/")}
+        self.assertEqual(self.backend._host_flavors, {"example.com": "nginx"})
+        self.assertEqual(urls["http://example.com/pub/a/one.iso"]["size"], 10)
+        self.assertEqual(urls["http://example.com/pub/top.txt"]["modified"], "2024-01-05 12:31")
+        # The footer link on /pub/a/ does not fit the nginx layout
+        self.assertEqual(self.backend._listing_stats["flavor_fallback"], 1)
+
+    def test_disabled(self):
+        self.backend.listing_flavors = False
+        self.backend._get_all_urls("http://example.com/pub/")
+        self.assertEqual(self.backend._host_flavors, {})
+
+
+class TestBackendListingRetries(unittest.TestCase):
+    """Failed listings are retried, reported, and can be rescanned on their own."""
+
+    PAGES = {
+        "http://example.com/pub/": ["a/", "b/", "top.txt"],
+        "http://example.com/pub/a/": ["one.iso"],
+        "http://example.com/pub/b/": ["two.iso"],
+    }
+
+    def setUp(self):
+        self.ui = MockUIManager()
+        self.failed_reports = []
+        self.ui.on_scan_failures = lambda failed: self.failed_reports.append(failed)
+        self.backend = Backend(self.ui)
+        self.backend.listing_retries.policy.base_delay = 0.01
+        self.ui.session.head = MagicMock(return_value=MagicMock(headers={"content-length": "1"}))
+        self.errors = {}  # url -> exceptions to raise, in order
+
+        def fake_get(url, **kwargs):
+            errors = self.errors.get(url)
+            if errors:
+                raise errors.pop(0)
+            return _listing_response(self.PAGES.get(url, []))
+
+        self.ui.session.get = MagicMock(side_effect=fake_get)
+
+    def _fetched(self):
+        return [c.args[0] for c in self.ui.session.get.call_args_list]
+
+    def test_transient_error_retried(self):
+        self.errors["http://example.com/pub/a/"] = [
+            requests.ConnectionError("reset"), requests.Timeout("slow")
+        ]
+        self.backend.scan_website("http://example.com/pub/")
+        self.assertIn("pub/a/one.iso", self.ui.files_dict)
+        self.assertEqual(self._fetched().count("http://example.com/pub/a/"), 3)
+        self.assertEqual(self.backend.failed_listings("http://example.com/pub/"), {})
+        self.assertTrue(any("after a retry" in msg for msg in self.ui.log_messages))
+        self.assertEqual(self.failed_reports, [])
+
+    def test_permanent_failure_reported_and_rescanned_alone(self):
+        not_found = MagicMock(status_code=404)
+        self.errors["http://example.com/pub/b/"] = [
+            requests.HTTPError("404 Not Found", response=not_found)
+        ]
+        self.backend.scan_website("http://example.com/pub/")
+        self.assertEqual(self._fetched().count("http://example.com/pub/b/"), 1)
+        self.assertNotIn("pub/b/two.iso", self.ui.files_dict)
+        failed = self.backend.failed_listings("http://example.com/pub/")
+        self.assertEqual(list(failed), ["http://example.com/pub/b/"])
+        self.assertEqual(self.failed_reports, [failed])
+        self.assertEqual(self.backend.failed_listings("http://example.com/other/"), {})
+
+        self.ui.session.get.reset_mock()
+        self.backend.scan_website("http://example.com/pub/", retry_failed=True)
+        self.assertEqual(self._fetched(), ["http://example.com/pub/b/"])
+        self.assertIn("pub/b/two.iso", self.ui.files_dict)
+        self.assertIn("pub/a/one.iso", self.ui.files_dict)  # earlier results kept
+        self.assertEqual(self.backend.failed_listings("http://example.com/pub/"), {})
+
+    def test_retry_budget_gives_up(self):
+        self.backend.listing_retries.policy.attempts = 1
+        self.errors["http://example.com/pub/a/"] = [requests.ConnectionError("reset")] * 5
+        self.backend.scan_website("http://example.com/pub/")
+        self.assertEqual(self._fetched().count("http://example.com/pub/a/"), 2)
+        self.assertIn("http://example.com/pub/a/", self.backend.failed_listings("http://example.com/pub/"))
+
+    def test_given_up_listing_is_checkpointed_as_failed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.backend.scan_index = ScanIndex(os.path.join(tmp, "scan_index.sqlite3"))
+            self.addCleanup(self.backend.scan_index.close)
+            self.errors["http://example.com/pub/b/"] = [
+                requests.HTTPError("404 Not Found", response=MagicMock(status_code=404))
+            ]
+            self.backend.scan_website("http://example.com/pub/")
+            state = self.backend.scan_index.resume_state("http://example.com/pub/")
+            self.assertNotIn("http://example.com/pub/b/", state.done_listings)
+            self.assertEqual(state.failed_listings, ["http://example.com/pub/b/"])
+            self.assertEqual(state.pending_listings, [("http://example.com/pub/b/", 1)])
+
+            self.ui.session.get.reset_mock()
+            self.backend.scan_website("http://example.com/pub/", resume=True)
+            self.assertEqual(self._fetched(), ["http://example.com/pub/b/"])
+            self.assertIn("pub/b/two.iso", self.ui.files_dict)
+            state = self.backend.scan_index.resume_state("http://example.com/pub/")
+            self.assertEqual(state.pending_listings, [])
+
+
 class TestBackendDownload(unittest.TestCase):
     """Tests for file download functionality."""
 
@@ -169,6 +819,371 @@ class TestBackendDownload(unittest.TestCase):
         self.assertTrue(os.path.exists(test_file))
 
 
+class TestBackendAdaptiveConcurrency(unittest.TestCase):
+    def setUp(self):
+        self.ui = MockUIManager()
+        self.backend = Backend(self.ui)
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _overloaded_response(self):
+        response = MagicMock()
+        response.status_code = 503
+        response.raise_for_status.side_effect = requests.HTTPError("503 Service Unavailable")
+        return response
+
+    def test_listing_503_backs_off_scan_limit(self):
+        self.ui.session.get.return_value = self._overloaded_response()
+        self.assertEqual(list(self.backend._list_directory("http://h/", "http://h/")), [])
+        self.assertEqual(self.backend.scan_limits.limits(), {"h": 5})
+        self.assertIn("[Concurrency] scan limit for h: 10 -> 5 (backoff)", self.ui.log_messages)
+
+    def test_download_timeout_backs_off_download_limit(self):
+        self.backend.download_retries.attempts = 0
+        self.ui.session.get.side_effect = requests.Timeout("read timed out")
+        target = os.path.join(self.temp_dir, "f.bin")
+        self.assertFalse(self.backend.download_file("http://h/f.bin", target, "f.bin"))
+        self.assertEqual(self.backend.download_limits.limits(), {"h": 2})
+
+    def test_limit_changes_reach_ui_hook(self):
+        events = []
+        self.ui.on_concurrency_changed = lambda **payload: events.append(payload)
+        self.ui.session.get.return_value = self._overloaded_response()
+        list(self.backend._list_directory("http://h/", "http://h/"))
+        self.assertEqual(events, [{"kind": "scan", "limits": {"h": 5}}])
+
+
+class TestBackendConnectionPools(unittest.TestCase):
+    def setUp(self):
+        self.ui = MockUIManager()
+        self.backend = Backend(self.ui)
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_pool_sizes_follow_concurrency(self):
+        self.assertEqual(
+            self.backend.connection_pool_sizes(), {"scan": 64, "download": 10}
+        )
+        self.backend.scan_limits.enabled = False
+        self.assertEqual(self.backend.connection_pool_sizes()["scan"], 10)
+
+    def test_downloads_use_download_session(self):
+        response = MagicMock()
+        response.headers = {"content-length": "4"}
+        response.iter_content = lambda size: [b"data"]
+        response.status_code = 200
+        self.ui.update_progress = MagicMock()
+        self.ui.update_download_status = MagicMock()
+        self.ui.download_session = MagicMock()
+        self.ui.download_session.get.return_value = response
+        target = os.path.join(self.temp_dir, "f.bin")
+        self.assertTrue(self.backend.download_file("http://h/f.bin", target, "f.bin"))
+        self.ui.session.get.assert_not_called()
+
+    def test_scan_logs_connection_reuse(self):
+        self.ui.session.get.return_value = _page_response("<html></html>")
+        stats = iter([PoolStats(5, 1, 0), PoolStats(25, 3, 1)])
+        with patch("index_ripper.backend.session_stats", side_effect=lambda session: next(stats)):
+            self.backend.scan_website("http://example.com/")
+        self.assertIn(
+            "[Connections] scan: 20 requests over 2 connections (90% reused, 1 discarded)",
+            self.ui.log_messages,
+        )
+
+
+class TestBackendResumableDownloads(unittest.TestCase):
+    BODY = bytes(range(256)) * 40
+
+    def setUp(self):
+        self.ui = MockUIManager()
+        self.ui.update_progress = MagicMock()
+        self.ui.update_download_status = MagicMock()
+        self.backend = Backend(self.ui)
+        self._tmp = tempfile.TemporaryDirectory()
+        self.target = os.path.join(self._tmp.name, "f.iso")
+        self.requests = []
+        self.etag = '"v1"'
+        self.fail_after = None
+        # A failed attempt ends the call here unless a test allows retries
+        self.backend.download_retries.attempts = 0
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _get(self, url, headers=None, **kwargs):
+        headers = headers or {}
+        self.requests.append(headers)
+        body, response = self.BODY, MagicMock()
+        response.status_code = 200
+        response.headers = {"etag": self.etag, "content-length": str(len(body))}
+        start = int(headers.get("Range", "bytes=0-")[6:-1])
+        if start and headers.get("If-Range") == self.etag:
+            response.status_code = 206
+            response.headers["content-range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+            body = body[start:]
+        chunks = [body[i:i + 1000] for i in range(0, len(body), 1000)]
+        fail_after, self.fail_after = self.fail_after, None
+
+        def iter_content(size):
+            for i, chunk in enumerate(chunks):
+                if i == fail_after:
+                    raise requests.exceptions.ChunkedEncodingError("connection reset")
+                yield chunk
+
+        response.iter_content = iter_content
+        return response
+
+    def _download(self):
+        self.ui.session.get = MagicMock(side_effect=self._get)
+        return self.backend.download_file("http://h/f.iso", self.target, "f.iso")
+
+    def _kept(self):
+        return PartialDownload.load(self.target, "http://h/f.iso").offset
+
+    def test_failed_download_resumes_with_range(self):
+        self.fail_after = 3
+        self.assertFalse(self._download())
+        self.assertEqual(self._kept(), 3000)
+        # Preallocated to the full length; the sidecar says how much is written
+        self.assertEqual(os.path.getsize(self.target + ".part"), len(self.BODY))
+        self.assertTrue(self._download())
+        self.assertEqual(self.requests[1]["Range"], "bytes=3000-")
+        self.assertEqual(self.requests[1]["If-Range"], '"v1"')
+        with open(self.target, "rb") as file_obj:
+            self.assertEqual(file_obj.read(), self.BODY)
+        self.assertFalse(os.path.exists(self.target + ".part"))
+        self.assertFalse(os.path.exists(self.target + ".part.json"))
+
+    def test_changed_file_restarts_cleanly(self):
+        self.fail_after = 3
+        self.assertFalse(self._download())
+        self.etag = '"v2"'
+        self.assertTrue(self._download())
+        with open(self.target, "rb") as file_obj:
+            self.assertEqual(file_obj.read(), self.BODY)
+
+    def test_stop_keeps_partial_file(self):
+        self.ui.update_progress = MagicMock(
+            side_effect=lambda *args: setattr(self.backend, "should_stop", True)
+        )
+        self.assertFalse(self._download())
+        self.assertEqual(self._kept(), 1000)
+
+    def test_progress_updates_are_coalesced_per_file(self):
+        self.assertTrue(self._download())
+        # Every chunk arrives within one 10 Hz interval: the first report and 100%
+        progress = [c.args[2] for c in self.ui.update_progress.call_args_list]
+        self.assertEqual(len(progress), 2)
+        self.assertEqual(progress[-1], 100)
+
+    def test_polled_progress_ends_at_full_size(self):
+        self.backend.push_progress = False
+        self.assertTrue(self._download())
+        self.ui.update_progress.assert_not_called()
+        snapshot = self.backend.download_progress.snapshot()
+        self.assertEqual(snapshot.files, {self.target: ("f.iso", 100.0)})
+        self.assertEqual((snapshot.totals.done, snapshot.totals.active), (len(self.BODY), 0))
+
+    def test_resume_without_preallocation_appends(self):
+        self.backend.preallocate_downloads = False
+        self.fail_after = 3
+        self.assertFalse(self._download())
+        self.assertEqual(os.path.getsize(self.target + ".part"), 3000)
+        self.assertTrue(self._download())
+        with open(self.target, "rb") as file_obj:
+            self.assertEqual(file_obj.read(), self.BODY)
+
+    def test_small_write_blocks_are_counted(self):
+        self.backend.write_block_size = 4096
+        self.assertTrue(self._download())
+        self.assertEqual(self.backend.write_stats.bytes, len(self.BODY))
+        self.assertEqual(self.backend.write_stats.writes, 3)
+
+    def test_encoded_response_is_not_checked_against_content_length(self):
+        response = MagicMock(status_code=200)
+        response.headers = {"content-encoding": "gzip", "content-length": "100", "etag": '"v1"'}
+        response.iter_content = lambda size: [b"x" * 300]
+        self.ui.session.get = MagicMock(return_value=response)
+        for resume in (False, True):
+            with self.subTest(resume=resume):
+                self.backend.resume_downloads = resume
+                self.assertTrue(self.backend.download_file("http://h/a.txt", self.target, "a.txt"))
+                self.assertEqual(os.path.getsize(self.target), 300)
+                headers = self.ui.session.get.call_args.kwargs["headers"]
+                self.assertEqual(headers["Accept-Encoding"], "identity")
+                os.remove(self.target)
+
+    def test_resume_disabled_discards_partial_file(self):
+        self.backend.resume_downloads = False
+        self.fail_after = 3
+        self.assertFalse(self._download())
+        self.assertFalse(os.path.exists(self.target + ".part"))
+        self.assertNotIn("Range", self.requests[0])
+
+    def _allow_retries(self, delay=0.01):
+        self.backend.download_retries = RetryPolicy(attempts=2, base_delay=delay, max_delay=delay)
+
+    def _statuses(self):
+        return [c.args[1] for c in self.ui.update_download_status.call_args_list]
+
+    def test_reset_mid_stream_continues_from_last_byte(self):
+        self._allow_retries()
+        self.fail_after = 3
+        self.assertTrue(self._download())
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.requests[1]["Range"], "bytes=3000-")
+        with open(self.target, "rb") as file_obj:
+            self.assertEqual(file_obj.read(), self.BODY)
+        self.assertEqual(
+            self._statuses(),
+            [
+                "Retrying 1/2 (ChunkedEncodingError)",
+                "Downloading (resumed at 29%)",
+                "Completed after 1 retry",
+            ],
+        )
+
+    def test_gives_up_after_attempts(self):
+        self._allow_retries()
+        self.ui.session.get = MagicMock(side_effect=requests.ConnectionError("reset"))
+        self.assertFalse(self.backend.download_file("http://h/f.iso", self.target, "f.iso"))
+        self.assertEqual(self.ui.session.get.call_count, 3)
+        self.assertEqual(self._statuses()[-1], "Failed after 2 retries (ConnectionError)")
+
+    def test_permanent_error_not_retried(self):
+        self._allow_retries()
+        response = MagicMock()
+        response.status_code = 404
+        response.raise_for_status.side_effect = requests.HTTPError(response=response)
+        self.ui.session.get = MagicMock(return_value=response)
+        self.assertFalse(self.backend.download_file("http://h/f.iso", self.target, "f.iso"))
+        self.assertEqual(self.ui.session.get.call_count, 1)
+        self.assertEqual(self._statuses(), ["Failed"])
+
+    def test_stop_during_backoff(self):
+        self._allow_retries(delay=30)
+        self.fail_after = 1
+        threading.Timer(0.1, lambda: setattr(self.backend, "should_stop", True)).start()
+        started = time.monotonic()
+        self.assertFalse(self._download())
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(self._kept(), 1000)
+
+
+class TestBackendRateLimits(unittest.TestCase):
+    def setUp(self):
+        self.ui = MockUIManager()
+        self.backend = Backend(self.ui)
+
+    def test_listing_requests_are_rate_limited(self):
+        self.ui.session.get.side_effect = lambda *a, **k: _page_response("<pre></pre>")
+        self.backend.set_rate_limits(requests_per_second=20)
+        started = time.monotonic()
+        for i in range(25):  # 20 from the burst, then 5 at 20/s
+            list(self.backend._list_directory(f"http://h/{i}/", "http://h/"))
+        self.assertGreater(time.monotonic() - started, 0.2)
+        self.assertEqual(self.ui.session.get.call_count, 25)
+
+    def test_download_bytes_are_rate_limited(self):
+        body = [b"x" * 1000] * 6
+        response = MagicMock()
+        response.status_code = 200
+        response.headers = {"content-length": "6000"}
+        response.iter_content = lambda size: iter(body)
+        self.ui.session.get.return_value = response
+        self.ui.update_progress = MagicMock()
+        self.backend.set_rate_limits(bytes_per_second=10000)
+        with tempfile.TemporaryDirectory() as tmp:
+            target = os.path.join(tmp, "f.bin")
+            started = time.monotonic()
+            self.assertTrue(self.backend.download_file("http://h/f.bin", target, "f.bin"))
+            self.assertLess(time.monotonic() - started, 0.2)  # fits in the burst
+            self.backend.set_rate_limits(bytes_per_second=5000, host="h")
+            started = time.monotonic()
+            self.assertTrue(self.backend.download_file("http://h/f.bin", target, "f.bin"))
+            self.assertGreater(time.monotonic() - started, 0.3)  # 4000 banked, 2000 at 5000/s
+            self.assertEqual(os.path.getsize(target), 6000)
+
+    def test_stop_releases_rate_limited_listing(self):
+        self.backend.set_rate_limits(requests_per_second=0.1)
+        self.backend.rate_limits.wait_request("http://h/")
+        self.backend.should_stop = True
+        self.assertEqual(list(self.backend._list_directory("http://h/a/", "http://h/")), [])
+        self.ui.session.get.assert_not_called()
+
+
+class TestBackendConditionalRescan(unittest.TestCase):
+    PAGES = {
+        "http://h/": ["sub/", "a.txt"],
+        "http://h/sub/": ["b.txt"],
+    }
+
+    def setUp(self):
+        self.ui = MockUIManager()
+        self.backend = Backend(self.ui)
+        self.backend.listing_cache = ListingCache()
+        self.requests = []
+
+        def fake_get(url, **kwargs):
+            headers = kwargs.get("headers", {})
+            self.requests.append((url, headers.get("If-None-Match")))
+            if headers.get("If-None-Match") == f'"{url}"':
+                response = _page_response("")
+                response.status_code = 304
+            else:
+                response = _listing_response(self.PAGES[url])
+                response.status_code = 200
+            response.headers = {"etag": f'"{url}"'}
+            return response
+
+        self.ui.session.get.side_effect = fake_get
+
+    def _urls(self):
+        urls = sorted(info["url"] for info in self.backend._get_all_urls("http://h/"))
+        self.backend.listing_cache.save()  # as scan_website does when the scan ends
+        return urls
+
+    def test_not_modified_listing_replays_cached_entries(self):
+        first = self._urls()
+        self.requests.clear()
+        self.assertEqual(self._urls(), first)
+        self.assertEqual(
+            sorted(self.requests),
+            [("http://h/", '"http://h/"'), ("http://h/sub/", '"http://h/sub/"')],
+        )
+        self.assertEqual(self.backend._listing_stats["not_modified"], 2)
+
+    def test_trusted_subtree_skips_requests_below_unchanged_directory(self):
+        first = self._urls()
+        self.requests.clear()
+        self.backend.trust_unchanged_subtrees = True
+        self.assertEqual(self._urls(), first)
+        self.assertEqual(self.requests, [("http://h/", '"http://h/"')])
+        self.assertEqual(self.backend._listing_stats["reused"], 1)
+
+
+    def test_entries_are_collected_only_for_cacheable_pages(self):
+        self.assertEqual(self.backend._listing_collector({"etag": '"1"'}), [])
+        self.assertIsNone(self.backend._listing_collector({}))
+        self.backend.listing_cache = None
+        self.assertIsNone(self.backend._listing_collector({"etag": '"1"'}))
+
+    def test_page_without_validators_is_not_cached(self):
+        def fake_get(url, **kwargs):
+            response = _listing_response(self.PAGES[url])
+            response.headers = {}
+            return response
+
+        self.ui.session.get.side_effect = fake_get
+        self._urls()
+        self.assertEqual(len(self.backend.listing_cache), 0)
+
 class TestBackendProcessFile(unittest.TestCase):
     """Tests for file processing in scan."""
 
@@ -0,0 +1,136 @@
+"""Tests for the adaptive per-host concurrency controller."""
+import threading
+import time
+import unittest
+
+from index_ripper.concurrency import AdaptiveConcurrency, HostLimiter, WorkerBudget
+
+
+class TestHostLimiter(unittest.TestCase):
+    def test_ramps_up_about_one_slot_per_window(self):
+        limiter = HostLimiter("h", 4, max_limit=10)
+        for _ in range(4):
+            self.assertTrue(limiter.try_acquire())
+            limiter.release(time.monotonic(), "ok", 0.01)
+        self.assertEqual(limiter.limit, 4)  # 4 + 4 * 1/4.x < 5
+        for _ in range(2):
+            limiter.try_acquire()
+            limiter.release(time.monotonic(), "ok", 0.01)
+        self.assertEqual(limiter.limit, 5)
+
+    def test_never_exceeds_max(self):
+        limiter = HostLimiter("h", 9, max_limit=10)
+        for _ in range(100):
+            limiter.try_acquire()
+            limiter.release(time.monotonic(), "ok", 0.01)
+        self.assertEqual(limiter.limit, 10)
+
+    def test_overload_halves_once_per_window(self):
+        changes = []
+        limiter = HostLimiter("h", 16, on_change=lambda *c: changes.append(c))
+        started = time.monotonic()
+        for _ in range(5):
+            limiter.try_acquire()
+        for _ in range(5):
+            limiter.release(started, "overload", None)
+        self.assertEqual(limiter.limit, 8)
+        self.assertEqual(changes, [("h", 16, 8, "backoff")])
+        limiter.try_acquire()
+        limiter.release(time.monotonic(), "overload", None)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_floor_is_min_limit(self):
+        limiter = HostLimiter("h", 2, min_limit=1)
+        for _ in range(5):
+            limiter.try_acquire()
+            limiter.release(time.monotonic(), "overload", None)
+        self.assertEqual(limiter.limit, 1)
+
+    def test_slow_responses_do_not_ramp(self):
+        limiter = HostLimiter("h", 2)
+        limiter.try_acquire()
+        limiter.release(time.monotonic(), "ok", 0.1)  # sets the baseline
+        for _ in range(20):
+            limiter.try_acquire()
+            limiter.release(time.monotonic(), "ok", 2.0)
+        self.assertEqual(limiter.limit, 2)
+
+    def test_acquire_blocks_at_limit(self):
+        limiter = HostLimiter("h", 1)
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.try_acquire())
+        stop = threading.Event()
+        result = []
+        waiter = threading.Thread(target=lambda: result.append(limiter.acquire(stop.is_set)))
+        waiter.start()
+        stop.set()
+        waiter.join(timeout=2)
+        self.assertEqual(result, [False])
+
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+    def test_limiters_are_per_host(self):
+        limits = AdaptiveConcurrency(3)
+        self.assertIs(limits.limiter("http://a/x"), limits.limiter("http://a/y"))
+        self.assertIsNot(limits.limiter("http://a/"), limits.limiter("http://b/"))
+        self.assertEqual(limits.limits(), {"a": 3, "b": 3})
+
+    def test_slot_records_status(self):
+        limits = AdaptiveConcurrency(8)
+        with limits.slot("http://a/") as slot:
+            slot.record_status(503)
+        self.assertEqual(limits.limits(), {"a": 4})
+        self.assertEqual(limits.limiter("http://a/").in_flight, 0)
+
+    def test_overload_error_escaping_slot_backs_off(self):
+        limits = AdaptiveConcurrency(8, overload_errors=(TimeoutError,))
+        with self.assertRaises(TimeoutError):
+            with limits.slot("http://a/") as slot:
+                slot.record_status(200)
+                raise TimeoutError("stalled")
+        with self.assertRaises(ValueError):
+            with limits.slot("http://a/"):
+                raise ValueError("not a load signal")
+        self.assertEqual(limits.limits(), {"a": 4})
+
+    def test_disabled_keeps_limit_fixed(self):
+        limits = AdaptiveConcurrency(4)
+        limits.enabled = False
+        for _ in range(3):
+            with limits.slot("http://a/") as slot:
+                slot.record_status(429)
+        self.assertEqual(limits.limits(), {"a": 4})
+
+
+class TestWorkerBudget(unittest.TestCase):
+    def test_caps_slots_across_hosts(self):
+        limits = AdaptiveConcurrency(4)
+        limits.budget = WorkerBudget(2)
+        a, b = limits.limiter("http://a/"), limits.limiter("http://b/")
+        self.assertTrue(limits.try_acquire(a))
+        self.assertTrue(limits.try_acquire(b))
+        self.assertFalse(limits.try_acquire(b))
+        self.assertEqual(b.in_flight, 1)  # the host slot was handed back
+        self.assertEqual(limits.budget.peak, 2)
+
+    def test_slot_releases_budget(self):
+        limits = AdaptiveConcurrency(4)
+        limits.budget = WorkerBudget(1)
+        with limits.slot("http://a/") as slot:
+            self.assertIsNotNone(slot)
+            self.assertEqual(limits.budget.in_flight, 1)
+        with limits.slot("http://b/") as slot:
+            self.assertIsNotNone(slot)
+        self.assertEqual(limits.budget.in_flight, 0)
+
+    def test_stop_while_waiting_for_budget(self):
+        limits = AdaptiveConcurrency(4)
+        limits.budget = WorkerBudget(1)
+        limits.budget.acquire()
+        with limits.slot("http://a/", should_stop=lambda: True) as slot:
+            self.assertIsNone(slot)
+        self.assertEqual(limits.limiter("http://a/").in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
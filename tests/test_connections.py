@@ -0,0 +1,205 @@
+"""Tests for pooled sessions, connection reuse counters and the DNS cache."""
+import http.server
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from index_ripper.connections import (
+    DnsCache,
+    PoolStats,
+    make_session,
+    session_dns_cache,
+    session_stats,
+)
+from index_ripper.self_test import _LocalHTTPServer
+
+
+class TestPooledSession(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self._tmp.name, "f.txt"), "wb") as file_obj:
+            file_obj.write(b"x" * 100)
+        # SimpleHTTPRequestHandler closes every connection unless it speaks HTTP/1.1
+        keep_alive = patch.object(http.server.SimpleHTTPRequestHandler, "protocol_version", "HTTP/1.1")
+        keep_alive.start()
+        self.addCleanup(keep_alive.stop)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_sequential_requests_reuse_one_connection(self):
+        session = make_session(4)
+        with _LocalHTTPServer(self._tmp.name) as server:
+            for _ in range(5):
+                session.get(f"http://127.0.0.1:{server.port}/f.txt").content
+            session.close()
+        stats = session_stats(session)
+        self.assertEqual((stats.requests, stats.opened, stats.reused), (5, 1, 4))
+
+    def test_undersized_pool_discards_connections(self):
+        session = make_session(1)
+        barrier = threading.Barrier(4)
+
+        def fetch(url):
+            barrier.wait()
+            session.get(url).content
+
+        with _LocalHTTPServer(self._tmp.name) as server:
+            url = f"http://127.0.0.1:{server.port}/f.txt"
+            threads = [threading.Thread(target=fetch, args=(url,)) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=10)
+            session.close()
+        stats = session_stats(session)
+        self.assertEqual(stats.requests, 4)
+        self.assertGreater(stats.opened, 1)
+        self.assertEqual(stats.discarded, stats.opened - 1)
+
+    def test_plain_session_has_no_stats(self):
+        self.assertIsNone(session_stats(requests.Session()))
+
+    def test_stats_difference(self):
+        self.assertEqual(PoolStats(10, 3, 1) - PoolStats(4, 1, 0), PoolStats(6, 2, 1))
+        self.assertIn("67% reused", PoolStats(6, 2, 0).format())
+
+
+class TestDnsCache(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.cache = DnsCache(ttl=60)
+        self.cache._resolve = self._resolve
+
+    def _resolve(self, host, port, *args):
+        self.calls.append(host)
+        if host == "missing.invalid":
+            raise socket.gaierror("not found")
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.1", port))]
+
+    def test_repeated_lookups_hit_cache(self):
+        first = self.cache.getaddrinfo("mirror.example", 443)
+        self.assertEqual(self.cache.getaddrinfo("mirror.example", 443), first)
+        self.cache.getaddrinfo("mirror.example", 80)
+        self.assertEqual(self.calls, ["mirror.example", "mirror.example"])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_entries_expire(self):
+        self.cache.ttl = 0
+        self.cache.getaddrinfo("mirror.example", 443)
+        self.cache.getaddrinfo("mirror.example", 443)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_failures_not_cached(self):
+        for _ in range(2):
+            with self.assertRaises(socket.gaierror):
+                self.cache.getaddrinfo("missing.invalid", 443)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_ip_literals_are_not_looked_up(self):
+        self.assertEqual(self.cache.addresses("127.0.0.1", 80), [])
+        self.assertEqual(self.cache.addresses("[::1]", 80), [])
+        self.assertEqual(self.cache.addresses("missing.invalid", 80), [])
+        self.assertEqual(self.cache.addresses("mirror.example", 80), ["10.0.0.1"])
+        self.assertEqual(self.calls, ["missing.invalid", "mirror.example"])
+
+    def test_demoted_address_is_tried_last(self):
+        self.cache._resolve = lambda host, port, *args: [
+            (socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("2001:db8::1", port, 0, 0)),
+            (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.1", port)),
+        ]
+        self.assertEqual(self.cache.addresses("mirror.example", 80), ["2001:db8::1", "10.0.0.1"])
+        self.cache.demote("mirror.example", "2001:db8::1")
+        self.assertEqual(self.cache.addresses("mirror.example", 80), ["10.0.0.1", "2001:db8::1"])
+        self.assertEqual(self.cache.misses, 1)
+
+
+class TestSessionDnsCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self._tmp.name, "f.txt"), "wb") as file_obj:
+            file_obj.write(b"x" * 100)
+        self.hosts = []
+        original = http.server.SimpleHTTPRequestHandler.do_GET
+
+        def do_get(handler):
+            self.hosts.append(handler.headers["Host"])
+            return original(handler)
+
+        for patcher in (
+            patch.object(http.server.SimpleHTTPRequestHandler, "protocol_version", "HTTP/1.1"),
+            patch.object(http.server.SimpleHTTPRequestHandler, "do_GET", do_get),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_session_resolves_through_its_cache_only(self):
+        calls = []
+        cache = DnsCache(ttl=60)
+
+        def resolve(host, port, *args):
+            calls.append(host)
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", port))]
+
+        cache._resolve = resolve
+        original = socket.getaddrinfo
+        session = make_session(2, dns_cache=cache)
+        with _LocalHTTPServer(self._tmp.name) as server:
+            for _ in range(3):
+                response = session.get(f"http://mirror.test:{server.port}/f.txt")
+                self.assertEqual(response.content, b"x" * 100)
+            session.close()
+        self.assertIs(socket.getaddrinfo, original)
+        self.assertIs(session_dns_cache(session), cache)
+        self.assertEqual(calls, ["mirror.test"])
+        self.assertEqual((cache.misses, cache.hits), (1, 2))
+        self.assertEqual(self.hosts, [f"mirror.test:{server.port}"] * 3)
+        stats = session_stats(session)
+        self.assertEqual((stats.requests, stats.opened), (3, 1))
+
+    def test_session_without_cache(self):
+        session = make_session(2)
+        self.assertIsNone(session_dns_cache(session))
+        with _LocalHTTPServer(self._tmp.name) as server:
+            session.get(f"http://127.0.0.1:{server.port}/f.txt").content
+            session.close()
+        self.assertEqual(self.hosts, [f"127.0.0.1:{server.port}"])
+
+    def test_unreachable_first_address_falls_back_to_next(self):
+        cache = DnsCache(ttl=60)
+        # Nothing listens on IPv6 loopback: the server is bound to 127.0.0.1 only
+        cache._resolve = lambda host, port, *args: [
+            (socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("::1", port, 0, 0)),
+            (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", port)),
+        ]
+        session = make_session(2, retries=0, dns_cache=cache)
+        with _LocalHTTPServer(self._tmp.name) as server:
+            for _ in range(2):
+                response = session.get(f"http://dual.test:{server.port}/f.txt")
+                self.assertEqual(response.content, b"x" * 100)
+            session.close()
+        self.assertEqual(self.hosts, [f"dual.test:{server.port}"] * 2)
+        self.assertEqual(cache.addresses("dual.test", server.port), ["127.0.0.1", "::1"])
+
+    def test_all_addresses_unreachable(self):
+        cache = DnsCache(ttl=60)
+        cache._resolve = lambda host, port, *args: [
+            (socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("::1", port, 0, 0)),
+        ]
+        session = make_session(2, retries=0, dns_cache=cache)
+        with _LocalHTTPServer(self._tmp.name) as server:
+            with self.assertRaises(requests.ConnectionError):
+                session.get(f"http://dual.test:{server.port}/f.txt")
+            session.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,286 @@
+"""Tests for the concurrent directory crawler."""
+import threading
+import time
+import unittest
+
+from index_ripper.benchmark import measure_seen_set, run_crawl_benchmark
+from index_ripper.crawler import CrawlFrontier, CrawlPriority, DirectoryCrawler, SeenSet
+
+
+def _tree_fetcher(tree, delay=0.0):
+    """Build a fetch_listing callable over a {dir_url: [child names]} mapping."""
+    calls = []
+    calls_lock = threading.Lock()
+
+    def fetch(url):
+        with calls_lock:
+            calls.append(url)
+        if delay:
+            time.sleep(delay)
+        entries = []
+        for name in tree.get(url, []):
+            child = name if name.startswith("http") else url + name
+            entries.append({"url": child, "is_directory": name.endswith("/"), "path": child})
+        return entries
+
+    return fetch, calls
+
+
+class TestSeenSet(unittest.TestCase):
+    def test_add_and_contains(self):
+        for exact in (False, True):
+            seen = SeenSet(exact=exact)
+            self.assertTrue(seen.add("http://h/a/"))
+            self.assertFalse(seen.add("http://h/a/"))
+            seen.update(["http://h/b/", "http://h/c/"])
+            self.assertIn("http://h/b/", seen)
+            self.assertNotIn("http://h/d/", seen)
+            self.assertEqual(len(seen), 3)
+
+    def test_hashed_keys_are_smaller_than_urls(self):
+        self.assertLess(measure_seen_set(5000), measure_seen_set(5000, exact=True))
+
+
+class TestCrawlFrontier(unittest.TestCase):
+    def test_add_dedupes(self):
+        frontier = CrawlFrontier()
+        self.assertTrue(frontier.add("http://h/a/"))
+        self.assertFalse(frontier.add("http://h/a/"))
+        self.assertEqual(frontier.pending, 1)
+
+    def test_get_returns_none_when_drained(self):
+        frontier = CrawlFrontier()
+        frontier.add("http://h/")
+        self.assertEqual(frontier.get(), ("http://h/", 0))
+        frontier.task_done()
+        self.assertIsNone(frontier.get())
+
+    def test_try_get_does_not_block(self):
+        frontier = CrawlFrontier()
+        self.assertIsNone(frontier.try_get())
+        self.assertTrue(frontier.finished)
+        frontier.add("http://h/")
+        self.assertEqual(frontier.try_get(), ("http://h/", 0))
+        self.assertIsNone(frontier.try_get())
+        self.assertFalse(frontier.finished)  # still in flight
+        frontier.task_done()
+        self.assertTrue(frontier.finished)
+
+    def test_close_releases_waiters(self):
+        frontier = CrawlFrontier()
+        frontier.add("http://h/")
+        frontier.get()  # in flight, so other getters block
+        result = []
+        waiter = threading.Thread(target=lambda: result.append(frontier.get()))
+        waiter.start()
+        frontier.close()
+        waiter.join(timeout=2)
+        self.assertFalse(waiter.is_alive())
+        self.assertEqual(result, [None])
+
+
+    def _drain(self, frontier):
+        order = []
+        while (item := frontier.try_get()) is not None:
+            order.append(item[0])
+        return order
+
+    def test_shallow_levels_first(self):
+        frontier = CrawlFrontier()
+        frontier.add("http://h/a/b/", 2)
+        frontier.add("http://h/c/", 1)
+        frontier.add("http://h/d/", 1)
+        self.assertEqual(self._drain(frontier), ["http://h/c/", "http://h/d/", "http://h/a/b/"])
+
+    def test_fifo_and_deep_first_orders(self):
+        fifo = CrawlFrontier(CrawlPriority(depth_weight=0))
+        deep = CrawlFrontier(CrawlPriority(depth_weight=-1))
+        for frontier in (fifo, deep):
+            frontier.add("http://h/c/", 1)
+            frontier.add("http://h/a/b/", 2)
+        self.assertEqual(self._drain(fifo), ["http://h/c/", "http://h/a/b/"])
+        self.assertEqual(self._drain(deep), ["http://h/a/b/", "http://h/c/"])
+
+    def test_focus_reorders_queued_directories(self):
+        frontier = CrawlFrontier()
+        frontier.add("http://h/a/", 1)
+        frontier.add("http://h/b/x/y/", 3)
+        frontier.add("http://h/c/isos/", 2)
+        frontier.focus(url="http://h/b/")
+        self.assertEqual(frontier.try_get(), ("http://h/b/x/y/", 3))
+        frontier.focus(term="ISO")
+        self.assertEqual(frontier.try_get(), ("http://h/c/isos/", 2))
+
+    def test_deferred_url_returns_when_due(self):
+        frontier = CrawlFrontier()
+        frontier.add("http://h/", 0)
+        self.assertEqual(frontier.get(), ("http://h/", 0))
+        frontier.defer("http://h/", 0, 0.1)
+        frontier.task_done()
+        self.assertIsNone(frontier.try_get())
+        self.assertFalse(frontier.finished)
+        self.assertGreater(frontier.next_due(), 0)
+        started = time.monotonic()
+        self.assertEqual(frontier.get(), ("http://h/", 0))
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+
+    def test_get_returns_on_stop_while_waiting_for_retry(self):
+        frontier = CrawlFrontier()
+        frontier.defer("http://h/", 0, 60)
+        started = time.monotonic()
+        self.assertIsNone(frontier.get(should_stop=lambda: time.monotonic() - started > 0.1))
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_hot_patterns_are_boosted(self):
+        frontier = CrawlFrontier(CrawlPriority(hot_patterns=("*/releases/*",)))
+        frontier.add("http://h/docs/", 1)
+        frontier.add("http://h/pub/releases/v1/", 3)
+        self.assertEqual(frontier.try_get()[0], "http://h/pub/releases/v1/")
+
+
+class TestDirectoryCrawler(unittest.TestCase):
+    TREE = {
+        "http://h/": ["a/", "b/", "root.txt"],
+        "http://h/a/": ["a1.txt", "deep/"],
+        "http://h/a/deep/": ["d.bin"],
+        "http://h/b/": ["b1.txt", "http://h/a/"],
+    }
+
+    def _crawl(self, **kwargs):
+        fetch, calls = _tree_fetcher(self.TREE, kwargs.pop("delay", 0.0))
+        found = []
+        lock = threading.Lock()
+
+        def on_listing(_url, entries):
+            with lock:
+                found.extend(e["url"] for e in entries)
+
+        crawler = DirectoryCrawler(fetch, on_listing=on_listing, **kwargs)
+        crawler.crawl("http://h/")
+        return set(found), calls
+
+    def test_finds_every_entry(self):
+        found, calls = self._crawl(workers=4)
+        self.assertEqual(
+            found,
+            {
+                "http://h/a/", "http://h/b/", "http://h/root.txt", "http://h/a/a1.txt",
+                "http://h/a/deep/", "http://h/a/deep/d.bin", "http://h/b/b1.txt",
+            },
+        )
+        self.assertEqual(len(calls), len(set(calls)))
+
+    def test_capacity_wait_holds_back_fetches(self):
+        open_ = threading.Event()
+        fetch, calls = _tree_fetcher(self.TREE)
+        crawler = DirectoryCrawler(fetch, workers=2, wait_for_capacity=lambda: open_.wait(5))
+        thread = threading.Thread(target=crawler.crawl, args=("http://h/",))
+        thread.start()
+        time.sleep(0.1)
+        self.assertEqual(calls, [])
+        open_.set()
+        thread.join(timeout=5)
+        self.assertEqual(len(calls), 4)
+
+    def test_failed_listing_is_retried_after_delay(self):
+        fetch, calls = _tree_fetcher(self.TREE)
+        failures = {"http://h/a/": 2}
+        listed = []
+
+        def retry_after(url):
+            if failures.get(url):
+                failures[url] -= 1
+                return 0.01
+            return None
+
+        crawler = DirectoryCrawler(
+            fetch, workers=2, retry_after=retry_after, on_listed=listed.append
+        )
+        crawler.crawl("http://h/")
+        self.assertEqual(calls.count("http://h/a/"), 3)
+        self.assertEqual(listed.count("http://h/a/"), 1)
+        self.assertIn("http://h/a/deep/", calls)
+        self.assertEqual(crawler.listings_fetched, 4)
+        self.assertEqual(crawler.entries_found, 7)  # a1.txt counted once
+
+    def test_given_up_listing_is_not_marked_listed(self):
+        fetch, calls = _tree_fetcher(self.TREE)
+        listed, failed = [], []
+        crawler = DirectoryCrawler(
+            fetch,
+            workers=2,
+            retry_after=lambda url: None,
+            gave_up=lambda url: url == "http://h/b/",
+            on_listed=listed.append,
+            on_failed=failed.append,
+        )
+        crawler.crawl("http://h/")
+        self.assertEqual(failed, ["http://h/b/"])
+        self.assertNotIn("http://h/b/", listed)
+        self.assertEqual(crawler.listings_fetched, 3)
+
+    def test_crawl_benchmark_stops_at_entry_budget(self):
+        result = run_crawl_benchmark(entries=2000, workers=2)
+        self.assertGreaterEqual(result.entries, 2000)
+        self.assertGreater(result.peak_bytes, 0)
+
+    def test_single_worker_fetches_shallow_levels_first(self):
+        _found, calls = self._crawl(workers=1)
+        self.assertEqual(calls, ["http://h/", "http://h/a/", "http://h/b/", "http://h/a/deep/"])
+
+    def test_estimated_remaining_uses_entries_per_listing(self):
+        crawler = DirectoryCrawler(lambda url: [])
+        crawler.listings_fetched = 2
+        crawler.entries_found = 10
+        for i in range(3):
+            crawler.frontier.add(f"http://h/{i}/")
+        self.assertEqual(crawler.estimated_remaining(), 15)
+
+    def test_large_listing_emitted_in_batches(self):
+        tree = {"http://h/": [f"f{i}.txt" for i in range(10)]}
+        fetch, _calls = _tree_fetcher(tree)
+        batches = []
+        crawler = DirectoryCrawler(
+            fetch, workers=1, batch_size=4, on_listing=lambda url, e: batches.append(len(e))
+        )
+        crawler.crawl("http://h/")
+        self.assertEqual(batches, [4, 4, 2])
+        self.assertEqual(crawler.entries_found, 10)
+
+    def test_listings_fetched_concurrently(self):
+        tree = {"http://h/": [f"d{i}/" for i in range(8)]}
+        fetch, _calls = _tree_fetcher(tree, delay=0.1)
+        crawler = DirectoryCrawler(fetch, workers=8)
+        started = time.monotonic()
+        crawler.crawl("http://h/")
+        # 1 root + 8 children in parallel: ~0.2s, far below 0.9s serial
+        self.assertLess(time.monotonic() - started, 0.6)
+
+    def test_stop_aborts_crawl(self):
+        stop = threading.Event()
+        fetch, calls = _tree_fetcher(self.TREE)
+
+        def stopping_fetch(url):
+            stop.set()
+            return fetch(url)
+
+        crawler = DirectoryCrawler(stopping_fetch, workers=2, should_stop=stop.is_set)
+        crawler.crawl("http://h/")
+        self.assertEqual(calls, ["http://h/"])
+
+    def test_pause_blocks_until_resumed(self):
+        pause = threading.Event()
+        fetch, calls = _tree_fetcher(self.TREE)
+        crawler = DirectoryCrawler(fetch, workers=2, pause_event=pause)
+        thread = threading.Thread(target=crawler.crawl, args=("http://h/",))
+        thread.start()
+        time.sleep(0.3)
+        self.assertEqual(calls, [])
+        pause.set()
+        thread.join(timeout=2)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(calls), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Tests for the buffered disk-writer stage of downloads."""
+import os
+import tempfile
+import threading
+import unittest
+
+from index_ripper.disk_writer import DiskWriter, StageStats, preallocate
+
+
+class _SlowFile:
+    """File-like object whose writes wait until ``gate`` is set."""
+
+    def __init__(self, fail=False):
+        self.gate = threading.Event()
+        self.data = bytearray()
+        self.position = 0
+        self.fail = fail
+
+    def tell(self):
+        return self.position
+
+    def seek(self, position):
+        self.position = position
+
+    def write(self, data):
+        self.gate.wait()
+        if self.fail:
+            raise OSError(28, "No space left on device")
+        end = self.position + len(data)
+        self.data[len(self.data):end] = bytes(max(0, end - len(self.data)))
+        self.data[self.position:end] = data
+        self.position = end
+
+
+class TestDiskWriter(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "f.part")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_chunks_are_gathered_into_large_writes(self):
+        with open(self.path, "wb") as file_handle:
+            with DiskWriter(file_handle, write_size=4096) as writer:
+                for i in range(10):
+                    writer.write(bytes([i]) * 1000)
+        with open(self.path, "rb") as file_obj:
+            self.assertEqual(file_obj.read(), b"".join(bytes([i]) * 1000 for i in range(10)))
+        self.assertEqual((writer.stats.bytes, writer.stats.writes), (10000, 2))
+        self.assertEqual(writer.written_to, 10000)
+
+    def test_seek_writes_at_positions(self):
+        with open(self.path, "wb") as file_handle:
+            preallocate(file_handle, 10)
+            with DiskWriter(file_handle) as writer:
+                writer.seek(6)
+                writer.write(b"WXYZ")
+                writer.seek(0)
+                writer.write(b"ab")
+        with open(self.path, "rb") as file_obj:
+            self.assertEqual(file_obj.read(), b"ab\0\0\0\0WXYZ")
+
+    def test_unwritten_ranges_until_the_disk_catches_up(self):
+        slow = _SlowFile()
+        writer = DiskWriter(slow, write_size=4)
+        writer.write(b"abcdef")
+        writer.seek(100)
+        writer.write(b"xy")
+        self.assertEqual(writer.unwritten(), [[0, 5], [100, 101]])
+        slow.gate.set()
+        writer.close()
+        self.assertEqual(writer.unwritten(), [])
+
+    def test_full_queue_stalls_network_stage(self):
+        slow = _SlowFile()
+        writer = DiskWriter(slow, write_size=1, queue_blocks=1)
+        threading.Timer(0.3, slow.gate.set).start()
+        for _ in range(4):
+            writer.write(b"x")
+        writer.close()
+        self.assertGreater(writer.stats.network_wait, 0.2)
+        self.assertEqual(writer.stats.bottleneck, "disk")
+
+    def test_write_error_reaches_network_stage(self):
+        slow = _SlowFile(fail=True)
+        slow.gate.set()
+        writer = DiskWriter(slow, write_size=1)
+        with self.assertRaises(OSError):
+            for _ in range(100):
+                writer.write(b"x")
+            writer.close()
+        self.assertTrue(writer.unwritten())
+
+    def test_preallocate_gives_full_length(self):
+        with open(self.path, "wb") as file_handle:
+            preallocate(file_handle, 12345)
+        self.assertEqual(os.path.getsize(self.path), 12345)
+
+    def test_stats_add_and_format(self):
+        total = StageStats()
+        total.add(StageStats(bytes=2 * 1024 * 1024, writes=2, network_wait=0.5, disk_wait=3.0))
+        total.add(StageStats(bytes=1024 * 1024, writes=1, write_time=0.2))
+        self.assertEqual(
+            total.format(),
+            "3.0 MB in 3 writes (0.2s writing); network waited 0.5s for the disk, "
+            "disk waited 3.0s for the network (network-bound)",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,6 +11,9 @@ class TestUIDownloadsSemantics(unittest.TestCase):
         self.assertEqual(downloads.download_status_state("Failed"), "error")
         self.assertEqual(downloads.download_status_state("Canceling..."), "warning")
         self.assertEqual(downloads.download_status_state("something else"), "queued")
+        self.assertEqual(downloads.download_status_state("Retrying 1/5 (HTTP 503)"), "warning")
+        self.assertEqual(downloads.download_status_state("Completed after 2 retries"), "success")
+        self.assertEqual(downloads.download_status_state("Failed after 5 retries (ReadTimeout)"), "error")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,79 @@
+"""Tests for concurrent multi-root scan jobs against a local HTTP server."""
+import os
+import tempfile
+import threading
+import unittest
+
+import requests
+
+from index_ripper.jobs import ScanJobManager
+from index_ripper.self_test import _LocalHTTPServer
+
+
+class ParentUI:
+    USER_AGENT = "TestAgent/1.0"
+
+    def __init__(self):
+        self.timeout = (10, 30)
+        self.session = requests.Session()
+        self.log_messages = []
+        self.finished = []
+        self._lock = threading.Lock()
+
+    def log_message(self, message):
+        with self._lock:
+            self.log_messages.append(message)
+
+    def on_job_finished(self, job):
+        with self._lock:
+            self.finished.append(job.url)
+
+
+class TestScanJobManager(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        for mirror, size in (("m1", 3), ("m2", 5), ("m3", 7)):
+            os.makedirs(os.path.join(self._tmp.name, mirror, "pub"))
+            for rel in ("readme.txt", "pub/data.bin"):
+                with open(os.path.join(self._tmp.name, mirror, rel), "wb") as file_obj:
+                    file_obj.write(b"x" * size)
+        self.ui = ParentUI()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_roots_scanned_into_separate_namespaces(self):
+        manager = ScanJobManager(self.ui, max_workers=2, max_concurrent_jobs=3)
+        with _LocalHTTPServer(self._tmp.name) as server:
+            base = f"http://127.0.0.1:{server.port}"
+            jobs = [manager.add(f"{base}/{mirror}/") for mirror in ("m1", "m2", "m3")]
+            self.assertTrue(manager.wait(timeout=30))
+        manager.close()
+
+        for job, mirror in zip(jobs, ("m1", "m2", "m3")):
+            self.assertEqual(job.status, "done")
+            self.assertEqual(
+                set(job.results.files_dict), {f"{mirror}/readme.txt", f"{mirror}/pub/data.bin"}
+            )
+            self.assertIs(job.results.session, self.ui.session)
+            self.assertIs(job.backend.scan_limits, manager.scan_limits)
+        self.assertEqual(sorted(self.ui.finished), sorted(job.url for job in jobs))
+        self.assertLessEqual(manager.budget.peak, 2)
+        self.assertEqual(manager.budget.in_flight, 0)
+        self.assertTrue(any(f"[{jobs[0].url}]" in line for line in self.ui.log_messages))
+
+    def test_stop_drops_queued_jobs(self):
+        manager = ScanJobManager(self.ui, max_concurrent_jobs=1)
+        manager.pause()
+        with _LocalHTTPServer(self._tmp.name) as server:
+            base = f"http://127.0.0.1:{server.port}"
+            jobs = [manager.add(f"{base}/{mirror}/") for mirror in ("m1", "m2")]
+            manager.stop()
+            self.assertTrue(manager.wait(timeout=30))
+        manager.close()
+        self.assertEqual(jobs[1].status, "stopped")
+        self.assertEqual(jobs[1].results.files_dict, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""Tests for lazy, expand-driven scanning."""
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from index_ripper.backend import Backend
+from tests.test_backend import MockUIManager, _listing_response
+
+PAGES = {
+    "http://example.com/pub/": ["../", "a/", "b/", "top.txt"],
+    "http://example.com/pub/a/": ["../", "one.iso", "deep/"],
+    "http://example.com/pub/a/deep/": ["../", "x.bin"],
+    "http://example.com/pub/b/": ["../", "two.iso"],
+}
+
+
+class TestLazyScan(unittest.TestCase):
+    def setUp(self):
+        self.ui = MockUIManager()
+        self.ui.listed = []
+        self.ui.on_directory_listed = lambda url, count: self.ui.listed.append((url, count))
+        self.backend = Backend(self.ui)
+        self.backend.lazy_scan = True
+        self.fetched = []
+        self.fetched_lock = threading.Lock()
+
+        def fake_get(url, **kwargs):
+            with self.fetched_lock:
+                self.fetched.append(url)
+            return _listing_response(PAGES.get(url, []))
+
+        head = MagicMock()
+        head.headers = {"content-length": "2048"}
+        self.ui.session.get = MagicMock(side_effect=fake_get)
+        self.ui.session.head = MagicMock(return_value=head)
+
+    def tearDown(self):
+        self.backend.close_lazy_scan()
+
+    def _wait_fetched(self, url):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            with self.fetched_lock:
+                if url in self.fetched:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def test_scan_lists_only_the_start_page(self):
+        self.backend.lazy_prefetch = 0
+        self.backend.scan_website("http://example.com/pub/")
+        self.assertEqual(self.fetched, ["http://example.com/pub/"])
+        self.assertEqual(set(self.ui.files_dict), {"pub/top.txt"})
+        self.assertEqual(set(self.ui.folders), {"/pub/a", "/pub/b"})
+
+    def test_expand_lists_folder_once(self):
+        self.backend.lazy_prefetch = 0
+        self.backend.scan_website("http://example.com/pub/")
+        future = self.backend.expand_directory("http://example.com/pub/a/")
+        self.assertEqual(future.result(timeout=5), 2)
+        self.assertIn("pub/a/one.iso", self.ui.files_dict)
+        self.assertIn("/pub/a/deep", self.ui.folders)
+        self.assertNotIn("pub/a/deep/x.bin", self.ui.files_dict)
+        self.assertIsNone(self.backend.expand_directory("http://example.com/pub/a/"))
+        self.assertEqual(self.fetched.count("http://example.com/pub/a/"), 1)
+        self.assertIn(("http://example.com/pub/a/", 2), self.ui.listed)
+
+    def test_subfolders_are_prefetched_without_probing(self):
+        self.backend.lazy_prefetch = 4
+        self.backend.scan_website("http://example.com/pub/")
+        self.assertTrue(self._wait_fetched("http://example.com/pub/b/"))
+        deadline = time.monotonic() + 5
+        while not self.backend.lazy_scanner.cached("http://example.com/pub/b/"):
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        self.assertNotIn("pub/b/two.iso", self.ui.files_dict)  # cached, not emitted
+
+        self.backend.expand_directory("http://example.com/pub/b/").result(timeout=5)
+        self.assertIn("pub/b/two.iso", self.ui.files_dict)
+        self.assertEqual(self.fetched.count("http://example.com/pub/b/"), 1)
+
+    def test_expand_without_lazy_scan(self):
+        self.backend.lazy_scan = False
+        self.backend.scan_website("http://example.com/pub/")
+        self.assertIsNone(self.backend.expand_directory("http://example.com/pub/a/"))
+
+
+if __name__ == "__main__":
+    unittest.main()
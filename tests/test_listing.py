@@ -0,0 +1,248 @@
+"""Tests for listing page parsing and metadata extraction."""
+import unittest
+
+from index_ripper.benchmark import run_parse_benchmark, synthetic_listing
+from index_ripper.listing import (
+    JsonListingParser,
+    ListingParser,
+    StructuredListingError,
+    XmlListingParser,
+    available_backends,
+    guess_file_type,
+    listing_format,
+    make_listing_parser,
+    parse_http_date,
+    parse_listing,
+    parse_size,
+)
+
+APACHE_TABLE = """<html><body><h1>Index of /pub</h1>
+<table>
+<tr><th valign="top"><img src="/icons/blank.gif" alt="[ICO]"></th><th><a href="?C=N;O=D">Name</a></th><th><a href="?C=M;O=A">Last modified</a></th><th><a href="?C=S;O=A">Size</a></th></tr>
+<tr><th colspan="5"><hr></th></tr>
+<tr><td valign="top"><img src="/icons/back.gif" alt="[PARENTDIR]"></td><td><a href="/">Parent Directory</a></td><td>&nbsp;</td><td align="right">  - </td></tr>
+<tr><td valign="top"><img src="/icons/folder.gif" alt="[DIR]"></td><td><a href="docs/">docs/</a></td><td align="right">2024-03-01 09:15  </td><td align="right">  - </td></tr>
+<tr><td valign="top"><img src="/icons/unknown.gif" alt="[   ]"></td><td><a href="disk.iso">disk.iso</a></td><td align="right">2024-03-02 10:20  </td><td align="right">1.5G</td></tr>
+</table></body></html>"""
+
+APACHE_PRE = """<html><body><h1>Index of /pub</h1>
+<pre><img src="/icons/blank.gif" alt="Icon "> <a href="?C=N;O=D">Name</a>                    <a href="?C=M;O=A">Last modified</a>      <a href="?C=S;O=A">Size</a><hr><img src="/icons/back.gif" alt="[PARENTDIR]"> <a href="/">Parent Directory</a>                             -
+<img src="/icons/text.gif" alt="[TXT]"> <a href="notes.txt">notes.txt</a>               14-Feb-2023 08:01  2.0K
+<hr></pre></body></html>"""
+
+NGINX = """<html><head><title>Index of /pub/</title></head><body><h1>Index of /pub/</h1><hr><pre><a href="../">../</a>
+<a href="sub/">sub/</a>                                               05-Jan-2024 12:30                   -
+<a href="file%20one.tar.gz">file one.tar.gz</a>                                    05-Jan-2024 12:31             1048576
+</pre><hr></body></html>"""
+
+LIGHTTPD = """<table summary="Directory Listing"><thead><tr><th class="n">Name</th><th class="m">Last Modified</th><th class="s">Size</th><th class="t">Type</th></tr></thead><tbody>
+<tr class="d"><td class="n"><a href="../">Parent Directory</a>/</td><td class="m">&nbsp;</td><td class="s">- &nbsp;</td><td class="t">Directory</td></tr>
+<tr><td class="n"><a href="readme.txt">readme.txt</a></td><td class="m">2023-Nov-07 21:04:55</td><td class="s">4.0K</td><td class="t">text/plain</td></tr>
+</tbody></table>"""
+
+CADDY = """<table><tbody>
+<tr class="file"><td></td><td><a href="./photo.jpg"><span class="name">photo.jpg</span></a></td><td class="size" data-size="52341"><div class="sizebar">51 KiB</div></td><td class="timestamp hideable"><time datetime="2024-06-30T18:00:05Z">06/30/2024 06:00:05 PM +00:00</time></td></tr>
+<tr class="file"><td></td><td><a href="./album/"><span class="name">album</span></a></td><td data-order="-1">&mdash;</td><td class="timestamp hideable"><time datetime="2024-06-30T17:00:00Z">x</time></td></tr>
+</tbody></table>"""
+
+IIS = """<html><body><H1>example.com - /pub/</H1><hr><pre><A HREF="/">[To Parent Directory]</A><br><br>  3/5/2024  3:14 PM        &lt;dir&gt; <A HREF="/pub/tools/">tools</A><br>Tuesday, March 5, 2024  3:15 PM        12345 <A HREF="/pub/setup.exe">setup.exe</A><br></pre><hr></body></html>"""
+
+PYTHON_HTTP_SERVER = """<!DOCTYPE HTML><html><body><h1>Directory listing for /</h1><hr><ul>
+<li><a href="a.txt">a.txt</a></li>
+<li><a href="sub/">sub/</a></li>
+</ul><hr></body></html>"""
+
+NGINX_JSON = """[
+{ "name":"sub", "type":"directory", "mtime":"Fri, 05 Jan 2024 12:30:00 GMT" },
+{ "name":"file one.tar.gz", "type":"file", "mtime":"Fri, 05 Jan 2024 12:31:07 GMT", "size":1048576 }
+]"""
+
+NGINX_XML = """<?xml version="1.0"?>
+<list>
+<directory mtime="2024-01-05T12:30:00Z">sub</directory>
+<file mtime="2024-01-05T12:31:07Z" size="1048576">file one.tar.gz</file>
+</list>"""
+
+CADDY_JSON = """[{"name":"album/","size":4096,"url":"./album/","mod_time":"2024-06-30T19:00:00.123456789+01:00","mode":2147484141,"is_dir":true,"is_symlink":false},
+{"name":"photo.jpg","size":52341,"url":"./photo.jpg","mod_time":"2024-06-30T18:00:05Z","mode":420,"is_dir":false,"is_symlink":false}]"""
+
+
+def _by_href(text):
+    return {entry.href: entry for entry in parse_listing(text)}
+
+
+class TestParseListingFormats(unittest.TestCase):
+    def test_apache_table(self):
+        entries = _by_href(APACHE_TABLE)
+        self.assertEqual(entries["disk.iso"].size, int(1.5 * 1024**3))
+        self.assertEqual(entries["disk.iso"].modified, "2024-03-02 10:20")
+        self.assertTrue(entries["docs/"].directory_hint)
+        self.assertIsNone(entries["docs/"].size)
+        self.assertIn("?C=N;O=D", entries)
+
+    def test_apache_pre(self):
+        entries = _by_href(APACHE_PRE)
+        self.assertEqual(entries["notes.txt"].size, 2048)
+        self.assertEqual(entries["notes.txt"].modified, "2023-02-14 08:01")
+
+    def test_nginx(self):
+        entries = _by_href(NGINX)
+        self.assertEqual(entries["file%20one.tar.gz"].size, 1048576)
+        self.assertEqual(entries["file%20one.tar.gz"].modified, "2024-01-05 12:31")
+        self.assertTrue(entries["sub/"].directory_hint)
+
+    def test_lighttpd(self):
+        entries = _by_href(LIGHTTPD)
+        self.assertEqual(entries["readme.txt"].size, 4096)
+        self.assertEqual(entries["readme.txt"].modified, "2023-11-07 21:04:55")
+        self.assertEqual(entries["readme.txt"].file_type, "text/plain")
+        self.assertTrue(entries["../"].directory_hint)
+
+    def test_caddy(self):
+        entries = _by_href(CADDY)
+        self.assertEqual(entries["./photo.jpg"].size, 52341)
+        self.assertEqual(entries["./photo.jpg"].modified, "2024-06-30 18:00:05")
+        self.assertTrue(entries["./album/"].directory_hint)
+
+    def test_iis(self):
+        entries = _by_href(IIS)
+        self.assertEqual(entries["/pub/setup.exe"].size, 12345)
+        self.assertEqual(entries["/pub/setup.exe"].modified, "2024-03-05 15:15")
+        self.assertTrue(entries["/pub/tools/"].directory_hint)
+        self.assertEqual(entries["/pub/tools/"].modified, "2024-03-05 15:14")
+
+    def test_python_http_server_has_no_metadata(self):
+        entries = _by_href(PYTHON_HTTP_SERVER)
+        self.assertEqual(set(entries), {"a.txt", "sub/"})
+        self.assertIsNone(entries["a.txt"].size)
+        self.assertEqual(entries["a.txt"].modified, "")
+
+    def test_incremental_feed_matches_whole_page(self):
+        parser = ListingParser()
+        for i in range(0, len(NGINX), 7):
+            parser.feed(NGINX[i:i + 7])
+        parser.close()
+        self.assertEqual(parser.entries, parse_listing(NGINX))
+
+
+class TestParserBackends(unittest.TestCase):
+    SAMPLES = (APACHE_TABLE, APACHE_PRE, NGINX, LIGHTTPD, CADDY, IIS, PYTHON_HTTP_SERVER)
+
+    def test_backends_agree_on_every_format(self):
+        for sample in self.SAMPLES:
+            expected = parse_listing(sample, "html.parser")
+            for backend in available_backends():
+                with self.subTest(backend=backend, sample=sample[:40]):
+                    self.assertEqual(parse_listing(sample, backend), expected)
+
+    def test_chunked_feed_matches_for_every_backend(self):
+        for backend in available_backends():
+            for chunk in (1, 5, 64):
+                with self.subTest(backend=backend, chunk=chunk):
+                    parser = ListingParser(backend)
+                    for i in range(0, len(IIS), chunk):
+                        parser.feed(IIS[i:i + chunk])
+                    parser.close()
+                    self.assertEqual(parser.entries, parse_listing(IIS, "html.parser"))
+
+    def test_fast_backend_skips_script_and_comments(self):
+        page = (
+            "<script>if (a < b) { x = '<a href=\"bad\">'; }</script>"
+            '<!-- <a href="hidden"> --><ul><li><a href="ok.txt">ok</a></li></ul>'
+        )
+        self.assertEqual([e.href for e in parse_listing(page, "fast")], ["ok.txt"])
+
+    def test_unknown_backend_rejected(self):
+        with self.assertRaises(ValueError):
+            ListingParser("nope")
+
+    def test_benchmark_counts_every_entry(self):
+        results = run_parse_benchmark(sizes=(50,), repeat=1, include_bs4=False)
+        self.assertEqual(len(results), 2 * len(available_backends()))
+        for result in results:
+            expected = 51 if result.flavor == "nginx" else 50  # nginx adds "../"
+            self.assertEqual(result.found, expected)
+
+    def test_synthetic_listing_sizes_parse(self):
+        entries = parse_listing(synthetic_listing(10, "apache"))
+        self.assertTrue(all(entry.size == 1536 for entry in entries))
+
+
+def _parse_structured(content_type, text, chunk_size=None):
+    parser = make_listing_parser(content_type)
+    chunk_size = chunk_size or len(text)
+    for i in range(0, len(text), chunk_size):
+        parser.feed(text[i:i + chunk_size])
+    parser.close()
+    return {entry.href: entry for entry in parser.pop_entries()}
+
+
+class TestStructuredListings(unittest.TestCase):
+    def test_listing_format_by_content_type(self):
+        self.assertEqual(listing_format("application/json; charset=utf-8"), "json")
+        self.assertEqual(listing_format("text/xml"), "xml")
+        self.assertEqual(listing_format("text/html"), "html")
+        self.assertEqual(listing_format(None), "html")
+        self.assertIsInstance(make_listing_parser("application/json"), JsonListingParser)
+        self.assertIsInstance(make_listing_parser("application/xml"), XmlListingParser)
+        self.assertIsInstance(make_listing_parser("text/html", "fast"), ListingParser)
+
+    def test_nginx_json(self):
+        entries = _parse_structured("application/json", NGINX_JSON)
+        self.assertTrue(entries["sub/"].directory_hint)
+        self.assertEqual(entries["sub/"].modified, "2024-01-05 12:30")
+        entry = entries["file%20one.tar.gz"]
+        self.assertEqual((entry.name, entry.size), ("file one.tar.gz", 1048576))
+        self.assertEqual(entry.modified, "2024-01-05 12:31:07")
+
+    def test_nginx_xml_streamed(self):
+        entries = _parse_structured("text/xml", NGINX_XML, chunk_size=7)
+        self.assertTrue(entries["sub/"].directory_hint)
+        self.assertIsNone(entries["sub/"].size)
+        self.assertEqual(entries["file%20one.tar.gz"].size, 1048576)
+        self.assertEqual(entries["file%20one.tar.gz"].modified, "2024-01-05 12:31:07")
+
+    def test_caddy_json(self):
+        entries = _parse_structured("application/json", CADDY_JSON)
+        album = entries["./album/"]
+        self.assertTrue(album.directory_hint)
+        self.assertEqual((album.name, album.size), ("album", None))
+        self.assertEqual(album.modified, "2024-06-30 18:00")
+        self.assertEqual(entries["./photo.jpg"].size, 52341)
+
+    def test_malformed_bodies_raise(self):
+        for content_type, text in (
+            ("application/json", "<html>not json</html>"),
+            ("application/json", '{"error": "forbidden"}'),
+            ("text/xml", "<list><file>a</list>"),
+        ):
+            with self.subTest(text=text), self.assertRaises(StructuredListingError):
+                _parse_structured(content_type, text)
+
+    def test_structured_benchmark_flavors(self):
+        results = run_parse_benchmark(sizes=(50,), flavors=("json", "xml"), repeat=1)
+        self.assertEqual([r.backend for r in results], ["json", "xml"])
+        self.assertTrue(all(r.found == 50 for r in results))
+
+
+class TestListingHelpers(unittest.TestCase):
+    def test_parse_size_units(self):
+        self.assertEqual(parse_size("1234"), 1234)
+        self.assertEqual(parse_size("1.5K"), 1536)
+        self.assertEqual(parse_size("2 MiB"), 2 * 1024**2)
+        self.assertIsNone(parse_size("n/a"))
+
+    def test_parse_http_date(self):
+        self.assertEqual(
+            parse_http_date("Wed, 21 Oct 2015 07:28:00 GMT"), "2015-10-21 07:28"
+        )
+        self.assertEqual(parse_http_date("garbage"), "")
+        self.assertEqual(parse_http_date(None), "")
+
+    def test_guess_file_type(self):
+        self.assertEqual(guess_file_type("a.txt"), "text/plain")
+        self.assertEqual(guess_file_type("README"), "Unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+"""Tests for the listing validator cache."""
+import os
+import tempfile
+import unittest
+
+from index_ripper.listing import ListingEntry
+from index_ripper.listing_cache import ListingCache
+from index_ripper.scan_index import ScanIndex
+
+ENTRIES = [
+    ListingEntry("sub/", "sub/", None, "2024-01-05 12:30", "", True),
+    ListingEntry("a.iso", "a.iso", 1024, "2024-01-05 12:31", "", False),
+]
+
+
+class TestListingCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "data", "scan_index.sqlite3")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_round_trip_through_scan_index(self):
+        index = ScanIndex(self.path)
+        cache = ListingCache(index)
+        cache.store("http://h/pub/", '"abc"', "Wed, 21 Oct 2015 07:28:00 GMT", ENTRIES)
+        cache.save()
+        index.close()
+
+        reloaded = ListingCache(ScanIndex(self.path))
+        self.assertEqual(reloaded.entries("http://h/pub/"), ENTRIES)
+        self.assertEqual(
+            reloaded.request_headers("http://h/pub/"),
+            {"If-None-Match": '"abc"', "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT"},
+        )
+        reloaded.index.close()
+
+    def test_validators_do_not_flush_or_load_entries(self):
+        index = ScanIndex(self.path, flush_every=100)
+        self.addCleanup(index.close)
+        cache = ListingCache(index)
+        cache.store("http://h/pub/", '"abc"', None, ENTRIES)
+        self.assertEqual(cache.request_headers("http://h/pub/"), {})  # still buffered
+        cache.save()
+        cache.store("http://h/other/", '"x"', None, ENTRIES)
+        self.assertEqual(cache.request_headers("http://h/pub/"), {"If-None-Match": '"abc"'})
+        self.assertTrue(index._pages_pending)
+
+    def test_unknown_page_sends_no_validators(self):
+        cache = ListingCache()
+        self.assertEqual(cache.request_headers("http://h/"), {})
+        self.assertIsNone(cache.entries("http://h/"))
+
+    def test_page_without_validators_is_forgotten(self):
+        cache = ListingCache()
+        cache.store("http://h/", 'W/"1"', None, ENTRIES)
+        cache.store("http://h/", None, None, ENTRIES)
+        self.assertEqual(len(cache), 0)
+
+    def test_starting_a_scan_keeps_cached_pages(self):
+        index = ScanIndex(":memory:")
+        cache = ListingCache(index)
+        cache.store("http://h/", '"1"', None, ENTRIES)
+        index.start("http://h/")
+        self.assertEqual(cache.entries("http://h/"), ENTRIES)
+
+    def test_clear(self):
+        cache = ListingCache()
+        cache.store("http://h/", '"1"', None, ENTRIES)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""Tests for per-server listing flavour detection and the line extractors."""
+import unittest
+
+from index_ripper.benchmark import synthetic_listing
+from index_ripper.listing import parse_listing
+from index_ripper.listing_flavors import (
+    MAX_LINE_CHARS,
+    REPLAY_LINES,
+    FlavorParser,
+    FlavorSniffer,
+    detect_flavor,
+)
+from tests.test_listing import APACHE_PRE, APACHE_TABLE, CADDY, LIGHTTPD, NGINX
+
+FLAVOR_PAGES = {"nginx": NGINX, "apache-table": APACHE_TABLE, "apache-pre": APACHE_PRE}
+
+
+def _extract(flavor, page, chunk_size=13, on_fall_back=None):
+    parser = FlavorParser(flavor, "fast", on_fall_back)
+    entries = []
+    for i in range(0, len(page), chunk_size):
+        parser.feed(page[i:i + chunk_size])
+        entries.extend(parser.pop_entries())
+    parser.close()
+    entries.extend(parser.pop_entries())
+    return parser, entries
+
+
+def _generic(page):
+    """Generic parser output without the decoration links the extractors skip."""
+    return [
+        entry for entry in parse_listing(page, "fast")
+        if not entry.href.startswith("?") and entry.name not in ("../", "Parent Directory")
+    ]
+
+
+class TestDetectFlavor(unittest.TestCase):
+    def test_known_layouts(self):
+        for flavor, page in FLAVOR_PAGES.items():
+            with self.subTest(flavor=flavor):
+                self.assertEqual(detect_flavor(None, page), flavor)
+
+    def test_nginx_server_header(self):
+        page = '<html><body><h1>Index of /x/</h1><hr><pre>\n<a href="a">a</a> 05-Jan-2024 12:31 1\n'
+        self.assertIsNone(detect_flavor(None, page))
+        self.assertEqual(detect_flavor("nginx/1.25.3", page), "nginx")
+
+    def test_other_layouts_have_no_flavor(self):
+        for page in (LIGHTTPD, CADDY, "<html>custom</html>"):
+            self.assertIsNone(detect_flavor("Apache/2.4", page))
+
+
+class TestFlavorParser(unittest.TestCase):
+    def test_matches_generic_parser(self):
+        for flavor, page in FLAVOR_PAGES.items():
+            with self.subTest(flavor=flavor):
+                parser, entries = _extract(flavor, page)
+                self.assertFalse(parser.fell_back)
+                self.assertEqual(entries, _generic(page))
+
+    def test_large_synthetic_pages(self):
+        for flavor, layout in (("nginx", "nginx"), ("apache-table", "apache")):
+            page = synthetic_listing(500, layout)
+            parser, entries = _extract(flavor, page, chunk_size=4096)
+            self.assertFalse(parser.fell_back)
+            self.assertEqual(entries, _generic(page))
+
+    def test_truncated_names_taken_from_href(self):
+        page = (
+            '<hr><pre><a href="../">../</a>\n'
+            '<a href="a-very-long-file-name-indeed.tar.gz">a-very-long-file-name-ind..&gt;</a>'
+            "  05-Jan-2024 12:31  10\n</pre>"
+        )
+        _parser, entries = _extract("nginx", page)
+        self.assertEqual(entries[0].name, "a-very-long-file-name-indeed.tar.gz")
+        self.assertEqual(entries[0].size, 10)
+
+    def test_mismatched_page_falls_back_without_duplicates(self):
+        page = NGINX.replace("</pre>", '<a href="extra.txt">extra.txt</a> (see README)\n</pre>')
+        fallbacks = []
+        parser, entries = _extract("nginx", page, on_fall_back=lambda: fallbacks.append(1))
+        self.assertTrue(parser.fell_back)
+        self.assertEqual(fallbacks, [1])
+        hrefs = [entry.href for entry in entries]
+        self.assertEqual(sorted(hrefs), sorted(set(hrefs)))
+        self.assertEqual(set(hrefs) - {"../"}, {entry.href for entry in _generic(page)})
+        self.assertIn("extra.txt", hrefs)
+
+    def test_late_fall_back_replays_only_recent_lines(self):
+        page = synthetic_listing(2000, "nginx").replace(
+            "</pre>", '<a href="extra.txt">extra.txt</a> (see README)\n</pre>'
+        )
+        parser = FlavorParser("nginx", "fast")
+        entries = []
+        for i in range(0, len(page), 4096):
+            parser.feed(page[i:i + 4096])
+            self.assertLessEqual(len(parser._recent), REPLAY_LINES)
+            entries.extend(parser.pop_entries())
+        parser.close()
+        entries.extend(parser.pop_entries())
+        self.assertTrue(parser.fell_back)
+        self.assertLessEqual(len(parser._emitted), REPLAY_LINES + 1)
+        hrefs = [entry.href for entry in entries if entry.href != "../"]
+        self.assertEqual(len(hrefs), len(set(hrefs)))
+        self.assertEqual(set(hrefs), {entry.href for entry in _generic(page)})
+
+    def test_page_without_lines_falls_back(self):
+        row = '<tr><td><a href="f.txt">f.txt</a></td><td>05-Jan-2024 12:31</td><td>1</td></tr>'
+        page = "<table>" + row * (MAX_LINE_CHARS // len(row) + 1) + "</table>"
+        parser, entries = _extract("apache-table", page, chunk_size=4096)
+        self.assertTrue(parser.fell_back)
+        self.assertEqual(parser._tail, "")
+        self.assertEqual(entries, parse_listing(page, "fast"))
+
+    def test_wrong_flavor_falls_back(self):
+        parser, entries = _extract("nginx", LIGHTTPD)
+        self.assertTrue(parser.fell_back)
+        self.assertEqual(entries, parse_listing(LIGHTTPD, "fast"))
+
+
+class TestFlavorSniffer(unittest.TestCase):
+    def test_reports_flavor_once(self):
+        found = []
+        parser = FlavorSniffer("nginx", found.append, "fast")
+        parser.feed(NGINX)
+        parser.close()
+        self.assertEqual(found, ["nginx"])
+        self.assertEqual(parser.pop_entries(), parse_listing(NGINX, "fast"))
+
+    def test_unknown_layout_not_reported(self):
+        found = []
+        parser = FlavorSniffer(None, found.append, "fast")
+        parser.feed(CADDY)
+        parser.close()
+        self.assertEqual(found, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Tests for coalesced download progress and the batch totals."""
+import unittest
+from unittest.mock import patch
+
+from index_ripper.progress import ProgressBoard, ProgressTotals
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestProgressBoard(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        patcher = patch("index_ripper.progress.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.board = ProgressBoard(rate=10)
+
+    def test_updates_are_due_at_most_rate_times_a_second(self):
+        self.board.begin("/a", "a", 0, 1000)
+        due = []
+        for step in range(1, 21):
+            self.clock.now += 0.01
+            due.append(self.board.update("/a", "a", step * 50, 1000))
+        self.assertEqual(due.count(True), 2)
+        self.assertTrue(due[0])
+
+    def test_files_are_throttled_independently(self):
+        self.board.begin("/a", "a", 0, 100)
+        self.board.begin("/b", "b", 0, 100)
+        self.assertTrue(self.board.update("/a", "a", 10))
+        self.assertTrue(self.board.update("/b", "b", 10))
+        self.assertFalse(self.board.update("/a", "a", 20))
+
+    def test_snapshot_holds_only_changed_files(self):
+        self.board.begin("/a", "a", 0, 200)
+        self.board.begin("/b", "b", 0, None)
+        self.board.update("/a", "a", 50)
+        self.assertEqual(self.board.snapshot().files, {"/a": ("a", 25.0), "/b": ("b", None)})
+        self.assertEqual(self.board.snapshot().files, {})
+        self.board.finish("/a", completed=True)
+        self.assertEqual(self.board.snapshot().files, {"/a": ("a", 100.0)})
+
+    def test_totals_give_throughput_and_eta(self):
+        self.board.begin("/a", "a", 0, 3000)
+        self.clock.now += 1.0
+        self.board.update("/a", "a", 1000)
+        totals = self.board.totals()
+        self.assertEqual((totals.done, totals.total, totals.active), (1000, 3000, 1))
+        self.assertAlmostEqual(totals.rate, 1000.0)
+        self.assertAlmostEqual(totals.eta, 2.0)
+
+    def test_resumed_bytes_do_not_count_as_throughput(self):
+        self.board.begin("/a", "a", 900, 1000)
+        self.clock.now += 1.0
+        self.board.update("/a", "a", 950)
+        totals = self.board.totals()
+        self.assertEqual((totals.done, totals.transferred), (950, 50))
+        self.assertAlmostEqual(totals.rate, 50.0)
+
+    def test_new_batch_starts_when_nothing_is_running(self):
+        self.board.begin("/a", "a", 0, 100)
+        self.board.update("/a", "a", 100)
+        self.board.finish("/a", completed=True)
+        self.board.begin("/b", "b", 0, 50)
+        totals = self.board.totals()
+        self.assertEqual((totals.files, totals.total, totals.transferred), (1, 50, 0))
+
+    def test_batch_eta_includes_queued_files(self):
+        self.board.start_batch([("/a", "a", 1000), ("/b", "b", 2000), ("/c", "c", None)])
+        self.assertEqual(self.board.snapshot().files, {})
+        self.board.begin("/a", "a", 0, None)
+        self.clock.now += 1.0
+        self.board.update("/a", "a", 500)
+        totals = self.board.totals()
+        self.assertEqual((totals.total, totals.active, totals.queued, totals.files), (3000, 1, 2, 3))
+        self.assertAlmostEqual(totals.eta, 2500 / 500)
+
+    def test_batch_is_not_reset_between_files(self):
+        self.board.start_batch([("/a", "a", 100), ("/b", "b", 50)])
+        self.board.begin("/a", "a", 0, 100)
+        self.board.update("/a", "a", 100)
+        self.board.finish("/a", completed=True)
+        self.board.begin("/b", "b", 0, 50)
+        totals = self.board.totals()
+        self.assertEqual((totals.files, totals.total, totals.transferred), (2, 150, 100))
+
+    def test_end_batch_drops_files_never_started(self):
+        self.board.start_batch([("/a", "a", 100), ("/b", "b", 50)])
+        self.board.begin("/a", "a", 0, 100)
+        self.board.finish("/a", completed=True)
+        self.board.end_batch()
+        totals = self.board.totals()
+        self.assertEqual((totals.files, totals.total, totals.queued), (1, 100, 0))
+        self.board.begin("/c", "c", 0, 10)
+        self.assertEqual(self.board.totals().files, 1)
+
+    def test_format(self):
+        totals = ProgressTotals(
+            done=5 * 1024 * 1024, total=20 * 1024 * 1024, transferred=0,
+            rate=1024 * 1024, eta=75, active=1, files=2,
+        )
+        self.assertEqual(totals.format(), "5.0 MB of 20.0 MB · 1.0 MB/s · 1:15 left")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Tests for per-host token-bucket rate limits."""
+import threading
+import time
+import unittest
+
+from index_ripper.ratelimit import RateLimiter, TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_unlimited_never_waits(self):
+        bucket = TokenBucket(0)
+        self.assertEqual(bucket.try_take(10**9), 0.0)
+
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(10, burst_seconds=1.0)
+        for _ in range(10):
+            self.assertEqual(bucket.try_take(1), 0.0)  # full bucket: no wait
+        self.assertGreater(bucket.try_take(1), 0.0)
+        started = time.monotonic()
+        self.assertTrue(bucket.take(3))
+        self.assertGreater(time.monotonic() - started, 0.2)
+
+    def test_oversized_take_allowed_from_full_bucket(self):
+        bucket = TokenBucket(100)
+        self.assertEqual(bucket.try_take(500), 0.0)
+        self.assertAlmostEqual(bucket.try_take(1), 4.01, places=1)  # paying off the debt
+
+    def test_rate_change_applies_to_waiters(self):
+        bucket = TokenBucket(1)
+        bucket.try_take(1)
+        done = threading.Event()
+        waiter = threading.Thread(target=lambda: (bucket.take(1), done.set()))
+        waiter.start()
+        time.sleep(0.1)
+        bucket.set_rate(0)  # lift the limit
+        self.assertTrue(done.wait(1))
+        waiter.join()
+
+    def test_take_honors_stop(self):
+        bucket = TokenBucket(0.1)
+        bucket.try_take(1)
+        self.assertFalse(bucket.take(1, should_stop=lambda: True))
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_buckets_are_per_host(self):
+        limiter = RateLimiter(requests_per_second=1)
+        self.assertTrue(limiter.wait_request("http://a/x"))
+        self.assertTrue(limiter.wait_request("http://b/x"))  # b has its own bucket
+        self.assertGreater(limiter.buckets("http://a/y")[0].try_take(1), 0.0)
+
+    def test_configure_updates_existing_buckets(self):
+        limiter = RateLimiter(requests_per_second=5, bytes_per_second=1000)
+        requests_bucket, bytes_bucket = limiter.buckets("http://a/")
+        limiter.configure(requests_per_second=50)
+        self.assertEqual(requests_bucket.rate, 50)
+        self.assertEqual(bytes_bucket.rate, 1000)
+        self.assertEqual(limiter.limits(), (50, 1000))
+
+    def test_host_override(self):
+        limiter = RateLimiter(requests_per_second=5)
+        limiter.buckets("http://a/")
+        limiter.configure(requests_per_second=1, host="a")
+        limiter.configure(requests_per_second=20)
+        self.assertEqual(limiter.buckets("http://a/")[0].rate, 1)
+        self.assertEqual(limiter.buckets("http://b/")[0].rate, 20)
+        self.assertEqual(limiter.limits("a"), (1, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""Tests for .part files, their sidecar and the Range headers that continue them."""
+import os
+import tempfile
+import unittest
+
+from index_ripper.resumable import PartialDownload, PartialMismatch, parse_content_range
+
+URL = "http://h/f.iso"
+
+
+class TestPartialDownload(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.target = os.path.join(self._tmp.name, "f.iso")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _partial(self, data=b"x" * 40, **meta):
+        partial = PartialDownload(self.target, URL)
+        partial.accept(200, {"content-length": "100", **meta})
+        with open(partial.part_path, "wb") as file_obj:
+            file_obj.write(data)
+        return PartialDownload.load(self.target, URL)
+
+    def test_sidecar_round_trip(self):
+        partial = self._partial(etag='"v1"', **{"last-modified": "Fri, 05 Jan 2024 12:30:00 GMT"})
+        self.assertEqual((partial.etag, partial.length, partial.offset), ('"v1"', 100, 40))
+        self.assertEqual(partial.request_headers(), {"Range": "bytes=40-", "If-Range": '"v1"'})
+
+    def test_weak_etag_uses_last_modified(self):
+        partial = self._partial(etag='W/"v1"', **{"last-modified": "Fri, 05 Jan 2024 12:30:00 GMT"})
+        self.assertEqual(partial.request_headers()["If-Range"], "Fri, 05 Jan 2024 12:30:00 GMT")
+
+    def test_no_sidecar_or_other_url_starts_over(self):
+        self._partial(etag='"v1"')
+        self.assertEqual(PartialDownload.load(self.target, "http://other/f.iso").request_headers(), {})
+        os.remove(self.target + ".part.json")
+        self.assertEqual(PartialDownload.load(self.target, URL).request_headers(), {})
+
+    def test_accept_continuation(self):
+        partial = self._partial(etag='"v1"')
+        self.assertEqual(partial.accept(206, {"content-range": "bytes 40-99/100", "etag": '"v1"'}), 40)
+
+    def test_mismatched_range_rejected(self):
+        partial = self._partial(etag='"v1"')
+        for headers in (
+            {"content-range": "bytes 0-99/100"},
+            {"content-range": "bytes 40-119/120"},
+            {"content-range": "bytes 40-99/100", "etag": '"v2"'},
+            {},
+        ):
+            with self.subTest(headers=headers), self.assertRaises(PartialMismatch):
+                partial.accept(206, headers)
+
+    def test_full_response_resets_validators(self):
+        partial = self._partial(etag='"v1"')
+        self.assertEqual(partial.accept(200, {"etag": '"v2"', "content-length": "120"}), 0)
+        self.assertEqual(PartialDownload.load(self.target, URL).etag, '"v2"')
+
+    def test_complete_only_at_full_length(self):
+        partial = self._partial()
+        self.assertFalse(partial.complete())
+        with open(partial.part_path, "ab") as file_obj:
+            file_obj.write(b"y" * 60)
+        self.assertTrue(partial.complete())
+        self.assertEqual(os.path.getsize(self.target), 100)
+        self.assertFalse(os.path.exists(partial.part_path) or os.path.exists(partial.meta_path))
+
+    def test_preallocated_file_continues_at_written_offset(self):
+        partial = self._partial(data=b"x" * 100, etag='"v1"')
+        partial.written = 30
+        partial.save()
+        partial = PartialDownload.load(self.target, URL)
+        self.assertEqual(partial.offset, 30)
+        self.assertEqual(partial.request_headers()["Range"], "bytes=30-")
+        self.assertFalse(partial.complete())
+        partial.accept(200, {"content-length": "100"})
+        self.assertIsNone(partial.written)
+
+    def test_encoded_response_records_no_length(self):
+        partial = PartialDownload(self.target, URL)
+        partial.accept(200, {"content-encoding": "gzip", "content-length": "100", "etag": '"v1"'})
+        self.assertIsNone(partial.length)
+        self.assertIsNone(partial.validator)
+        with open(partial.part_path, "wb") as file_obj:
+            file_obj.write(b"x" * 300)
+        self.assertEqual(partial.request_headers(), {})  # offsets of an encoded body are useless
+        self.assertTrue(partial.complete())
+
+    def test_encoded_range_response_rejected(self):
+        partial = self._partial(etag='"v1"')
+        with self.assertRaises(PartialMismatch):
+            partial.accept(
+                206, {"content-range": "bytes 40-99/100", "content-encoding": "gzip"}
+            )
+
+    def test_parse_content_range(self):
+        self.assertEqual(parse_content_range("bytes 5-9/10"), (5, 10))
+        self.assertEqual(parse_content_range("bytes 5-9/*"), (5, None))
+        self.assertIsNone(parse_content_range("items 1-2/3"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""Tests for failed-listing retry bookkeeping."""
+import unittest
+from unittest.mock import MagicMock
+
+import requests
+
+from index_ripper.retries import ListingRetries, RetryPolicy, is_transient
+
+
+def _http_error(status):
+    response = MagicMock()
+    response.status_code = status
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+class TestIsTransient(unittest.TestCase):
+    def test_classification(self):
+        self.assertTrue(is_transient(requests.ConnectionError("reset")))
+        self.assertTrue(is_transient(requests.Timeout("slow")))
+        self.assertTrue(is_transient(_http_error(503)))
+        self.assertTrue(is_transient(_http_error(429)))
+        self.assertFalse(is_transient(_http_error(404)))
+        self.assertFalse(is_transient(_http_error(403)))
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_backoff_doubles_up_to_cap(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=3.0)
+        for attempt, high in ((1, 1.0), (2, 2.0), (3, 3.0), (6, 3.0)):
+            delay = policy.delay(attempt)
+            self.assertGreaterEqual(delay, high / 2)
+            self.assertLessEqual(delay, high)
+
+
+class TestListingRetries(unittest.TestCase):
+    def setUp(self):
+        self.retries = ListingRetries(RetryPolicy(attempts=2, base_delay=0.01, budget=10))
+
+    def test_recovered_listing_is_cleared(self):
+        self.assertIsNotNone(self.retries.failed("u", requests.ConnectionError("reset")))
+        self.assertIsNotNone(self.retries.take_retry("u"))
+        self.assertIsNone(self.retries.take_retry("u"))  # second fetch succeeded
+        self.assertEqual(self.retries.failures, {})
+        self.assertEqual(self.retries.recovered, 1)
+
+    def test_attempts_per_directory(self):
+        error = requests.Timeout("slow")
+        delays = []
+        for _ in range(3):
+            delays.append(self.retries.failed("u", error))
+            self.retries.take_retry("u")
+        self.assertIsNotNone(delays[0])
+        self.assertIsNotNone(delays[1])
+        self.assertIsNone(delays[2])
+        self.assertEqual(self.retries.failures, {"u": "slow"})
+
+    def test_permanent_error_not_retried(self):
+        self.assertIsNone(self.retries.failed("u", _http_error(404)))
+        self.assertIsNone(self.retries.take_retry("u"))
+        self.assertIn("u", self.retries.failures)
+
+    def test_budget_shared_across_directories(self):
+        self.retries.policy.budget = 2
+        delays = [self.retries.failed(f"u{i}", requests.ConnectionError("x")) for i in range(3)]
+        self.assertEqual([d is not None for d in delays], [True, True, False])
+        self.assertEqual(self.retries.retries_used, 2)
+
+    def test_retry_disabled(self):
+        self.assertIsNone(self.retries.failed("u", requests.ConnectionError("x"), retry=False))
+
+
+if __name__ == "__main__":
+    unittest.main()
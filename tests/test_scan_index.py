@@ -0,0 +1,89 @@
+"""Tests for the SQLite scan index."""
+import os
+import tempfile
+import unittest
+
+from index_ripper.scan_index import ScanIndex
+
+ROOT = "http://h/pub/"
+
+
+class TestScanIndex(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "scan_index.sqlite3")
+        self.index = ScanIndex(self.path, flush_every=2)
+
+    def tearDown(self):
+        self.index.close()
+        self._tmp.cleanup()
+
+    def _reopen(self):
+        self.index.close()
+        self.index = ScanIndex(self.path)
+        return self.index
+
+    def test_status_lifecycle(self):
+        self.assertIsNone(self.index.status(ROOT))
+        self.index.start(ROOT)
+        self.assertEqual(self.index.status(ROOT), "interrupted")
+        self.index.finish(ROOT)
+        self.assertEqual(self.index.status(ROOT), "finished")
+        self.index.reopen(ROOT)
+        self.assertEqual(self.index.status(ROOT), "interrupted")
+
+    def test_resume_state_survives_reopen(self):
+        self.index.start(ROOT)
+        self.index.listing_queued(ROOT, ROOT, 0)
+        self.index.listing_queued(ROOT, ROOT + "a/", 1)
+        self.index.listing_done(ROOT, ROOT)
+        self.index.item_found(ROOT, {"url": ROOT + "a/", "is_directory": True})
+        self.index.item_found(ROOT, {"url": ROOT + "x.iso", "is_directory": False})
+        self.index.item_done(ROOT, ROOT + "a/", {"is_directory": True, "url": ROOT + "a/"})
+        self.index.flush()
+
+        state = self._reopen().resume_state(ROOT)
+        self.assertEqual(state.done_listings, [ROOT])
+        self.assertEqual(state.pending_listings, [(ROOT + "a/", 1)])
+        self.assertEqual(state.results, [{"is_directory": True, "url": ROOT + "a/"}])
+        self.assertEqual(state.unprocessed, [{"url": ROOT + "x.iso", "is_directory": False}])
+
+    def test_failed_listing_is_pending_on_resume(self):
+        self.index.start(ROOT)
+        self.index.listing_queued(ROOT, ROOT, 0)
+        self.index.listing_queued(ROOT, ROOT + "a/", 1)
+        self.index.listing_done(ROOT, ROOT)
+        self.index.listing_failed(ROOT, ROOT + "a/")
+        self.index.finish(ROOT)
+
+        state = self._reopen().resume_state(ROOT)
+        self.assertEqual(state.done_listings, [ROOT])
+        self.assertEqual(state.pending_listings, [(ROOT + "a/", 1)])
+        self.assertEqual(state.failed_listings, [ROOT + "a/"])
+        self.index.listing_queued(ROOT, ROOT + "a/", 1)
+        self.index.listing_done(ROOT, ROOT + "a/")
+        self.assertEqual(self.index.resume_state(ROOT).failed_listings, [])
+
+    def test_start_discards_previous_scan_of_same_root_only(self):
+        self.index.start(ROOT)
+        self.index.start("http://other/")
+        self.index.item_found(ROOT, {"url": ROOT + "x", "is_directory": False})
+        self.index.item_found("http://other/", {"url": "http://other/y", "is_directory": False})
+        self.index.start(ROOT)
+        self.assertEqual(self.index.resume_state(ROOT).unprocessed, [])
+        self.assertEqual(len(self.index.resume_state("http://other/").unprocessed), 1)
+
+    def test_writes_are_buffered_until_flush(self):
+        self.index.start(ROOT)
+        self.index.listing_queued(ROOT, ROOT, 0)
+        other = ScanIndex(self.path)
+        try:
+            self.assertEqual(other.resume_state(ROOT).pending_listings, [])
+            self.index.flush()
+            self.assertEqual(other.resume_state(ROOT).pending_listings, [(ROOT, 0)])
+        finally:
+            other.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Tests for scan-time include/exclude/depth/extension rules."""
+import unittest
+
+from index_ripper.scan_rules import ScanRules
+
+
+class TestScanRules(unittest.TestCase):
+    def test_no_rules_allow_everything(self):
+        rules = ScanRules()
+        self.assertFalse(rules.active)
+        self.assertTrue(rules.allows("a/b/", True))
+        self.assertTrue(rules.allows("a/b/c.txt", False))
+
+    def test_include_prunes_directories_that_cannot_match(self):
+        rules = ScanRules(include=("/releases/*/*.iso",))
+        self.assertTrue(rules.allows("releases/", True))
+        self.assertTrue(rules.allows("releases/v1/", True))
+        self.assertFalse(rules.allows("releases/v1/extra/", True))
+        self.assertFalse(rules.allows("docs/", True))
+        self.assertTrue(rules.allows("releases/v1/disk.iso", False))
+        self.assertFalse(rules.allows("releases/v1/notes.txt", False))
+        self.assertFalse(rules.allows("top.iso", False))
+
+    def test_directory_include_takes_in_whole_subtree(self):
+        rules = ScanRules(include=("releases/*/",))
+        self.assertTrue(rules.allows("releases/v1/extra/", True))
+        self.assertTrue(rules.allows("releases/v1/extra/notes.txt", False))
+        self.assertFalse(rules.allows("releases/readme.txt", False))
+
+    def test_double_star_and_unanchored_patterns(self):
+        rules = ScanRules(include=("pub/**/*.iso",), exclude=("thumbs/", "*.tmp"))
+        self.assertTrue(rules.allows("pub/a/b/c/", True))
+        self.assertTrue(rules.allows("pub/a/b/c/x.iso", False))
+        self.assertTrue(rules.allows("pub/x.iso", False))
+        self.assertFalse(rules.allows("pub/a/thumbs/", True))
+        self.assertTrue(rules.allows("pub/a/thumbs.iso", False))  # "thumbs/" is directories only
+        self.assertFalse(rules.allows("pub/a/x.tmp", False))
+
+    def test_max_depth(self):
+        rules = ScanRules(max_depth=1)
+        self.assertTrue(rules.allows("a/", True))
+        self.assertFalse(rules.allows("a/b/", True))
+        self.assertTrue(rules.allows("a/file.txt", False))
+
+    def test_extension_lists(self):
+        rules = ScanRules.from_strings(allow_extensions=".ISO, img", deny_extensions="")
+        self.assertTrue(rules.allows("disk.iso", False))
+        self.assertTrue(rules.allows("x/disk.img", False))
+        self.assertFalse(rules.allows("README", False))
+        self.assertTrue(rules.allows("any/", True))  # extensions never prune directories
+        rules = ScanRules.from_strings(deny_extensions="log,")
+        self.assertFalse(rules.allows("x/debug.log", False))
+        self.assertTrue(rules.allows("README", False))
+
+    def test_from_strings(self):
+        rules = ScanRules.from_strings(include="a/*, b/", max_depth="3")
+        self.assertEqual(rules.include, ("a/*", "b/"))
+        self.assertEqual(rules.max_depth, 3)
+        self.assertTrue(rules.active)
+        with self.assertRaises(ValueError):
+            ScanRules.from_strings(max_depth="deep")
+
+
+if __name__ == "__main__":
+    unittest.main()
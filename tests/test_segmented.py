@@ -0,0 +1,204 @@
+"""Tests for segmented Range downloads against a local HTTP server."""
+import http.server
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from index_ripper.backend import Backend
+from index_ripper.connections import make_session
+from index_ripper.retries import RetryPolicy
+from index_ripper.segmented import SegmentPlan, SegmentTuner, merge_ranges
+from tests.test_backend import MockUIManager
+
+BODY = os.urandom(3 * 1024 * 1024 + 123)
+
+
+class _RangeServer:
+    """Serves BODY at /f.iso with an ETag and single-range support."""
+
+    def __init__(self):
+        self.etag = '"v1"'
+        self.ranges = []
+        self.break_first_range = False
+        self.range_cap = None  # largest range served; 0 answers every range empty
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                return
+
+            def do_GET(self):
+                first, last, status = 0, len(BODY) - 1, 200
+                requested = self.headers.get("Range")
+                if_range = self.headers.get("If-Range")
+                if requested and (if_range is None or if_range == server.etag):
+                    start, _sep, end = requested[6:].partition("-")
+                    first, last, status = int(start), int(end) if end else last, 206
+                    server.ranges.append((first, last))
+                    if server.range_cap is not None:
+                        last = min(last, first + server.range_cap - 1)
+                self.send_response(status)
+                self.send_header("ETag", server.etag)
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", str(last - first + 1))
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {first}-{max(first, last)}/{len(BODY)}")
+                self.end_headers()
+                body = BODY[first:last + 1]
+                if status == 206 and server.break_first_range:
+                    server.break_first_range = False
+                    self.wfile.write(body[: len(body) // 3])
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/f.iso"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class TestSegmentPlan(unittest.TestCase):
+    def test_split_and_steal(self):
+        plan = SegmentPlan.split(100, 2, min_size=10)
+        first, second = plan.take(), plan.take()
+        self.assertEqual((first.first, first.last, second.first, second.last), (0, 49, 50, 99))
+        self.assertEqual(plan.advance(first, 10), 10)
+        plan.advance(second, 20)
+        stolen = plan.take()  # upper half of the larger remaining range
+        self.assertEqual((stolen.first, stolen.last), (30, 49))
+        self.assertEqual(plan.advance(first, 30), 20)  # clipped at the split
+        self.assertEqual(plan.missing(), [[70, 99], [30, 49]])
+
+    def test_small_ranges_not_split(self):
+        plan = SegmentPlan.split(30, 4, min_size=10)
+        self.assertEqual(len(plan.missing()), 3)
+        for _ in range(3):
+            plan.take()
+        self.assertIsNone(plan.take())
+
+    def test_merge_ranges(self):
+        self.assertEqual(
+            merge_ranges([[10, 19], [0, 4], [5, 7], [15, 30]]), [[0, 7], [10, 30]]
+        )
+
+    def test_tuner_stops_when_gain_stalls(self):
+        tuner = SegmentTuner(maximum=8)
+        self.assertTrue(tuner.should_grow(100, 2))
+        self.assertTrue(tuner.should_grow(150, 3))
+        self.assertFalse(tuner.should_grow(155, 4))
+        self.assertFalse(tuner.should_grow(400, 4))
+        self.assertFalse(SegmentTuner(maximum=2).should_grow(100, 2))
+
+
+class TestSegmentedDownload(unittest.TestCase):
+    def setUp(self):
+        self.ui = MockUIManager()
+        self.ui.session = make_session(10)
+        self.ui.update_progress = MagicMock()
+        self.ui.update_download_status = MagicMock()
+        self.backend = Backend(self.ui)
+        self.backend.segment_threshold = 1024 * 1024
+        self._tmp = tempfile.TemporaryDirectory()
+        self.target = os.path.join(self._tmp.name, "f.iso")
+        fast_retry = patch.object(RetryPolicy, "delay", return_value=0.01)
+        fast_retry.start()
+        self.addCleanup(fast_retry.stop)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _assert_complete(self):
+        with open(self.target, "rb") as file_obj:
+            self.assertEqual(file_obj.read(), BODY)
+        self.assertFalse(os.path.exists(self.target + ".part"))
+        self.assertFalse(os.path.exists(self.target + ".part.json"))
+
+    def test_large_file_fetched_in_ranges(self):
+        with _RangeServer() as server:
+            self.assertTrue(self.backend.download_file(server.url, self.target, "f.iso"))
+        self._assert_complete()
+        self.assertGreaterEqual(len(server.ranges), 2)
+        self.assertIn((0, len(BODY) // 2 - 1), server.ranges)
+
+    def test_below_threshold_single_stream(self):
+        self.backend.segment_threshold = len(BODY) + 1
+        with _RangeServer() as server:
+            self.assertTrue(self.backend.download_file(server.url, self.target, "f.iso"))
+        self._assert_complete()
+        self.assertEqual(server.ranges, [])
+
+    def test_broken_range_retried_from_first_missing_byte(self):
+        with _RangeServer() as server:
+            server.break_first_range = True
+            self.assertTrue(self.backend.download_file(server.url, self.target, "f.iso"))
+        self._assert_complete()
+        resumed = [
+            (earlier, later)
+            for i, earlier in enumerate(server.ranges)
+            for later in server.ranges[i + 1:]
+            if later[1] == earlier[1] and later[0] > earlier[0]
+        ]
+        self.assertTrue(resumed, server.ranges)
+
+    def test_short_ranges_continue_where_they_ended(self):
+        with _RangeServer() as server:
+            server.range_cap = 512 * 1024
+            self.assertTrue(self.backend.download_file(server.url, self.target, "f.iso"))
+        self._assert_complete()
+
+    def test_empty_ranges_use_up_retry_attempts(self):
+        with _RangeServer() as server:
+            server.range_cap = 0
+            self.assertFalse(self.backend.download_file(server.url, self.target, "f.iso"))
+        retries = [msg for msg in self.ui.log_messages if "bytes short" in msg]
+        self.assertTrue(retries)
+        # At most 4 requests per segment (3 retries), for each of the 6 download attempts
+        self.assertLessEqual(len(server.ranges), 6 * self.backend.max_segments * 4)
+
+    def _write_partial(self, url, etag):
+        half = len(BODY) // 2
+        with open(self.target + ".part", "wb") as file_obj:
+            file_obj.write(BODY[:half])
+            file_obj.truncate(len(BODY))
+        with open(self.target + ".part.json", "w", encoding="utf-8") as file_obj:
+            json.dump(
+                {
+                    "url": url,
+                    "etag": etag,
+                    "last_modified": None,
+                    "length": len(BODY),
+                    "segments": [[half, len(BODY) - 1]],
+                },
+                file_obj,
+            )
+        return half
+
+    def test_saved_segments_resumed(self):
+        with _RangeServer() as server:
+            half = self._write_partial(server.url, '"v1"')
+            self.assertTrue(self.backend.download_file(server.url, self.target, "f.iso"))
+        self._assert_complete()
+        self.assertTrue(all(first >= half for first, _last in server.ranges))
+
+    def test_changed_file_restarts(self):
+        with _RangeServer() as server:
+            self._write_partial(server.url, '"v0"')
+            self.assertTrue(self.backend.download_file(server.url, self.target, "f.iso"))
+        self._assert_complete()
+        self.assertIn("starting over", " ".join(self.ui.log_messages))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,11 @@
 import os
 import tempfile
 import unittest
+from unittest.mock import patch
 
-from index_ripper.settings import load_settings, save_settings
+from index_ripper.backend import Backend
+from index_ripper.settings import apply_env_settings, load_settings, save_settings
+from tests.test_backend import MockUIManager
 
 
 class TestSettingsStore(unittest.TestCase):
@@ -25,5 +28,68 @@ class TestSettingsStore(unittest.TestCase):
             self.assertEqual(load_settings(path), {})
 
 
+class TestEnvSettings(unittest.TestCase):
+    def setUp(self):
+        self.backend = Backend(MockUIManager())
+
+    def test_defaults(self):
+        settings = apply_env_settings(self.backend, {"INDEX_RIPPER_SCAN_INDEX": "0"})
+        self.assertEqual(settings.messages, [])
+        self.assertFalse(settings.debug)
+        self.assertIsNone(self.backend.scan_index)
+        self.assertIsNone(self.backend.listing_cache)
+        self.assertTrue(self.backend.preallocate_downloads)
+        self.assertEqual(self.backend.crawl_priority.depth_weight, 1.0)
+
+    def test_values_are_applied(self):
+        settings = apply_env_settings(self.backend, {
+            "INDEX_RIPPER_SCAN_INDEX": "0",
+            "INDEX_RIPPER_MAX_SEGMENTS": "4",
+            "INDEX_RIPPER_PREALLOCATE": "0",
+            "INDEX_RIPPER_LAZY_SCAN": "1",
+            "INDEX_RIPPER_CRAWL_ORDER": "deep",
+            "INDEX_RIPPER_HOT_DIRS": "latest, current",
+            "INDEX_RIPPER_DNS_CACHE_TTL": "0",
+        })
+        self.assertEqual(self.backend.max_segments, 4)
+        self.assertFalse(self.backend.preallocate_downloads)
+        self.assertTrue(self.backend.lazy_scan)
+        self.assertEqual(self.backend.crawl_priority.depth_weight, -1.0)
+        self.assertEqual(self.backend.crawl_priority.hot_patterns, ("latest", "current"))
+        self.assertEqual(settings.dns_ttl, 0)
+
+    def test_invalid_values_are_reported(self):
+        settings = apply_env_settings(self.backend, {
+            "INDEX_RIPPER_SCAN_INDEX": "0",
+            "INDEX_RIPPER_MAX_SEGMENTS": "many",
+            "INDEX_RIPPER_CRAWL_ORDER": "random",
+        })
+        self.assertEqual(len(settings.messages), 2)
+        self.assertIn("INDEX_RIPPER_CRAWL_ORDER='random'", settings.messages[0])
+        self.assertIn("INDEX_RIPPER_MAX_SEGMENTS='many'", settings.messages[1])
+        self.assertEqual(self.backend.crawl_priority.depth_weight, 1.0)
+
+    def test_non_finite_numbers_are_reported(self):
+        settings = apply_env_settings(self.backend, {
+            "INDEX_RIPPER_SCAN_INDEX": "0",
+            "INDEX_RIPPER_MAX_SEGMENTS": "inf",
+            "INDEX_RIPPER_DOWNLOAD_RETRIES": "nan",
+            "INDEX_RIPPER_WRITE_BUFFERS": "1e400",
+        })
+        self.assertEqual(len(settings.messages), 3)
+        for message in settings.messages:
+            self.assertIn("not a finite number", message)
+
+    def test_scan_index_in_data_dir(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch.dict(os.environ, {"INDEX_RIPPER_DATA_DIR": "/nonexistent"}):
+                apply_env_settings(self.backend, {"INDEX_RIPPER_DATA_DIR": tmpdir})
+            self.addCleanup(self.backend.scan_index.close)
+            self.assertEqual(
+                self.backend.scan_index.path, os.path.join(tmpdir, "scan_index.sqlite3")
+            )
+            self.assertIsNotNone(self.backend.listing_cache)
+
+
 if __name__ == "__main__":
     unittest.main()